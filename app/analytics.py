@@ -0,0 +1,201 @@
+"""imports"""
+from calendar import isleap
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class ColumnarBook:
+    """Column oriented export of an AddressBook for bulk analytics.
+
+    Needs NumPy. The functions of this module fall back to the regular
+    AddressBook methods when it is not installed.
+
+    Attributes:
+        names (list): Contact names, in the order of the book.
+        birth_ordinals (numpy.ndarray): int32 date ordinals of the
+            birthdays, 0 for contacts without one.
+        phones (numpy.ndarray): int64 phone numbers of all contacts.
+        phone_owners (numpy.ndarray): int32 positions in `names` of the
+            owner of every phone.
+    """
+    def __init__(self, names, birth_ordinals, phones, phone_owners) -> None:
+        self.names = names
+        self.birth_ordinals = birth_ordinals
+        self.phones = phones
+        self.phone_owners = phone_owners
+
+    @classmethod
+    def from_book(cls, contacts) -> 'ColumnarBook':
+        """Exports the records of a book into columns.
+
+        Args:
+            contacts (AddressBook): The book to export.
+
+        Returns:
+            ColumnarBook: The columns of the book.
+        """
+        records = list(contacts.data.values())
+        size = len(records)
+        birth_ordinals = np.fromiter(
+            (record.birth_ordinal for record in records),
+            dtype=np.int32, count=size,
+        )
+        packed = np.frombuffer(
+            b''.join(record.packed_phones for record in records),
+            dtype=np.uint8,
+        ).reshape(-1, 5).astype(np.int64)
+        phones = packed @ (256 ** np.arange(4, -1, -1, dtype=np.int64))
+        phone_counts = np.fromiter(
+            (len(record.packed_phones) // 5 for record in records),
+            dtype=np.int32, count=size,
+        )
+        phone_owners = np.repeat(
+            np.arange(size, dtype=np.int32), phone_counts
+        )
+        return cls(list(contacts.data), birth_ordinals, phones, phone_owners)
+
+
+def adjust_for_weekend(days):
+    """Vectorized BirthdayFunctions.adjust_for_weekend.
+
+    Args:
+        days (numpy.ndarray): Dates as datetime64[D].
+
+    Returns:
+        numpy.ndarray: The dates, with Saturdays and Sundays moved to the
+            next Monday.
+    """
+    weekday = (days.astype(np.int64) + 3) % 7
+    shift = np.where(weekday >= 5, 7 - weekday, 0)
+    return days + shift.astype('timedelta64[D]')
+
+
+def month_day(ordinals):
+    """Vectorized month and day of date ordinals, using the days-to-civil
+    algorithm of Howard Hinnant in integer arithmetic.
+
+    Args:
+        ordinals (numpy.ndarray): Date ordinals.
+
+    Returns:
+        tuple: Arrays of months (1-12) and days (1-31).
+    """
+    shifted = ordinals.astype(np.int64) - EPOCH_ORDINAL + 719468
+    day_of_era = shifted % 146097
+    year_of_era = (
+        day_of_era - day_of_era // 1460 + day_of_era // 36524
+        - day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100
+    )
+    month_from_march = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_from_march + 2) // 5 + 1
+    month = np.where(month_from_march < 10, month_from_march + 3,
+                     month_from_march - 9)
+    return month, day
+
+
+def occurrence(year: int, month, day):
+    """Vectorized date of a birthday in the given year, as days since
+    1970-01-01. February 29 becomes March 1 in common years.
+    """
+    before_month = np.array(
+        (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334),
+        dtype=np.int64,
+    )
+    year_start = date(year, 1, 1).toordinal() - EPOCH_ORDINAL
+    days = year_start + before_month[month - 1] + day - 1
+    if isleap(year):
+        days += month > 2
+    return days
+
+
+def upcoming_birthday_arrays(columns, days=7, today=None) -> tuple:
+    """Vectorized upcoming birthday window over exported columns.
+
+    Args:
+        columns (ColumnarBook): The export of the book.
+        days (int, optional): The number of days ahead. Defaults to 7.
+        today (date, optional): The first day of the window.
+
+    Returns:
+        tuple: datetime64[D] congratulation dates and the positions of the
+            contacts in `columns.names`, ordered by birthday.
+    """
+    today = today or date.today()
+    has_birthday = np.flatnonzero(columns.birth_ordinals)
+    month, day = month_day(columns.birth_ordinals[has_birthday])
+    first_day = today.toordinal() - EPOCH_ORDINAL
+    birthday = occurrence(today.year, month, day)
+    birthday = np.where(
+        birthday < first_day, occurrence(today.year + 1, month, day), birthday
+    )
+    in_window = np.flatnonzero(birthday - first_day <= days)
+    order = in_window[np.argsort(birthday[in_window], kind='stable')]
+    congratulation = adjust_for_weekend(
+        birthday[order].astype('datetime64[D]')
+    )
+    return congratulation, has_birthday[order]
+
+
+def upcoming_birthdays(contacts, days=7, today=None, columns=None) -> list:
+    """Collects the birthdays within the specified number of days, with
+    the same rules as AddressBook.upcoming_birthdays.
+
+    Args:
+        contacts (AddressBook): The book to search.
+        days (int, optional): The number of days ahead. Defaults to 7.
+        today (date, optional): The first day of the window.
+        columns (ColumnarBook, optional): A ready export of the book.
+
+    Returns:
+        list: Tuples of congratulation date and contact name, ordered by
+            birthday.
+    """
+    if not HAS_NUMPY:
+        return contacts.upcoming_birthdays(days, today)
+    columns = columns or ColumnarBook.from_book(contacts)
+    congratulation, positions = upcoming_birthday_arrays(columns, days, today)
+    names = columns.names
+    return list(zip(
+        congratulation.astype(object).tolist(),
+        [names[position] for position in positions.tolist()],
+    ))
+
+
+def duplicate_phones(contacts, columns=None) -> dict:
+    """Finds phone numbers shared by more than one contact.
+
+    Args:
+        contacts (AddressBook): The book to search.
+        columns (ColumnarBook, optional): A ready export of the book.
+
+    Returns:
+        dict: The shared phone numbers with the names of their owners.
+    """
+    if not HAS_NUMPY:
+        return {
+            phone: list(owners)
+            for phone, owners in contacts.phone_index.items()
+            if len(owners) > 1
+        }
+    columns = columns or ColumnarBook.from_book(contacts)
+    values, counts = np.unique(columns.phones, return_counts=True)
+    shared = values[counts > 1]
+    mask = np.isin(columns.phones, shared)
+    duplicates = {}
+    for phone, owner in zip(
+        columns.phones[mask].tolist(), columns.phone_owners[mask].tolist()
+    ):
+        duplicates.setdefault(f"{phone:010d}", []).append(
+            columns.names[owner]
+        )
+    return duplicates
@@ -0,0 +1,109 @@
+"""imports"""
+from collections.abc import Iterator
+from app.dispatch import COMMAND_ERRORS, EXIT_COMMANDS, command_error, \
+    make_command, parse_input
+
+OUTPUT_BUFFER = 64 * 1024
+
+
+class BatchStorage:
+    """Stands in for the storage of the book while a script runs.
+
+    Commands report their changes as usual, but instead of persisting each
+    of them (a journal entry or a row write with an fsync), only the names
+    of the changed contacts are collected. They are saved in one go every
+    `save_every` changes and when the script ends, with
+    Storage.save_changes. Changes since the last save are lost if the
+    process dies, which is the price of the speed.
+
+    Args:
+        storage (Storage): The storage of the book.
+        contacts (AddressBook): The book the script changes.
+        save_every (int, optional): Changes between saves; only at the
+            end if not given.
+    """
+    def __init__(self, storage, contacts, save_every=None) -> None:
+        self.storage = storage
+        self.contacts = contacts
+        self.save_every = save_every
+        self.changed = set()
+        self.changes = 0
+
+    @property
+    def cipher(self):
+        return self.storage.cipher
+
+    def append(self, contacts, operation: str, args) -> None:
+        if args:
+            self.changed.add(args[0])
+        self.changes += 1
+        if self.save_every and self.changes >= self.save_every:
+            self.save()
+
+    def compact(self, contacts) -> None:
+        """Bulk changes (an import) are saved with the rest."""
+        self.changed.update(contacts.data)
+        self.changes += 1
+
+    def save(self) -> None:
+        """Saves the contacts changed since the last save."""
+        if self.changed or self.changes:
+            self.storage.save_changes(self.contacts, self.changed)
+        self.changed = set()
+        self.changes = 0
+
+    def close(self) -> None:
+        """Saves the remaining changes and closes the storage."""
+        self.save()
+        self.storage.close()
+
+
+def run_script(lines, contacts, storage, output, save_every=None) -> int:
+    """Executes commands non-interactively, one per line.
+
+    Lines go through the same Command classes as typed commands, looked
+    up in the command registry. Blank lines and lines starting with '#' are
+    skipped, and 'close' or 'exit' ends the script early. The answers are
+    written as the command line prints them, without prompts, in large
+    chunks. A command that fails (COMMAND_ERRORS) is answered with the
+    error and its line number, and the script goes on.
+
+    Args:
+        lines (iterable): The commands, e.g. an open script file.
+        contacts (AddressBook): The book to work on.
+        storage (Storage): The storage of the book; it is closed at the end.
+        output (file): Where the answers are written.
+        save_every (int, optional): Changes between saves; only at the end
+            if not given.
+
+    Returns:
+        int: The number of executed commands.
+    """
+    batch = BatchStorage(storage, contacts, save_every)
+    buffer, size, executed = [], 0, 0
+    try:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            command, *args = parse_input(line)
+            if command in EXIT_COMMANDS:
+                break
+            message = make_command(command, args, contacts, batch)
+            try:
+                result = message.execute()
+                if isinstance(result, Iterator):
+                    result = ''.join(result)
+            except COMMAND_ERRORS as e:
+                result = f"line {number}: {command_error(e)}"
+            result = f"{result}\n"
+            buffer.append(result)
+            size += len(result)
+            executed += 1
+            if size >= OUTPUT_BUFFER:
+                output.write(''.join(buffer))
+                buffer, size = [], 0
+    finally:
+        output.write(''.join(buffer))
+        output.flush()
+        batch.close()
+    return executed
@@ -1,39 +1,196 @@
 """imports"""
+import heapq
+from calendar import isleap
 from collections import UserDict
-from datetime import date
+from datetime import date, timedelta
+from itertools import count, islice
 import app.record as rec
+from app import stats
+from app.search import NameIndex
 from app.functions import (
     Decorators as decor,
     BirthdayFunctions as birth
 )
 
+# Versions of books, unique in the process, so a book that is loaded anew
+# never gets a version that it or another book had before.
+VERSIONS = count(1)
 
-class Singleton:
-    """Singleton parent class for AddressBook"""
-    __instance = None
-    def __new__(cls):
-        if not isinstance(cls.__instance, cls):
-            cls.__instance = object.__new__(cls)
-        return cls.__instance
 
-
-class AddressBook(Singleton, UserDict):
-    """A simple Singleton address book implementation.
+class AddressBook(UserDict):
+    """A simple address book implementation.
 
     This class extends the UserDict class to manage a collection of contacts.
+    Every AddressBook() is a new, empty book; the books open in a process
+    are kept by app.books.BookRegistry.
     Uses classes: Name and Phone (children of Field) to store data, and
     Record to manage phone numbers.
 
     Args:
         UserDict (_type_): A class from the 'collections' module.
 
+    Attributes:
+        phone_index (dict): Reverse index of phone numbers to the names of
+            contacts holding them. Derived data, rebuilt on load.
+        birthday_index (list): 366 day of year buckets with the names of
+            contacts born on that day. Derived data, rebuilt on load.
+        name_index (NameIndex): Prefix and fuzzy search index of the
+            contact names. Derived data, rebuilt on load.
+        journal_seq (int): Sequence number of the last journal entry
+            applied to the book.
+        shared (dict): The frozen copy of the data a background save is
+            writing, or None.
+        version (int): Changes whenever the contacts change, so rendered
+            answers can be cached until then (app.cache).
+
     Methods:
         - add_record: Add a new contact record to the address book.
+        - insert: Add an already validated record, bypassing the argument
+            parsing of the commands.
         - find: Find a contact record by name.
         - find_by_phone: Find a contact record by phone number.
+        - search: Find contact names by prefix or by similarity.
+        - freeze: Hand a copy-on-write view of the contacts to a save.
+        - remove_phone: Remove a phone number from the specified contact.
         - delete: Delete a contact record from the address book.
     """
+    def __init__(self, *args, **kwargs):
+        self.phone_index = {}
+        self.birthday_index = [{} for _ in range(birth.SLOTS)]
+        self.name_index = NameIndex()
+        self.journal_seq = 0
+        self.shared = None
+        self.version = next(VERSIONS)
+        super().__init__(*args, **kwargs)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop('phone_index', None)
+        state.pop('birthday_index', None)
+        state.pop('name_index', None)
+        state.pop('shared', None)
+        state.pop('version', None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        state.setdefault('journal_seq', 0)
+        state['shared'] = None
+        self.__dict__.update(state)
+        self.rebuild_index()
+
+    def rebuild_index(self) -> None:
+        """Rebuilds the phone, birthday and name indexes from the stored
+        contact records."""
+        self.version = next(VERSIONS)
+        self.phone_index = {}
+        self.birthday_index = [{} for _ in range(birth.SLOTS)]
+        self.name_index = NameIndex(self.data)
+        for contact_name, phone_record in self.data.items():
+            for phone in phone_record.phones:
+                self.phone_index.setdefault(phone, []).append(
+                    contact_name
+                )
+            self._sync_birthday(contact_name, phone_record)
+
+    def load_parts(self, parts) -> None:
+        """Fills the book with parts of it decoded in other processes
+        (app.parallel), together with their index entries, so only the
+        dict and the index containers are built here.
+
+        Args:
+            parts (iterable): Tuples of lists made by parallel.decode_part:
+                names, packed phones, birthday ordinals, name index keys,
+                phone numbers and birthday slots each with the position of
+                its contact in names.
+        """
+        self.version = next(VERSIONS)
+        data, new = self.data, rec.Record.from_parts
+        phone_index, birthday_index = self.phone_index, self.birthday_index
+        for names, packed, ordinals, keys, phones, phone_owners, slots, \
+                slot_owners in parts:
+            for contact_name, packed_phones, birth_ordinal in zip(
+                names, packed, ordinals
+            ):
+                data[contact_name] = new(contact_name, packed_phones,
+                                         birth_ordinal)
+            for phone, owner in zip(phones, phone_owners):
+                phone_index.setdefault(phone, []).append(names[owner])
+            for slot, owner in zip(slots, slot_owners):
+                birthday_index[slot][names[owner]] = None
+            self.name_index.extend(keys)
+
+    def freeze(self) -> dict:
+        """Takes a copy of the contacts for a save that runs in the
+        background.
+
+        Only the dict is copied. Records that the save shares with the
+        book are copied when they are about to change (_writable), so the
+        save sees the book as it was when frozen without a deep copy.
+
+        Returns:
+            dict: Names to records as of now.
+        """
+        self.shared = dict(self.data)
+        return self.shared
+
+    def thaw(self) -> None:
+        """Ends the sharing of the records with a finished save."""
+        self.shared = None
+
+    def _writable(self, contact_name: str) -> rec.Record:
+        """Returns the record of a contact to change it in place, replacing
+        it by a copy first if a background save still uses it."""
+        record = self.data[contact_name]
+        shared = self.shared
+        if shared is not None and shared.get(contact_name) is record:
+            record = rec.Record.from_parts(
+                record.name, record.packed_phones, record.birth_ordinal
+            )
+            self.data[contact_name] = record
+        return record
+
+    def _sync_birthday(self, contact_name: str, record) -> None:
+        """Puts a contact into the bucket of its birthday, if it has one.
+
+        Args:
+            contact_name (str): The name of the contact.
+            record (Record): The record of the contact.
+        """
+        if record.birth_ordinal:
+            slot = birth.ordinal_slot(record.birth_ordinal)
+            self.birthday_index[slot][contact_name] = None
+
+    def _sync_phone(self, contact_name: str, phone_number: str) -> None:
+        """Brings the phone index entry of a single phone number in line
+        with the record of the given contact.
 
+        The owners of a phone are kept in the order of the book, so the
+        first one is the contact a scan of the book finds, also after the
+        index is rebuilt. Adding an owner to a shared phone scans the book
+        for that order; a new contact is last in it anyway.
+
+        Args:
+            contact_name (str): The name of the contact that was changed.
+            phone_number (str): The phone number that may have been added
+                to or removed from the contact.
+        """
+        owners = self.phone_index.get(phone_number, [])
+        record = self.data.get(contact_name)
+        has_phone = record is not None \
+            and record.find_phone(phone_number) == phone_number
+        if has_phone and contact_name not in owners:
+            if owners:
+                wanted = {*owners, contact_name}
+                owners = [name for name in self.data if name in wanted]
+            else:
+                owners = [contact_name]
+            self.phone_index[phone_number] = owners
+        elif not has_phone and contact_name in owners:
+            owners.remove(contact_name)
+            if not owners:
+                del self.phone_index[phone_number]
+
+    @stats.timed('book.add_record')
     @decor.validate_two_args
     @decor.make_record
     def add_record(self, user_record: rec.Record) -> str:
@@ -45,11 +202,33 @@ class AddressBook(Singleton, UserDict):
         Returns:
             str: A message indicating the status of the operation.
         """
-        if user_record.name.value in self.data:
+        if not self.insert(user_record):
             return 'contact exists'
-        self.data[user_record.name.value] = user_record
         return "Contact added."
 
+    @stats.timed('book.insert')
+    def insert(self, user_record: rec.Record, phones=None) -> bool:
+        """Adds an already validated record, as bulk imports do.
+
+        Args:
+            user_record (Record): The contact record to be added.
+            phones (list, optional): The phones of the record, when the
+                caller has them at hand and unpacking can be skipped.
+
+        Returns:
+            bool: False if a contact with the same name already exists.
+        """
+        if user_record.name in self.data:
+            return False
+        self.version = next(VERSIONS)
+        self.data[user_record.name] = user_record
+        for phone in user_record.phones if phones is None else phones:
+            self.phone_index.setdefault(phone, []).append(user_record.name)
+        self._sync_birthday(user_record.name, user_record)
+        self.name_index.add(user_record.name)
+        return True
+
+    @stats.timed('book.find')
     @decor.validate_one_arg
     def find(self, contact_name: str) -> str:
         """Finding a contact record by name.
@@ -62,6 +241,7 @@ class AddressBook(Singleton, UserDict):
         """
         return self.data[contact_name]
 
+    @stats.timed('book.find_by_phone')
     def find_by_phone(self, phone_number: str) -> str:
         """Find a contact record by phone number.
 
@@ -71,25 +251,64 @@ class AddressBook(Singleton, UserDict):
         Returns:
             str: The name of the contact associated with given phone number.
         """
-        for contact_name, phone_record in self.data.items():
-            if phone_record.find_phone(phone_number):
-                return contact_name
+        owners = self.phone_index.get(phone_number)
+        if owners:
+            return owners[0]
         return "No contact found with this phone number"
 
+    @stats.timed('book.search')
+    def search(self, text: str, fuzzy: bool = False, limit: int = 20) -> list:
+        """Finds contact names by prefix or, with fuzzy, by similarity.
+
+        Args:
+            text (str): The beginning of the name, or a misspelled name.
+            fuzzy (bool, optional): Whether to tolerate typos.
+            limit (int, optional): The maximal number of names.
+
+        Returns:
+            list: The names of the matching contacts.
+        """
+        if fuzzy:
+            return self.name_index.fuzzy(text, limit)
+        return self.name_index.prefix(text, limit)
+
+    @stats.timed('book.add_phone')
     @decor.validate_two_args
-    def add_phone(self, contact_name, new_phone):
+    def add_phone(self, args):
         """Adds a new phone number to the specified contact.
 
         Args:
-            contact_name (str): The name of the contact to whom the phone
-                number will be added.
-            new_phone (str): The new phone number to add to the contact.
+            args (list): The name of the contact to whom the phone number
+                will be added and the new phone number.
+
+        Returns:
+            str: A message indicating the status of the operation.
+        """
+        contact_name, new_phone = args
+        self.version = next(VERSIONS)
+        result = self._writable(contact_name).add_phone(new_phone)
+        self._sync_phone(contact_name, new_phone)
+        return result
+
+    @stats.timed('book.remove_phone')
+    @decor.validate_two_args
+    def remove_phone(self, args):
+        """Removes a phone number from the specified contact.
+
+        Args:
+            args (list): The name of the contact and the phone number
+                to remove.
 
         Returns:
-            bool: True if the phone was successfully added, False otherwise.
+            str: A message indicating the status of the operation.
         """
-        return self.data[contact_name].add_phone(new_phone)
+        contact_name, phone = args
+        self.version = next(VERSIONS)
+        result = self._writable(contact_name).remove_phone(phone)
+        self._sync_phone(contact_name, phone)
+        return result
 
+    @stats.timed('book.change_phone')
     @decor.validate_three_args
     def change_phone(self, contact_name, old_phone, new_phone):
         """Changes an existing phone number for the specified contact.
@@ -103,22 +322,47 @@ class AddressBook(Singleton, UserDict):
         Returns:
             bool: True if the phone was successfully changed, False otherwise.
         """
-        return self.data[contact_name].edit_phone(old_phone, new_phone)
+        self.version = next(VERSIONS)
+        result = self._writable(contact_name).edit_phone(
+            old_phone, new_phone
+        )
+        self._sync_phone(contact_name, old_phone)
+        self._sync_phone(contact_name, new_phone)
+        return result
 
-    def show_all(self) -> str:
-        """Display all the contacts.
+    def show_all(self, page=None, size=20, sort=False, contains=None):
+        """Display all the contacts, lazily and optionally one page at
+        a time.
 
-    Args:
-        contacts (dict): A dictionary containing contacts base.
-
-    Returns:
-        str: The formatted list of contacts.
-    """
-        output_of_contacts: str = ''
-        for _, phone_record in self.data.items():
-            output_of_contacts += f"{phone_record}\n"
-        return output_of_contacts
+        Only the requested page is rendered. A sorted page keeps just
+        page * size names in memory, using a heap.
 
+        Args:
+            page (int, optional): The 1-based page to show. All contacts
+                are shown if not given.
+            size (int, optional): The number of contacts per page.
+            sort (bool, optional): Whether to order the contacts by name.
+            contains (str, optional): Only show contacts whose name
+                contains this text, ignoring case.
+
+        Yields:
+            str: One formatted contact per line.
+        """
+        names = iter(self.data)
+        if contains:
+            needle = contains.casefold()
+            names = (name for name in names if needle in name.casefold())
+        start = stop = None
+        if page is not None:
+            start, stop = (page - 1) * size, page * size
+        if sort:
+            names = iter(
+                sorted(names) if stop is None else heapq.nsmallest(stop, names)
+            )
+        for name in islice(names, start, stop):
+            yield f"{self.data[name]}\n"
+
+    @stats.timed('book.birthday_date')
     @decor.validate_birthday
     def birthday_date(self, contact_name, birth_date):
         """Adds a birthday date to the specified contact.
@@ -132,8 +376,13 @@ class AddressBook(Singleton, UserDict):
         Returns:
             bool: True if the birthday was successfully added, False otherwise.
         """
-        return self.data[contact_name].add_birthday(birth_date)
+        self.version = next(VERSIONS)
+        record = self._writable(contact_name)
+        result = record.add_birthday(birth_date)
+        self._sync_birthday(contact_name, record)
+        return result
 
+    @stats.timed('book.show_birth_date')
     @decor.validate_one_arg
     def show_birth_date(self, contact_name):
         """Retrieves and returns the birthday date of the specified contact
@@ -148,6 +397,45 @@ class AddressBook(Singleton, UserDict):
         """
         return birth.date_to_string(self.data[contact_name].show_birthday())
 
+    @stats.timed('book.upcoming_birthdays')
+    def upcoming_birthdays(self, days=7, today=None) -> list:
+        """Collects the birthdays within the specified number of days.
+
+        Only the buckets of the days in the window are visited. Contacts
+        born on February 29 are congratulated on March 1 in non-leap years,
+        and birthdays on a weekend are moved to the next Monday.
+
+        Args:
+            days (int, optional): The number of days ahead to check for
+                upcoming birthdays. Defaults to 7.
+            today (date, optional): The first day of the window.
+                Defaults to the current date.
+
+        Returns:
+            list: Tuples of congratulation date and contact name, in the
+                order of the birthdays.
+        """
+        today = today or date.today()
+        upcoming_birthdays = []
+        feb_29 = birth.day_slot(date(2000, 2, 29))
+        visited = set()
+        for offset in range(min(days, 365) + 1):
+            day = today + timedelta(days=offset)
+            slots = [birth.day_slot(day)]
+            if day.month == 3 and day.day == 1 and not isleap(day.year):
+                slots.append(feb_29)
+            names = [
+                user for slot in slots if slot not in visited
+                for user in self.birthday_index[slot]
+            ]
+            visited.update(slots)
+            congratulation_date = birth.adjust_for_weekend(day)
+            upcoming_birthdays.extend(
+                (congratulation_date, user) for user in names
+            )
+        return upcoming_birthdays
+
+    @stats.timed('book.get_upcoming_birthdays')
     def get_upcoming_birthdays(self, days=7):
         """Retrieves and returns a list of upcoming birthdays within
         the specified number of days.
@@ -162,29 +450,18 @@ class AddressBook(Singleton, UserDict):
                 no expected birthdays.
 
         """
-        upcoming_birthdays = []
-        today = date.today()
-
-        for user, _ in self.data.items():
-            birth_date = self.data[user].show_birthday()
-            try:
-                birth_this_year = birth_date.replace(year=today.year)
-                if birth_this_year < today:
-                    birth_this_year = birth_date.replace(year=today.year+1)
-            except TypeError:
-                continue
-
-            if 0 <= (birth_this_year - today).days <= days:
-                birth_this_year = birth.adjust_for_weekend(birth_this_year)
-                congratulation_date_str = birth.date_to_string(birth_this_year)
-                upcoming_birthdays.append({
-                    "name": user,
-                    "congratulation_date": congratulation_date_str
-                })
+        upcoming_birthdays = [
+            {
+                "name": user,
+                "congratulation_date": birth.date_to_string(congratulation)
+            }
+            for congratulation, user in self.upcoming_birthdays(days)
+        ]
         if upcoming_birthdays:
             return birth.stringify_birthdays(upcoming_birthdays)
-        return 'No birthdays exspected next week.'
+        return f'No birthdays expected in the next {days} days.'
 
+    @stats.timed('book.delete')
     @decor.validate_one_arg
     def delete(self, contact_name: str) -> str:
         """Delete a contact record from the address book.
@@ -197,5 +474,12 @@ class AddressBook(Singleton, UserDict):
         """
         if contact_name not in self.data:
             return "Contact not found"
-        del self.data[contact_name]
+        self.version = next(VERSIONS)
+        removed = self.data.pop(contact_name)
+        for phone in removed.phones:
+            self._sync_phone(contact_name, phone)
+        if removed.birth_ordinal:
+            slot = birth.ordinal_slot(removed.birth_ordinal)
+            self.birthday_index[slot].pop(contact_name, None)
+        self.name_index.remove(contact_name)
         return "Contact deleted"
@@ -0,0 +1,215 @@
+"""imports"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from app.file import FileException
+from app.storage import backend
+
+# Names of the books of a folder: no separators, dots or other surprises
+# in a file name that comes from a client.
+BOOK_NAME = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def book_path(folder, name: str, suffix: str = '.pkl') -> Path:
+    """The file of a named book in a folder of books.
+
+    Raises:
+        ValueError: If the name is not 1 to 64 letters, digits, '_' or '-'.
+    """
+    if not BOOK_NAME.fullmatch(name):
+        raise ValueError(f"Invalid book name {name[:64]!r}")
+    return Path(folder) / f"{name}{suffix}"
+
+
+class Book:
+    """An open book of a BookRegistry.
+
+    Attributes:
+        path (Path): The database of the book.
+        contacts (AddressBook): The loaded book.
+        storage (Storage): The storage it was loaded from, with the cipher
+            of the book.
+        users (int): Sessions that opened the book and did not release
+            it yet; a book in use is never evicted.
+        used_at (float): time.monotonic() of the last release.
+    """
+    def __init__(self, path: Path, contacts, storage) -> None:
+        self.path = path
+        self.contacts = contacts
+        self.storage = storage
+        self.users = 0
+        self.used_at = time.monotonic()
+
+
+class BookRegistry:
+    """The address books open in one process, by path.
+
+    A book is loaded on first use, with the cipher of whoever opens it,
+    and shared by everybody who opens it afterwards with the same key.
+    Books nobody uses are closed (which saves their journal) and
+    forgotten once more than `capacity` books are open, least recently
+    used first, and after `idle` seconds without use. The defaults come
+    from the ASSISTANT_OPEN_BOOKS (64) and ASSISTANT_BOOK_IDLE_SECONDS
+    (600) environment variables.
+
+    The registry may be used from many threads. Opening, loading and
+    closing of one book are serialized, so a book that is being closed
+    is only loaded again from what the closing saved.
+
+    Methods:
+        - kdf_params: The KDF parameters to derive the key of a book with.
+        - add: Register a book loaded elsewhere.
+        - open: Get a book, loading it if needed.
+        - release: Hand a book back.
+        - evict: Close the books that are not needed.
+        - close: Close all books.
+    """
+    def __init__(self, capacity=None, idle=None) -> None:
+        self.capacity = capacity or int(
+            os.environ.get('ASSISTANT_OPEN_BOOKS', 64)
+        )
+        self.idle = idle or float(
+            os.environ.get('ASSISTANT_BOOK_IDLE_SECONDS', 600)
+        )
+        self.books = OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def __contains__(self, path) -> bool:
+        return Path(path) in self.books
+
+    def kdf_params(self, path) -> dict:
+        """The KDF parameters of a book, for Cipher(password, **params)."""
+        book = self.books.get(Path(path))
+        if book is not None:
+            cipher = book.storage.cipher
+            return {'salt': cipher.salt, 'iterations': cipher.iterations}
+        return backend(path).kdf_params(path)
+
+    def add(self, path, contacts, storage) -> Book:
+        """Registers a book the caller has loaded, as opened by it.
+
+        Returns:
+            Book: The book, to be released like one got from open.
+        """
+        path = Path(path)
+        book = Book(path, contacts, storage)
+        book.users = 1
+        with self.lock:
+            if path in self.books:
+                raise ValueError(f"{path} is already open")
+            self.books[path] = book
+        return book
+
+    def open(self, path, cipher):
+        """Gets a book for a session, loading it on first use.
+
+        Every open must be followed by a release of the book.
+
+        Args:
+            path (Path): The database of the book.
+            cipher (Cipher): The cipher of the password given for the
+                book, with its kdf_params; None for a book that is not
+                encrypted (Storage.ENCRYPTED).
+
+        Returns:
+            Book: The book, or None if the password is incorrect.
+        """
+        path = Path(path)
+        with self.__loader(path):
+            book = self.books.get(path)
+            if book is None:
+                storage = backend(path)(path, cipher)
+                contacts = storage.load()
+                if contacts == 'wrong pass':
+                    storage.close()
+                    return None
+                book = Book(path, contacts, storage)
+            elif book.storage.ENCRYPTED and not hmac.compare_digest(
+                book.storage.cipher.key, cipher.key
+            ):
+                return None
+            with self.lock:
+                book.users += 1
+                self.books[path] = book
+                self.books.move_to_end(path)
+        self.evict()
+        return book
+
+    def release(self, book: Book) -> None:
+        """Hands back a book got from open."""
+        with self.lock:
+            book.users -= 1
+            book.used_at = time.monotonic()
+            if book.path in self.books:
+                self.books.move_to_end(book.path)
+        self.evict()
+
+    def evict(self) -> list:
+        """Closes and forgets the books nobody uses, beyond the capacity
+        or idle for too long.
+
+        Returns:
+            list: The paths of the closed books.
+        """
+        with self.lock:
+            now = time.monotonic()
+            excess = len(self.books) - self.capacity
+            candidates = []
+            # Least recently used first: the scan ends at the first book
+            # that is needed, the ones after it were used later.
+            for path, book in self.books.items():
+                if book.users:
+                    continue
+                if excess <= 0 and now - book.used_at < self.idle:
+                    break
+                candidates.append(path)
+                excess -= 1
+        closed = []
+        for path in candidates:
+            loader = self.__loader(path)
+            # A book that is being opened is needed again.
+            if not loader.acquire(blocking=False):
+                continue
+            try:
+                with self.lock:
+                    book = self.books.get(path)
+                    if book is None or book.users:
+                        continue
+                    del self.books[path]
+                BookRegistry.__close(book)
+                closed.append(path)
+            finally:
+                loader.release()
+        return closed
+
+    def close(self) -> None:
+        """Closes all books, used or not."""
+        for path in list(self.books):
+            with self.__loader(path):
+                with self.lock:
+                    book = self.books.pop(path, None)
+                if book is not None:
+                    BookRegistry.__close(book)
+
+    @staticmethod
+    def __close(book: Book) -> None:
+        """Closes the storage of a book. A failed save is reported, its
+        changes stay in the journal for the next open."""
+        try:
+            book.storage.close()
+        except FileException as e:
+            sys.stderr.write(f"{e}\n")
+
+    def __loader(self, path: Path) -> threading.Lock:
+        """The lock that serializes opening and closing of a book."""
+        with self.lock:
+            return self.loading.setdefault(path, threading.Lock())
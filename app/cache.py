@@ -0,0 +1,145 @@
+"""imports"""
+import functools
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+
+# Rendered answers kept, 0 to turn the cache off.
+ENTRIES = int(os.environ.get('ASSISTANT_RENDER_CACHE', 1024))
+# Characters kept in all. An answer longer than a quarter of that (a
+# full listing of a large book) is not worth evicting the rest for and is
+# not kept.
+MAX_CHARS = 16 * 1024 * 1024
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered command answers, shared by the books
+    of the process.
+
+    Every answer is kept with the version of the book it was rendered
+    from (AddressBook.version). Changing the book gives it a new version,
+    so older answers are never returned; they are dropped when they are
+    found or pushed out by newer ones. Keys of cached() start with the id
+    of the book, and a book that reuses the id of a closed one still has
+    another version.
+
+    Attributes:
+        entries (int): The maximal number of answers kept.
+        max_chars (int): The maximal length of all answers kept.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that rendered the answer.
+    """
+    def __init__(self, entries: int = ENTRIES,
+                 max_chars: int = MAX_CHARS) -> None:
+        self.entries = entries
+        self.max_chars = max_chars
+        self.answers = OrderedDict()
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version: int):
+        """Returns the answer rendered for a key at a version, or None."""
+        with self.lock:
+            entry = self.answers.get(key)
+            if entry is not None and entry[0] == version:
+                self.answers.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self.__drop(key)
+            self.misses += 1
+            return None
+
+    @property
+    def longest(self) -> int:
+        """The length of the longest answer that is kept."""
+        return self.max_chars // 4
+
+    def put(self, key, version: int, answer: str) -> None:
+        """Keeps an answer, evicting the least recently used ones."""
+        if len(answer) > self.longest:
+            return
+        with self.lock:
+            if key in self.answers:
+                self.__drop(key)
+            self.answers[key] = (version, answer)
+            self.chars += len(answer)
+            while len(self.answers) > self.entries \
+                    or self.chars > self.max_chars:
+                self.__drop(next(iter(self.answers)))
+
+    def clear(self) -> None:
+        """Forgets all answers and counters."""
+        with self.lock:
+            self.answers.clear()
+            self.chars = self.hits = self.misses = 0
+
+    def report(self) -> str:
+        """The counters of the cache as a line of the stats command."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"render cache: {self.hits} hits, {self.misses} misses " \
+            f"({rate:.1f}% hits), {len(self.answers)} answers kept\n"
+
+    def __drop(self, key) -> None:
+        _, answer = self.answers.pop(key)
+        self.chars -= len(answer)
+
+
+CACHE = RenderCache()
+
+
+def keep_lines(lines, key, version: int):
+    """Passes a lazily rendered answer through, keeping it in CACHE once
+    it is complete, unless it grew too long to keep."""
+    parts, length = [], 0
+    for line in lines:
+        if parts is not None:
+            length += len(line)
+            parts.append(line)
+            if length > CACHE.longest:
+                parts = None
+        yield line
+    if parts is not None:
+        CACHE.put(key, version, ''.join(parts))
+
+
+def cached(name: str, key):
+    """Decorator for execute of a command whose answer only depends on its
+    arguments and the book, to keep the rendered answer in CACHE.
+
+    Args:
+        name (str): The command.
+        key (callable): Takes the arguments of the command and returns a
+            hashable key of everything else the answer depends on.
+
+    Answers that are iterators stay lazy and are kept when they have been
+    read to the end (keep_lines). Books without a version (those of other
+    storages) are not cached.
+    """
+    def decorator(execute):
+        if not CACHE.entries:
+            return execute
+
+        @functools.wraps(execute)
+        def inner(command):
+            version = getattr(command.contacts, 'version', None)
+            if version is None:
+                return execute(command)
+            entry = (id(command.contacts), name, key(command.args))
+            answer = CACHE.get(entry, version)
+            if answer is not None:
+                return answer
+            answer = execute(command)
+            if isinstance(answer, Iterator):
+                return keep_lines(answer, entry, version)
+            answer = str(answer)
+            CACHE.put(entry, version, answer)
+            return answer
+
+        return inner
+
+    return decorator
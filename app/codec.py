@@ -0,0 +1,99 @@
+"""imports"""
+import pickle
+import struct
+from app.record import Phone, Record
+
+VERSION = 1
+# Pickled data starts with the PROTO opcode, encoded blocks with VERSION.
+PICKLE = 0x80
+
+# Block: version, number of records.
+BLOCK = struct.Struct('>BI')
+# Record: name length in bytes, number of phones, birthday ordinal (0 if
+# none); followed by the UTF-8 name and the 5 byte (40 bit) phones.
+RECORD = struct.Struct('>HHI')
+
+
+class CodecError(ValueError):
+    """Raised for data that is not a block of encoded records."""
+
+
+def encode_records(records) -> bytes:
+    """Encodes records into one block.
+
+    The block needs no class paths to be read and only holds strings,
+    integers and bytes, so decoding it can not run code.
+
+    Args:
+        records (iterable): Records to encode.
+
+    Returns:
+        bytes: The block.
+
+    Raises:
+        CodecError: If a name or a list of phones is too long for the
+            format (64 KiB of name, 65535 phones).
+    """
+    parts, count, pack = [b''], 0, RECORD.pack
+    for record in records:
+        name = record.name.encode('utf-8')
+        phones = record.packed_phones
+        try:
+            parts.append(pack(len(name), len(phones) // Phone.SIZE,
+                              record.birth_ordinal))
+        except struct.error as e:
+            raise CodecError(f"Can not encode {record.name[:30]}: {e}") from e
+        parts.append(name)
+        parts.append(phones)
+        count += 1
+    parts[0] = BLOCK.pack(VERSION, count)
+    return b''.join(parts)
+
+
+def decode_records(data: bytes) -> list:
+    """Decodes a block made by encode_records.
+
+    Args:
+        data (bytes): The block.
+
+    Returns:
+        list: The records, in the encoded order.
+
+    Raises:
+        CodecError: If the block has another version or is truncated.
+    """
+    view = memoryview(data)
+    if len(view) < BLOCK.size:
+        raise CodecError("Truncated block")
+    version, count = BLOCK.unpack_from(view)
+    if version != VERSION:
+        raise CodecError(f"Unsupported codec version {version}")
+    records, position = [None] * count, BLOCK.size
+    unpack, header, size = RECORD.unpack_from, RECORD.size, Phone.SIZE
+    new = Record.__new__
+    try:
+        for index in range(count):
+            name_length, phones, birth_ordinal = unpack(view, position)
+            position += header
+            name_end = position + name_length
+            phones_end = name_end + phones * size
+            if phones_end > len(view):
+                raise CodecError("Truncated block")
+            record = new(Record)
+            record.name = str(view[position:name_end], 'utf-8')
+            record.packed_phones = bytes(view[name_end:phones_end])
+            record.birth_ordinal = birth_ordinal
+            records[index] = record
+            position = phones_end
+    except struct.error as e:
+        raise CodecError("Truncated block") from e
+    return records
+
+
+def decode_any(data: bytes) -> list:
+    """Decodes a block, or the pickled record of data written before the
+    codec (SQLite rows), which is trusted as it was decrypted with the key
+    of the book."""
+    if data[:1] == bytes([PICKLE]):
+        return [pickle.loads(data)]
+    return decode_records(data)
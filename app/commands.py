@@ -1,6 +1,11 @@
 """imports"""
 from abc import ABC, abstractmethod
-from app.file import FileProcessor as fp
+from datetime import date
+from app.cache import CACHE
+from app.file import FileException
+from app import stats, transfer
+from app.registry import register, specs
+from app.snapshot import write_snapshot
 
 
 class Command(ABC):
@@ -9,36 +14,54 @@ class Command(ABC):
         pass
 
 
+@register('close', aliases=('exit',))
 class Close(Command):
-    def __init__(self, database, contacts, cryptograph) -> None:
-        self.database = database
-        self.contacts = contacts
-        self.cryptograph = cryptograph
+    def __init__(self, storage) -> None:
+        self.storage = storage
 
     def execute(self) -> str:
-        fp.write_file(self.database, self.contacts, self.cryptograph)
+        try:
+            self.storage.close()
+        except FileException as e:
+            return f"{e}\nGood bye!\n"
         return "Good bye!\n"
 
 
+@register('hello')
 class Hello(Command):
     def execute(self) -> str:
         return "How can I help you?\n"
 
 
+@register('help')
 class Help(Command):
     def execute(self) -> str:
-        return "'add [name] [phone]'\t\t\tto add new contact " \
-            "(phone must be 10 digits).\n" \
-            "'add-birthday [name] [birth date]'\tto add date" \
-            "of birth (date must be in format 'DD.MM.YYYY').\n" \
-            "'all'\t\t\t\t\tto review all contacts.\n" \
-            "'birthdays'\t\t\t\tto show upcoming birthdays in 7 days.\n" \
-            "'change [name] [old phone] [new phone]'\t" \
-            "to change contact's phone number.\n" \
-            "'del [name]'\t\t\t\tto delete contact from list.\n" \
-            "'phone [name]'\t\t\t\tto review contact's phone number.\n" \
-            "'show-birthday [name]'\t\t\tto show birth date of contact.\n" \
-            "'close' or 'exit'\t\t\tto exit assistant.\n"
+        return Help.TEXT + ''.join(
+            f"{spec.help}\n" for spec in specs() if spec.help
+        )
+
+    TEXT = "'add [name] [phone]'\t\t\tto add new contact " \
+        "(phone must be 10 digits).\n" \
+        "'add-birthday [name] [birth date]'\tto add date" \
+        "of birth (date must be in format 'DD.MM.YYYY').\n" \
+        "'all [--page N] [--size M] [--sort] [--filter text]'\n" \
+        "\t\t\t\t\tto review all contacts or a page of them.\n" \
+        "'birthdays [days]'\t\t\tto show upcoming birthdays " \
+        "in 7 (or [days]) days.\n" \
+        "'change [name] [old phone] [new phone]'\t" \
+        "to change contact's phone number.\n" \
+        "'del [name]'\t\t\t\tto delete contact from list.\n" \
+        "'phone [name]'\t\t\t\tto review contact's phone number.\n" \
+        "'show-birthday [name]'\t\t\tto show birth date of contact.\n" \
+        "'search [--fuzzy] [text]'\t\tto find contacts by the start " \
+        "of the name (or similar names).\n" \
+        "'import [file]'\t\t\t\tto import contacts from .csv/.jsonl.\n" \
+        "'export [file]'\t\t\t\tto export contacts to .csv/.jsonl.\n" \
+        "'snapshot [file]'\t\t\tto write a read-only snapshot " \
+        "(not encrypted!).\n" \
+        "'stats [--histogram|--reset]'\t\tto show timings of the " \
+        "assistant.\n" \
+        "'close' or 'exit'\t\t\tto exit assistant.\n"
 
 
 class WrongCommand(Command):
@@ -46,41 +69,62 @@ class WrongCommand(Command):
         return "Invalid command.\n"
 
 
+class InvalidArgs(Command):
+    def execute(self):
+        return "invalid args\n"
+
+
+@register('add', arity=(2, 2), writes=True)
 class Add(Command):
-    def __init__(self, contacts, args) -> None:
+    def __init__(self, contacts, args, storage) -> None:
         self.contacts = contacts
         self.args = args
+        self.storage = storage
 
     def execute(self) -> str:
-        return f"{self.contacts.add_record(self.args)}\n"
+        result = self.contacts.add_record(self.args)
+        self.storage.append(self.contacts, 'add', self.args)
+        return f"{result}\n"
 
+@register('addbirthday', arity=(2, 2), writes=True)
 class AddBirthday(Command):
-    def __init__(self, contacts, args) -> None:
+    def __init__(self, contacts, args, storage) -> None:
         self.contacts = contacts
         self.args = args
+        self.storage = storage
 
     def execute(self):
-        name, date = self.args
-        return f"{self.contacts.birthday_date(name, date)}\n"
+        result = self.contacts.birthday_date(*self.args)
+        self.storage.append(self.contacts, 'add-birthday', self.args)
+        return f"{result}\n"
 
+@register('change', arity=(3, 3), writes=True)
 class Change(Command):
-    def __init__(self, contacts, *args) -> None:
+    def __init__(self, contacts, args, storage) -> None:
         self.contacts = contacts
         self.args = args
+        self.storage = storage
 
     def execute(self):
-        return f"{self.contacts.change_phone(self.args)}\n"
+        result = self.contacts.change_phone(*self.args)
+        self.storage.append(self.contacts, 'change', self.args)
+        return f"{result}\n"
 
 
+@register('del', writes=True)
 class Delete(Command):
-    def __init__(self, contacts, args) -> None:
+    def __init__(self, contacts, args, storage) -> None:
         self.contacts = contacts
         self.args = args
+        self.storage = storage
 
     def execute(self):
-        return f"{self.contacts.delete(self.args)}\n"
+        result = self.contacts.delete(self.args)
+        self.storage.append(self.contacts, 'delete', self.args)
+        return f"{result}\n"
 
 
+@register('phone', cache_key=tuple)
 class Phone(Command):
     def __init__(self, contacts, args) -> None:
         self.contacts = contacts
@@ -90,14 +134,56 @@ class Phone(Command):
         return self.contacts.find(self.args)
 
 
+@register('all', cache_key=tuple)
 class All(Command):
-    def __init__(self, contacts) -> None:
+    OPTIONS = {'--page': 'page', '--size': 'size', '--filter': 'contains'}
+
+    def __init__(self, contacts, args) -> None:
         self.contacts = contacts
+        self.args = args
 
     def execute(self):
-        return self.contacts.show_all()
+        options = {}
+        args = iter(self.args)
+        for arg in args:
+            if arg == '--sort':
+                options['sort'] = True
+            elif arg in All.OPTIONS:
+                options[All.OPTIONS[arg]] = next(args, None)
+            else:
+                return "invalid args\n"
+        for option in ('page', 'size'):
+            if option not in options:
+                continue
+            if not (options[option] or '').isdigit() \
+                    or int(options[option]) < 1:
+                return "invalid args\n"
+            options[option] = int(options[option])
+        if options.get('size') and 'page' not in options:
+            options['page'] = 1
+        if 'contains' in options and options['contains'] is None:
+            return "invalid args\n"
+        return self.contacts.show_all(**options)
+
+
+@register('search', arity=(1, None))
+class Search(Command):
+    def __init__(self, contacts, args) -> None:
+        self.contacts = contacts
+        self.args = args
+
+    def execute(self):
+        fuzzy = self.args[:1] == ['--fuzzy']
+        text = ' '.join(self.args[1:] if fuzzy else self.args)
+        if not text:
+            return "invalid args\n"
+        names = self.contacts.search(text, fuzzy)
+        if not names:
+            return "No contacts found.\n"
+        return (f"{self.contacts.data[name]}\n" for name in names)
 
 
+@register('showbirthday', cache_key=tuple)
 class ShowBirthday(Command):
     def __init__(self, contacts, args) -> None:
         self.contacts = contacts
@@ -107,9 +193,87 @@ class ShowBirthday(Command):
         return f"{self.contacts.show_birth_date(self.args)}\n"
 
 
+@register('birthdays', arity=(0, 1),
+          validator=lambda args: all(arg.isdigit() for arg in args),
+          cache_key=lambda args: (tuple(args), date.today()))
 class Birthdays(Command):
-    def __init__(self, contacts) -> None:
+    def __init__(self, contacts, args) -> None:
         self.contacts = contacts
+        self.args = args
+
+    def execute(self):
+        days = int(self.args[0]) if self.args else 7
+        return f"{self.contacts.get_upcoming_birthdays(days)}\n"
+
+
+@register('import', arity=(1, 1), writes=True, files=True)
+class Import(Command):
+    def __init__(self, contacts, args, storage) -> None:
+        self.contacts = contacts
+        self.args = args
+        self.storage = storage
+
+    def execute(self):
+        try:
+            imported, rejected = transfer.import_contacts(
+                self.contacts, self.args[0]
+            )
+        except (OSError, FileException) as e:
+            return f"{e}\n"
+        if imported:
+            self.storage.compact(self.contacts)
+        message = f"Imported {imported} contacts."
+        if rejected:
+            message += f" {rejected} rows rejected, " \
+                f"see {self.args[0]}.errors.csv"
+        return f"{message}\n"
+
+
+@register('export', arity=(1, 1), files=True)
+class Export(Command):
+    def __init__(self, contacts, args) -> None:
+        self.contacts = contacts
+        self.args = args
+
+    def execute(self):
+        try:
+            exported = transfer.export_contacts(self.contacts, self.args[0])
+        except (OSError, FileException) as e:
+            return f"{e}\n"
+        return f"Exported {exported} contacts.\n"
+
+
+@register('snapshot', arity=(1, 1), files=True)
+class Snapshot(Command):
+    def __init__(self, contacts, args, storage) -> None:
+        self.contacts = contacts
+        self.args = args
+        self.storage = storage
+
+    def execute(self):
+        try:
+            written = write_snapshot(self.args[0], self.contacts)
+        except OSError as e:
+            return f"{e}\n"
+        return f"Wrote {written} contacts to {self.args[0]}.\n" \
+            "Warning: the snapshot is NOT encrypted, anyone who can read " \
+            "the file can read the contacts.\n"
+
+
+@register('stats', arity=(0, 1),
+          validator=lambda args: args in ([], ['--histogram'], ['--reset']),
+          shared=lambda args: args == ['--reset'])
+class Stats(Command):
+    def __init__(self, args) -> None:
+        self.args = args
 
     def execute(self):
-        return f"{self.contacts.get_upcoming_birthdays()}\n"
+        if self.args == ['--reset']:
+            stats.reset()
+            CACHE.clear()
+            return "Statistics reset.\n"
+        if not stats.ENABLED:
+            return "Statistics are off, start the assistant with " \
+                "ASSISTANT_STATS=1.\n" + CACHE.report()
+        return stats.report(histograms=self.args == ['--histogram']) \
+            + CACHE.report()
@@ -0,0 +1,67 @@
+"""imports"""
+import re
+import string
+import app.commands as cmd
+from app.registry import COMMANDS
+
+EXIT_COMMANDS = ('close', 'exit')
+# Failures of a single command, answered instead of ending the session: a
+# contact that is not in the book (KeyError) or arguments the command
+# could not use (IndexError, ValueError).
+COMMAND_ERRORS = (KeyError, IndexError, ValueError)
+NOT_A_LETTER = re.compile("[^A-Za-z]")
+# Lowercases ASCII letters and drops the other ASCII characters of a command
+# in a single pass ('Add-Birthday' -> 'addbirthday'). Plain words skip it,
+# str.lower is faster still.
+COMMAND_TABLE = str.maketrans(
+    string.ascii_uppercase, string.ascii_lowercase,
+    ''.join(chr(code) for code in range(128) if not chr(code).isalpha())
+)
+
+
+def parse_input(user_input: str) -> tuple:
+    """Split the user's input into command and arguments.
+
+    Args:
+        user_input (str): User input string.
+
+    Returns:
+        tuple: A tuple containing the command and its arguments. The command
+            is '' for blank input.
+    """
+    command, *args = user_input.split() or ['']
+    if command.isascii() and command.isalpha():
+        command = command.lower()
+    else:
+        command = command.translate(COMMAND_TABLE)
+        if not command.isascii():
+            command = NOT_A_LETTER.sub("", command.lower())
+    return command, *args
+
+
+def command_error(error: Exception) -> str:
+    """The answer to a command that failed with one of COMMAND_ERRORS."""
+    if isinstance(error, KeyError):
+        return f"Contact not found: {error.args[0]}\n"
+    return f"{error}\n"
+
+
+def make_command(command: str, args: list, contacts, storage) -> cmd.Command:
+    """Creates the command object for a parsed user input.
+
+    Args:
+        command (str): The command, as returned by parse_input.
+        args (list): The arguments of the command.
+        contacts (AddressBook): The book the command works on.
+        storage (Storage): Where the changes of the book are persisted.
+
+    Returns:
+        Command: The command, WrongCommand if it is unknown and InvalidArgs
+            if its arguments do not match its schema.
+    """
+    spec = COMMANDS.get(command)
+    if spec is None:
+        return cmd.WrongCommand()
+    if not spec.accepts(args):
+        return cmd.InvalidArgs()
+    return spec.factory(args, contacts, storage)
@@ -1,7 +1,47 @@
 """imports"""
+import base64
+import functools
+import gc
+import json
+import lzma
+import os
 import pickle
+import zlib
+from bisect import bisect_right
+from contextlib import contextmanager
+from cryptography.fernet import InvalidToken
+from app import codec, stats
 from app.book import AddressBook
 
+MAGIC = b'ABK1'
+SEGMENT_SIZE = 64 * 1024
+# Compression of the segments before encryption: compress(data, level) and
+# decompress(data) by the name kept in the file header.
+COMPRESSORS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level),
+             lzma.decompress),
+}
+DEFAULT_LEVELS = {'zlib': 6, 'lzma': 6}
+
+
+@contextmanager
+def paused_gc():
+    """Pauses the cyclic garbage collector while a book is loaded.
+
+    Loading makes millions of objects that can not form cycles (records,
+    strings, index lists), and the collector passes over the growing heap
+    that their allocation triggers take longer than making them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 class FileException(Exception):
     """Custom exception to handle problems if file is missing or not readable
 
@@ -11,7 +51,31 @@ class FileException(Exception):
 
 
 class FileProcessor:
-    """_summary_"""
+    """Reading and writing of the encrypted contacts file.
+
+    The file starts with a small header: MAGIC, the length of a JSON
+    document and the document itself. It holds the KDF parameters and
+    a key verifier, so a wrong password is rejected without decrypting
+    the book.
+
+    The header is followed by segments of about SEGMENT_SIZE bytes of
+    records sorted by name and encoded with app.codec (its version is
+    'codec' in the header), each encrypted as its own Fernet token and
+    prefixed with its length. An encrypted JSON index of the first and
+    last name and the position of every segment closes the file,
+    followed by the 8 byte offset of that index. Books are read one
+    segment at a time, and a single contact or a range of names only
+    needs the segments that can hold it.
+
+    Segments and the index can be compressed with zlib or lzma before
+    they are encrypted ('compression' in the header, ASSISTANT_COMPRESSION
+    when writing). Reading finds the compression in the header.
+
+    Files written before the header existed (a bare Fernet token of the
+    pickled AddressBook), headers without 'layout' (the same token after
+    a header) and segments without 'codec' (pickled records and index)
+    are still readable.
+    """
     @staticmethod
     def __read_file_check(func) -> callable:
         """Decorator to handle file not found errors."""
@@ -25,6 +89,78 @@ class FileProcessor:
         return inner
 
     @staticmethod
+    def __parse_header(file) -> dict:
+        """Reads the header at the start of an open file.
+
+        Leaves the file positioned at the encrypted payload, which is the
+        start of the file if there is no header.
+        """
+        if file.read(len(MAGIC)) != MAGIC:
+            file.seek(0)
+            return {}
+        length = int.from_bytes(file.read(4), 'big')
+        return json.loads(file.read(length))
+
+    @staticmethod
+    def read_header(database) -> dict:
+        """Reads the header of a contacts file.
+
+            Returns:
+                dict: The header, empty if the file is missing or was
+                written without one.
+            """
+        try:
+            with open(database, 'rb') as file:
+                return FileProcessor.__parse_header(file)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def compression() -> tuple:
+        """Reads the compression of new files from ASSISTANT_COMPRESSION:
+        'zlib' or 'lzma', optionally with a level ('zlib:9', 'lzma:1'),
+        or 'none' (the default).
+
+            Returns:
+                tuple: The name and the level, or (None, None).
+
+            Raises:
+                FileException: If the setting is not valid.
+            """
+        setting = os.environ.get('ASSISTANT_COMPRESSION', 'none').lower()
+        name, _, level = setting.partition(':')
+        if name in ('', 'none'):
+            return None, None
+        if name not in COMPRESSORS or level and not (
+            level.isdigit() and 0 <= int(level) <= 9
+        ):
+            raise FileException(
+                f"Unknown compression {setting!r}, use zlib[:0-9], "
+                "lzma[:0-9] or none"
+            )
+        return name, int(level) if level else DEFAULT_LEVELS[name]
+
+    @staticmethod
+    def compressor(compression: tuple):
+        """The compress function of a (name, level) compression, None for
+        no compression."""
+        name, level = compression
+        if name is None:
+            return None
+        return functools.partial(COMPRESSORS[name][0], level=level)
+
+    @staticmethod
+    def kdf_params(header: dict) -> dict:
+        """Converts a file header into keyword arguments for Cipher."""
+        if not header:
+            return {}
+        return {
+            'salt': base64.b64decode(header['salt']),
+            'iterations': header['iterations'],
+        }
+
+    @staticmethod
+    @stats.timed('file.read')
     @__read_file_check
     def read_file(database, cipher) -> dict:
         """Read the contents of a ciphered file containing contacts.
@@ -34,15 +170,76 @@ class FileProcessor:
                 and phone numbers as values.
             """
         with open(database, 'rb') as file:
-            ciphered_dict = file.read()
-        try:
-            decrypted_dict = cipher.decrypt_data(ciphered_dict)
-        except FileException:
-            return 'wrong pass'
+            header = FileProcessor.__parse_header(file)
+            if header and not cipher.check(base64.b64decode(header['check'])):
+                return 'wrong pass'
+            try:
+                if header.get('layout') == 'segments':
+                    book = AddressBook()
+                    with paused_gc():
+                        for record in FileProcessor.__stream_records(
+                            file, cipher, header
+                        ):
+                            book.data[record.name] = record
+                        book.rebuild_index()
+                    book.journal_seq = header['seq']
+                    return book
+                decrypted_dict = cipher.decrypt_data(file.read())
+            except (FileException, InvalidToken):
+                return 'wrong pass'
+            except codec.CodecError as e:
+                raise FileException(f"{database} is damaged: {e}") from e
         contacts_dict = pickle.loads(decrypted_dict)
         return contacts_dict
 
     @staticmethod
+    def read_record(database, cipher, contact_name: str):
+        """Reads a single contact, decrypting only the segment holding it.
+
+            Returns:
+                Record: The contact record, or None if there is no such
+                contact.
+            """
+        for record in FileProcessor.read_range(
+            database, cipher, contact_name, contact_name
+        ):
+            return record
+        return None
+
+    @staticmethod
+    def read_range(database, cipher, first: str, last: str):
+        """Yields the contacts with names from first to last inclusive,
+        in name order, decrypting only the segments that can hold them.
+
+            Raises:
+                FileException: If the file is not in the segments layout.
+            """
+        with open(database, 'rb') as file:
+            header = FileProcessor.__parse_header(file)
+            if header.get('layout') != 'segments':
+                raise FileException(f"{database} has no segment index")
+            version = header.get('codec')
+            file.seek(-8, os.SEEK_END)
+            file.seek(int.from_bytes(file.read(8), 'big'))
+            index = FileProcessor.__read_index(
+                FileProcessor.__read_token(file, cipher, header), version
+            )
+            last_names = [segment_last for _, segment_last, _ in index]
+            start = bisect_right(last_names, first)
+            if start and last_names[start - 1] == first:
+                start -= 1
+            for segment_first, _, offset in index[start:]:
+                if segment_first > last:
+                    return
+                file.seek(offset)
+                for record in FileProcessor.__records(
+                    FileProcessor.__read_token(file, cipher, header), version
+                ):
+                    if first <= record.name <= last:
+                        yield record
+
+    @staticmethod
+    @stats.timed('file.write')
     def write_file(database, contacts_dict: dict, cipher) -> None:
         """Writes the given dictionary of contacts to a file, with encryption.
 
@@ -50,7 +247,226 @@ class FileProcessor:
                 contacts_dict (dict): A dictionary representing the contacts,
                 with names as keys and phone numbers as values.
             """
-        serialized_data = pickle.dumps(contacts_dict)
-        ciphered_dict = cipher.encrypt_data(serialized_data)
-        with open(database, 'wb') as file:
-            file.write(ciphered_dict)
+        FileProcessor.write_segments(
+            database,
+            FileProcessor.iter_segments(contacts_dict.data),
+            contacts_dict.journal_seq,
+            cipher,
+        )
+
+    @staticmethod
+    def iter_chunks(records: dict, segment_size: int = SEGMENT_SIZE):
+        """Splits the contacts, sorted by name, into the records of the
+        segments of a file.
+
+            Args:
+                records (dict): Names to records, the data of a book or
+                a frozen copy of it (AddressBook.freeze).
+
+            Yields:
+                list: The records of a segment.
+            """
+        chunk, size = [], 0
+        for contact_name in sorted(records):
+            record = records[contact_name]
+            # The encoded size, counting the name in characters.
+            length = codec.RECORD.size + len(contact_name) \
+                + len(record.packed_phones)
+            if chunk and size + length > segment_size:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(record)
+            size += length
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def iter_segments(records: dict, segment_size: int = SEGMENT_SIZE):
+        """Serializes the contacts into plaintext segments.
+
+            Args:
+                records (dict): Names to records, see iter_chunks.
+
+            Yields:
+                tuple: The first name, the last name and the encoded
+                records of a segment.
+            """
+        for chunk in FileProcessor.iter_chunks(records, segment_size):
+            yield chunk[0].name, chunk[-1].name, codec.encode_records(chunk)
+
+    @staticmethod
+    def write_segments(database, segments, journal_seq: int, cipher,
+                       compression=None) -> None:
+        """Encrypts serialized segments and replaces the file with them.
+
+            Args:
+                segments (iterable): Segments made by iter_segments.
+                journal_seq (int): The last journal entry in the snapshot.
+                compression (tuple, optional): The name and level of the
+                compression, ASSISTANT_COMPRESSION if not given.
+            """
+        compression = compression or FileProcessor.compression()
+        compress = FileProcessor.compressor(compression)
+        FileProcessor.write_tokens(
+            database,
+            (
+                (first, last, FileProcessor.seal(plaintext, cipher, compress))
+                for first, last, plaintext in segments
+            ),
+            journal_seq,
+            cipher,
+            compression,
+        )
+
+    @staticmethod
+    def write_tokens(database, tokens, journal_seq: int, cipher,
+                     compression: tuple) -> None:
+        """Replaces the file with already encrypted segments.
+
+            Args:
+                tokens (iterable): The first name, the last name and the
+                sealed (FileProcessor.seal) segment, in name order.
+                journal_seq (int): The last journal entry in the snapshot.
+                compression (tuple): The name and level of the compression
+                the segments were sealed with.
+            """
+        name, level = compression
+        header = {
+            'kdf': 'pbkdf2-sha256',
+            'salt': base64.b64encode(cipher.salt).decode('ascii'),
+            'iterations': cipher.iterations,
+            'check': base64.b64encode(cipher.verifier()).decode('ascii'),
+            'layout': 'segments',
+            'segment_size': SEGMENT_SIZE,
+            'codec': codec.VERSION,
+            'seq': journal_seq,
+        }
+        if name is not None:
+            header['compression'] = name
+            header['level'] = level
+        header = json.dumps(header).encode('utf-8')
+        index = []
+        temporary = f"{database}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(MAGIC + len(header).to_bytes(4, 'big') + header)
+            for first, last, token in tokens:
+                index.append((first, last, file.tell()))
+                FileProcessor.__write_token(file, token)
+            index_offset = file.tell()
+            FileProcessor.__write_token(file, FileProcessor.seal(
+                json.dumps(index).encode('utf-8'), cipher,
+                FileProcessor.compressor(compression)
+            ))
+            file.write(index_offset.to_bytes(8, 'big'))
+            FileProcessor.sync(file)
+        FileProcessor.replace(temporary, database)
+
+    @staticmethod
+    def sync(file) -> None:
+        """Flushes an open file down to the disk."""
+        file.flush()
+        os.fsync(file.fileno())
+
+    @staticmethod
+    def replace(temporary, database) -> None:
+        """Puts a written and synced temporary file in place of the
+        database.
+
+        The rename is atomic, so after a crash the database is either the
+        old or the new file, never a torn one. The directory is synced too,
+        so the rename itself survives a power loss.
+        """
+        os.replace(temporary, database)
+        if os.name == 'posix':
+            directory = os.open(os.path.dirname(os.path.abspath(database)),
+                                os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    @staticmethod
+    def seal(plaintext: bytes, cipher, compress=None) -> bytes:
+        """Compresses (if compress is given) and encrypts a segment."""
+        if compress is not None:
+            plaintext = compress(plaintext)
+        return cipher.encrypt_data(plaintext)
+
+    @staticmethod
+    def unseal(token: bytes, cipher, header: dict) -> bytes:
+        """Decrypts a segment and decompresses it as the header says.
+
+            Raises:
+                CodecError: If the compression is unknown or the data can
+                not be decompressed.
+            """
+        plaintext = cipher.decrypt_data(token)
+        name = header.get('compression')
+        if name is None:
+            return plaintext
+        if name not in COMPRESSORS:
+            raise codec.CodecError(f"Unknown compression {name!r}")
+        try:
+            return COMPRESSORS[name][1](plaintext)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise codec.CodecError(f"Can not decompress: {e}") from e
+
+    @staticmethod
+    def read_tokens(database):
+        """Yields the encrypted segments of a file in the segments layout
+        as they are stored, for readers that unseal them elsewhere
+        (app.parallel)."""
+        with open(database, 'rb') as file:
+            FileProcessor.__parse_header(file)
+            yield from FileProcessor.__tokens(file)
+
+    @staticmethod
+    def __write_token(file, token: bytes) -> None:
+        file.write(len(token).to_bytes(4, 'big'))
+        file.write(token)
+
+    @staticmethod
+    def __read_token(file, cipher, header: dict) -> bytes:
+        length = int.from_bytes(file.read(4), 'big')
+        return FileProcessor.unseal(file.read(length), cipher, header)
+
+    @staticmethod
+    def __tokens(file):
+        """Yields the encrypted segments of an open file, which is
+        positioned after the header."""
+        position = file.tell()
+        file.seek(-8, os.SEEK_END)
+        index_offset = int.from_bytes(file.read(8), 'big')
+        file.seek(position)
+        while file.tell() < index_offset:
+            length = int.from_bytes(file.read(4), 'big')
+            yield file.read(length)
+
+    @staticmethod
+    def __read_index(plaintext: bytes, version) -> list:
+        """Decodes the segment index, pickled in files without 'codec'."""
+        if version is None:
+            return pickle.loads(plaintext)
+        return json.loads(plaintext)
+
+    @staticmethod
+    def __records(plaintext: bytes, version):
+        """Yields the records of one decrypted segment."""
+        if version is not None:
+            yield from codec.decode_records(plaintext)
+            return
+        view, position = memoryview(plaintext), 0
+        while position < len(view):
+            length = int.from_bytes(view[position:position + 4], 'big')
+            position += 4
+            yield pickle.loads(view[position:position + length])
+            position += length
+
+    @staticmethod
+    def __stream_records(file, cipher, header: dict):
+        """Yields all records of an open file, one segment at a time."""
+        for token in FileProcessor.__tokens(file):
+            yield from FileProcessor.__records(
+                FileProcessor.unseal(token, cipher, header),
+                header.get('codec')
+            )
@@ -1,6 +1,11 @@
 """imports"""
-from datetime import datetime, timedelta
-from app.record import Record
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from app.record import Birthday, Record
+
+# Days before each month in a leap year, so every (month, day) pair,
+# February 29 included, gets its own slot out of 366.
+DAYS_BEFORE_MONTH = (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
 
 class Decorators:
     """Collection of decorators for AddressBook"""
@@ -39,7 +44,7 @@ class Decorators:
             name = args[0]
             date = args[1]
             try:
-                datetime.strptime(date, "%d.%m.%Y")
+                Birthday.parse(date)
                 return func(contacts, name, date)
             except ValueError:
                 return "Date doesn't exist"
@@ -81,6 +86,27 @@ class Decorators:
 
 class BirthdayFunctions:
     """Collection of submethods for AddressBook-Birthday"""
+    SLOTS = 366
+
+    @staticmethod
+    def day_slot(birthday: datetime) -> int:
+        """Returns the day of year slot (0-365) of a date, counted as if
+        the year were a leap year.
+
+        Args:
+            birthday (datetime): The date to place in the calendar.
+
+        Returns:
+            int: The slot of the date's month and day.
+        """
+        return DAYS_BEFORE_MONTH[birthday.month - 1] + birthday.day - 1
+
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def ordinal_slot(birth_ordinal: int) -> int:
+        """Returns the day of year slot of a date ordinal, see day_slot."""
+        return BirthdayFunctions.day_slot(date.fromordinal(birth_ordinal))
+
     @staticmethod
     def find_next_weekday(start_date, weekday) -> datetime:
         """Finds the date of the next specified weekday after the given start
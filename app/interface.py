@@ -1,4 +1,5 @@
 """imports"""
+import sys
 from abc import ABC, abstractmethod
 
 
@@ -11,6 +12,11 @@ class Interface(ABC):
     def answer(self, phrase):
         pass
 
+    def answer_lines(self, lines):
+        """Sends a long answer piece by piece, as it is produced."""
+        for line in lines:
+            self.answer(line)
+
 
 class CommandLineInterface(Interface):
 
@@ -19,3 +25,9 @@ class CommandLineInterface(Interface):
 
     def answer(self, phrase):
         print(phrase)
+
+    def answer_lines(self, lines):
+        write = sys.stdout.write
+        for line in lines:
+            write(line)
+        write('\n')
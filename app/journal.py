@@ -0,0 +1,273 @@
+"""imports"""
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+from cryptography.fernet import InvalidToken
+from app import parallel
+from app.file import FileException, FileProcessor as fp
+
+
+class Journal:
+    """Append-only write-ahead journal of AddressBook mutations.
+
+    Every mutating command is written to the journal as a separately
+    encrypted entry right after it is executed, so a crash loses at most
+    the command being typed. The journal lives next to the database file
+    and is folded into a new snapshot of the book in a background thread
+    once it grows past `compact_every` entries, or at the first change
+    `compact_after` seconds after the last snapshot. The defaults come
+    from the ASSISTANT_AUTOSAVE_CHANGES and ASSISTANT_AUTOSAVE_SECONDS
+    environment variables. Snapshots are compressed as
+    ASSISTANT_COMPRESSION says (FileProcessor.compression), and written by
+    ASSISTANT_WORKERS processes (app.parallel) if there are more than one.
+
+    Every entry carries a sequence number. The snapshot remembers the last
+    sequence number it contains (AddressBook.journal_seq), so entries that
+    are already part of the snapshot are skipped on replay.
+
+    A compaction moves the journal aside (.journal.old) and deletes it
+    once the snapshot is written. If the snapshot fails, the old journal
+    stays, the next compaction appends the journal to it instead of
+    replacing it, and wait() and close() raise the error.
+
+    Methods:
+        - replay: Apply journal entries on top of the loaded snapshot.
+        - append: Write a mutation to the journal.
+        - compact: Write a new snapshot and drop the covered entries.
+        - close: Flush the journal and wait for a running compaction.
+    """
+    OPERATIONS = {
+        'add': lambda contacts, args: contacts.add_record(list(args)),
+        'add-birthday': lambda contacts, args: contacts.birthday_date(*args),
+        'change': lambda contacts, args: contacts.change_phone(*args),
+        'delete': lambda contacts, args: contacts.delete(list(args)),
+    }
+
+    def __init__(self, database, cipher, compact_every=None,
+                 compact_after=None) -> None:
+        self.database = Path(database)
+        self.path = self.database.with_suffix('.journal')
+        self.old_path = self.database.with_suffix('.journal.old')
+        self.corrupt_path = self.database.with_suffix('.journal.corrupt')
+        self.cipher = cipher
+        self.compact_every = compact_every or int(
+            os.environ.get('ASSISTANT_AUTOSAVE_CHANGES', 1000)
+        )
+        self.compact_after = compact_after or float(
+            os.environ.get('ASSISTANT_AUTOSAVE_SECONDS', 300)
+        )
+        self.compression = fp.compression()
+        self.workers = parallel.workers()
+        self.compacted_at = time.monotonic()
+        self.entries = 0
+        self.file = None
+        self.compaction = None
+        self.error = None
+        self.lock = threading.RLock()
+
+    def replay(self, contacts) -> int:
+        """Applies the journal entries that are newer than the snapshot.
+
+        Entries of an interrupted compaction are replayed first. Replaying
+        stops at the first entry that can not be decrypted, and the journal
+        is cut there, so new entries are not appended after it and lost
+        on the next replay. A torn last entry (no end of line, what a crash
+        leaves) is just cut off; a damaged complete entry and the entries
+        after it are moved to .journal.corrupt first, with a warning.
+
+        Args:
+            contacts (AddressBook): The book loaded from the snapshot.
+
+        Returns:
+            int: The number of applied entries.
+        """
+        applied = 0
+        for path in (self.old_path, self.path):
+            for seq, operation, args in self.__read_entries(path):
+                self.entries += 1
+                if seq <= contacts.journal_seq:
+                    continue
+                Journal.OPERATIONS[operation](contacts, args)
+                contacts.journal_seq = seq
+                applied += 1
+        return applied
+
+    def readable(self) -> bool:
+        """Tells whether the cipher is the key of the journal.
+
+        A journal without a snapshot is all there is of a new book, and the
+        header of the snapshot is what rejects a wrong password. So the
+        first entry is tried: a complete line (a torn write has no end of
+        line) that can not be decrypted was written with another key.
+        """
+        for path in (self.old_path, self.path):
+            try:
+                with open(path, 'rb') as file:
+                    line = file.readline()
+            except FileNotFoundError:
+                continue
+            if not line.endswith(b'\n'):
+                return True
+            try:
+                self.cipher.decrypt_data(line.rstrip(b'\n'))
+            except InvalidToken:
+                return False
+            return True
+        return True
+
+    def append(self, contacts, operation: str, args) -> None:
+        """Writes a mutation that was just applied to the book.
+
+        Args:
+            contacts (AddressBook): The changed book.
+            operation (str): One of the keys of Journal.OPERATIONS.
+            args (list): The arguments the command was executed with.
+        """
+        with self.lock:
+            contacts.journal_seq += 1
+            entry = json.dumps(
+                [contacts.journal_seq, operation, list(args)]
+            ).encode('utf-8')
+            if self.file is None:
+                self.file = open(self.path, 'ab')
+            self.file.write(self.cipher.encrypt_data(entry) + b'\n')
+            fp.sync(self.file)
+            self.entries += 1
+            if self.entries >= self.compact_every or \
+                    time.monotonic() - self.compacted_at >= self.compact_after:
+                self.compact(contacts)
+
+    def compact(self, contacts) -> None:
+        """Folds the journal into a new snapshot of the book.
+
+        The calling thread only freezes the book (AddressBook.freeze), a
+        copy of its dict, so the snapshot is consistent with the journal.
+        Serialization, encryption and writing happen in a background
+        thread while new entries go to a fresh journal, and records
+        changed meanwhile are copied instead of changed under the writer.
+
+        Args:
+            contacts (AddressBook): The book to snapshot.
+        """
+        with self.lock:
+            self.__join()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if self.path.exists():
+                self.__rotate()
+            self.entries = 0
+            self.compacted_at = time.monotonic()
+            self.compaction = threading.Thread(
+                target=self.__write_snapshot,
+                args=(contacts, contacts.freeze(), contacts.journal_seq),
+            )
+            self.compaction.start()
+
+    def wait(self) -> None:
+        """Blocks until a running compaction is finished.
+
+        Raises:
+            FileException: If the last snapshot could not be written. Its
+                entries are kept in the old journal, and go into the next
+                snapshot.
+        """
+        self.__join()
+        error, self.error = self.error, None
+        if error is not None:
+            raise FileException(
+                f"Saving {self.database} failed: {error}"
+            ) from error
+
+    def close(self) -> None:
+        """Waits for a running compaction and closes the journal file.
+
+        Raises:
+            FileException: If the last snapshot could not be written.
+        """
+        with self.lock:
+            try:
+                self.wait()
+            finally:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+
+    def __join(self) -> None:
+        if self.compaction is not None:
+            self.compaction.join()
+            self.compaction = None
+
+    def __rotate(self) -> None:
+        """Moves the journal aside for a compaction. The old journal of a
+        compaction that failed is kept, with the journal appended."""
+        if not self.old_path.exists():
+            os.replace(self.path, self.old_path)
+            return
+        with open(self.path, 'rb') as journal, \
+                open(self.old_path, 'ab') as old:
+            while chunk := journal.read(1024 * 1024):
+                old.write(chunk)
+            fp.sync(old)
+        self.path.unlink()
+
+    def __write_snapshot(self, contacts, records: dict,
+                         journal_seq: int) -> None:
+        try:
+            if self.workers > 1:
+                parallel.write_file(self.database, records, journal_seq,
+                                    self.cipher, self.workers,
+                                    self.compression)
+            else:
+                fp.write_segments(self.database, fp.iter_segments(records),
+                                  journal_seq, self.cipher, self.compression)
+            self.old_path.unlink(missing_ok=True)
+            self.error = None
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.error = e
+        finally:
+            if contacts.shared is records:
+                contacts.thaw()
+
+    def __set_aside(self, file, line: bytes) -> None:
+        """Appends a damaged entry and the rest of the journal file to
+        the corrupt journal."""
+        with open(self.corrupt_path, 'ab') as corrupt:
+            corrupt.write(line)
+            while chunk := file.read(1024 * 1024):
+                corrupt.write(chunk)
+            fp.sync(corrupt)
+        sys.stderr.write(
+            f"{file.name}: a damaged entry and the entries after it were "
+            f"moved to {self.corrupt_path}\n"
+        )
+
+    @staticmethod
+    def decode(entry: bytes) -> tuple:
+        """Decodes a JSON entry, or a pickled one of a journal written
+        before entries were JSON."""
+        if entry[:1] == b'\x80':
+            return pickle.loads(entry)
+        seq, operation, args = json.loads(entry)
+        return seq, operation, tuple(args)
+
+    def __read_entries(self, path: Path):
+        try:
+            with open(path, 'rb') as file:
+                position = 0
+                for line in file:
+                    try:
+                        entry = self.cipher.decrypt_data(line.rstrip(b'\n'))
+                    except InvalidToken:
+                        if line.endswith(b'\n'):
+                            self.__set_aside(file, line)
+                        os.truncate(path, position)
+                        return
+                    position += len(line)
+                    yield Journal.decode(entry)
+        except FileNotFoundError:
+            return
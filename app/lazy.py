@@ -0,0 +1,298 @@
+"""imports"""
+import heapq
+import threading
+from collections.abc import Mapping
+from itertools import islice
+from operator import itemgetter
+from app import stats
+from app.book import VERSIONS, AddressBook
+from app.functions import Decorators as decor, BirthdayFunctions as birth
+from app.record import Record
+from app.search import NameIndex
+
+
+class LazyRecords(Mapping):
+    """Mapping of names to records over an SQLite book, decrypting a
+    record only when it is asked for.
+
+    Records that were changed and not yet written by the storage are kept
+    in `pending` (None for a deleted contact), and take precedence over
+    the rows; SQLiteStorage drops them once they are written (saved). So
+    the memory used is that of the unsaved changes, not of the book.
+
+    Attributes:
+        storage (SQLiteStorage): The storage of the book.
+        pending (dict): Names to changed records, or to None if deleted.
+    """
+    def __init__(self, storage) -> None:
+        self.storage = storage
+        self.pending = {}
+
+    def __getitem__(self, contact_name: str) -> Record:
+        if contact_name in self.pending:
+            record = self.pending[contact_name]
+        else:
+            record = self.storage.read_record(contact_name)
+        if record is None:
+            raise KeyError(contact_name)
+        return record
+
+    def __setitem__(self, contact_name: str, record: Record) -> None:
+        self.pending[contact_name] = record
+
+    def __delitem__(self, contact_name: str) -> None:
+        if contact_name not in self:
+            raise KeyError(contact_name)
+        self.pending[contact_name] = None
+
+    def __contains__(self, contact_name) -> bool:
+        if contact_name in self.pending:
+            return self.pending[contact_name] is not None
+        return self.storage.has_record(contact_name)
+
+    def __iter__(self):
+        return (record.name for record in self.values())
+
+    def __len__(self) -> int:
+        return self.storage.count_records() + sum(
+            (record is not None) - self.storage.has_record(contact_name)
+            for contact_name, record in list(self.pending.items())
+        )
+
+    def values(self):
+        """Decrypts all records, in the order of the rows, then the new
+        ones."""
+        pending = dict(self.pending)
+        for record in self.storage.iter_records():
+            if record.name in pending:
+                record = pending.pop(record.name)
+                if record is None:
+                    continue
+            yield record
+        yield from (
+            record for record in pending.values() if record is not None
+        )
+
+    def items(self):
+        return ((record.name, record) for record in self.values())
+
+    def writable(self, contact_name: str) -> Record:
+        """Returns the record of a contact to change it in place; it stays
+        pending until the storage writes it."""
+        record = self[contact_name]
+        self.pending[contact_name] = record
+        return record
+
+    def saved(self, names) -> None:
+        """Forgets the pending records the storage has written."""
+        for contact_name in names:
+            self.pending.pop(contact_name, None)
+
+    def unsaved(self, matches) -> tuple:
+        """Looks through the pending records, for the lookups that the
+        rows answer for the other contacts.
+
+        Args:
+            matches (callable): Takes a record and tells if it is found.
+
+        Returns:
+            tuple: The names of the matching pending contacts, and the set
+                of the names of all pending contacts.
+        """
+        pending = list(self.pending.items())
+        return [
+            contact_name for contact_name, record in pending
+            if record is not None and matches(record)
+        ], {contact_name for contact_name, _ in pending}
+
+
+class LazyPhones(Mapping):
+    """phone_index over an SQLite book: phone numbers to the names of
+    their owners, found by the HMAC of the phone.
+
+    Iterating decrypts the whole book, and is only done by reports over
+    all phones (app.analytics).
+    """
+    def __init__(self, records: LazyRecords) -> None:
+        self.records = records
+
+    def __getitem__(self, phone_number: str) -> list:
+        if len(phone_number) != 10 or not phone_number.isdigit():
+            raise KeyError(phone_number)
+        owners, changed = self.records.unsaved(
+            lambda record: record.find_phone(phone_number) == phone_number
+        )
+        owners[:0] = [
+            record.name
+            for record in self.records.storage.find_by_phone(phone_number)
+            if record.name not in changed
+        ]
+        if not owners:
+            raise KeyError(phone_number)
+        return owners
+
+    def items(self):
+        index = {}
+        for record in self.records.values():
+            for phone in record.phones:
+                index.setdefault(phone, []).append(record.name)
+        return index.items()
+
+    def __iter__(self):
+        return (phone for phone, _ in self.items())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class LazyBirthdays:
+    """birthday_index over an SQLite book: the names of the contacts born
+    on every day of year slot, an indexed query of the birthdays table."""
+    def __init__(self, records: LazyRecords) -> None:
+        self.records = records
+
+    def __getitem__(self, slot: int) -> list:
+        owners, changed = self.records.unsaved(
+            lambda record: record.birth_ordinal
+            and birth.ordinal_slot(record.birth_ordinal) == slot
+        )
+        owners[:0] = [
+            record.name
+            for record in self.records.storage.read_birthdays(slot, slot)
+            if record.name not in changed
+        ]
+        return owners
+
+    def __len__(self) -> int:
+        return birth.SLOTS
+
+
+class LazyNames:
+    """name_index over an SQLite book.
+
+    The names are only stored as HMACs, so the first search decrypts all
+    contacts once to build a NameIndex; it is kept up to date afterwards.
+    """
+    def __init__(self, records: LazyRecords) -> None:
+        self.records = records
+        self.index = None
+        self.lock = threading.Lock()
+
+    def built(self) -> NameIndex:
+        """The NameIndex of the book, built on first use."""
+        with self.lock:
+            if self.index is None:
+                self.index = NameIndex(self.records)
+            return self.index
+
+    def prefix(self, text: str, limit: int = 20) -> list:
+        return self.built().prefix(text, limit)
+
+    def fuzzy(self, text: str, limit: int = 20, max_edits=None) -> list:
+        return self.built().fuzzy(text, limit, max_edits)
+
+    def add(self, name: str) -> None:
+        if self.index is not None:
+            self.index.add(name)
+
+    def remove(self, name: str) -> None:
+        if self.index is not None:
+            self.index.remove(name)
+
+
+class LazyBook:
+    """Address book over an SQLite database that decrypts a contact only
+    when it is used.
+
+    Opening it reads nothing but the key check. A lookup by name or phone
+    decrypts the matching rows only, and a change re-encrypts just the
+    changed contact when the storage writes it, so both take the same
+    time for any number of contacts. Listings, reports and the first name
+    search decrypt the whole book. The results are those of AddressBook.
+
+    Attributes:
+        data (LazyRecords): Names to records, decrypted on access.
+        phone_index (LazyPhones): Phones to the names of their owners.
+        birthday_index (LazyBirthdays): Names by day of year of birth.
+        name_index (LazyNames): Prefix and fuzzy name search.
+        journal_seq (int): Always 0, there is no journal.
+        version (int): Changes whenever the contacts change (app.cache).
+    """
+    def __init__(self, storage) -> None:
+        self.data = LazyRecords(storage)
+        self.phone_index = LazyPhones(self.data)
+        self.birthday_index = LazyBirthdays(self.data)
+        self.name_index = LazyNames(self.data)
+        self.journal_seq = 0
+        self.version = next(VERSIONS)
+
+    def __contains__(self, contact_name) -> bool:
+        return contact_name in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    find = AddressBook.find
+    find_by_phone = AddressBook.find_by_phone
+    search = AddressBook.search
+    show_birth_date = AddressBook.show_birth_date
+    upcoming_birthdays = AddressBook.upcoming_birthdays
+    get_upcoming_birthdays = AddressBook.get_upcoming_birthdays
+    add_record = AddressBook.add_record
+    add_phone = AddressBook.add_phone
+    remove_phone = AddressBook.remove_phone
+    change_phone = AddressBook.change_phone
+    birthday_date = AddressBook.birthday_date
+
+    def show_all(self, page=None, size=20, sort=False, contains=None):
+        """Display all the contacts, see AddressBook.show_all.
+
+        The records are rendered from the one pass over the rows that
+        finds their names, so every contact is decrypted once, and no row
+        is read again by name.
+        """
+        items = self.data.items()
+        if contains:
+            needle = contains.casefold()
+            items = (item for item in items if needle in item[0].casefold())
+        start = stop = None
+        if page is not None:
+            start, stop = (page - 1) * size, page * size
+        if sort:
+            name = itemgetter(0)
+            items = iter(
+                sorted(items, key=name) if stop is None
+                else heapq.nsmallest(stop, items, key=name)
+            )
+        for _, record in islice(items, start, stop):
+            yield f"{record}\n"
+
+    @stats.timed('book.insert')
+    def insert(self, user_record: Record, phones=None) -> bool:
+        """Adds an already validated record, see AddressBook.insert."""
+        if user_record.name in self.data:
+            return False
+        self.version = next(VERSIONS)
+        self.data[user_record.name] = user_record
+        self.name_index.add(user_record.name)
+        return True
+
+    @stats.timed('book.delete')
+    @decor.validate_one_arg
+    def delete(self, contact_name: str) -> str:
+        """Deletes a contact, see AddressBook.delete."""
+        self.version = next(VERSIONS)
+        del self.data[contact_name]
+        self.name_index.remove(contact_name)
+        return "Contact deleted"
+
+    def _writable(self, contact_name: str) -> Record:
+        return self.data.writable(contact_name)
+
+    def _sync_phone(self, contact_name: str, phone_number: str) -> None:
+        """Nothing to do: phones are found in the rows and the pending
+        records."""
+
+    def _sync_birthday(self, contact_name: str, record) -> None:
+        """Nothing to do: birthdays are found in the rows and the pending
+        records."""
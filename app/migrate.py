@@ -0,0 +1,59 @@
+"""Converts a contacts file (data/contacts.pkl and its journal) into an
+SQLite database.
+
+Usage:
+    python -m app.migrate data/contacts.pkl data/contacts.db
+"""
+import sys
+from getpass import getpass
+from pathlib import Path
+from app.file import FileException
+from app.protection import Cipher
+from app.storage import FileStorage, SQLiteStorage
+
+
+def migrate(source, target, cipher) -> int:
+    """Copies all contacts of a contacts file into a new SQLite database.
+
+    The database keeps the KDF parameters of the file, so the password
+    stays the same.
+
+    Args:
+        source (Path): The contacts file.
+        target (Path): The SQLite database to create.
+        cipher (Cipher): The cipher of the contacts file.
+
+    Returns:
+        int: The number of migrated contacts.
+
+    Raises:
+        FileException: If the password is wrong or the target exists.
+    """
+    if Path(target).exists():
+        raise FileException(f"{target} already exists")
+    contacts = FileStorage(source, cipher).load()
+    if contacts == 'wrong pass':
+        raise FileException("Incorrect password.")
+    storage = SQLiteStorage(target, cipher)
+    try:
+        storage.compact(contacts)
+    finally:
+        storage.close()
+    return len(contacts)
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    source, target = sys.argv[1:]
+    password = getpass("Please, enter password to AddressBook: ")
+    cipher = Cipher(password, **FileStorage.kdf_params(source))
+    try:
+        migrated = migrate(source, target, cipher)
+    except FileException as e:
+        sys.exit(str(e))
+    print(f"Migrated {migrated} contacts to {target}.")
+
+
+if __name__ == "__main__":
+    main()
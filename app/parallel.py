@@ -0,0 +1,184 @@
+"""imports"""
+import base64
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from cryptography.fernet import InvalidToken
+from app import codec, stats
+from app.book import AddressBook
+from app.file import FileException, FileProcessor as fp, paused_gc
+from app.functions import BirthdayFunctions as birth
+from app.protection import Cipher
+from app.record import Phone, Record
+from app.search import NameIndex
+
+# Segments sent to a worker at once: enough to amortize the round trip,
+# few enough to spread a book of some hundred segments over the workers.
+BATCH = 8
+
+# The cipher of the book in a worker process, set by _init_worker.
+_cipher = None
+
+
+def workers() -> int:
+    """Reads the number of processes that load and save contacts files
+    from ASSISTANT_WORKERS: a number, or 'auto' for one per core. The
+    default, 1, keeps loading and saving in the bot process.
+
+    Raises:
+        FileException: If the setting is not valid.
+    """
+    setting = os.environ.get('ASSISTANT_WORKERS', '1').strip().lower()
+    if setting == 'auto':
+        return os.cpu_count() or 1
+    if not setting.isdigit():
+        raise FileException(
+            f"Unknown number of workers {setting!r}, use a number or auto"
+        )
+    return max(int(setting), 1)
+
+
+def _init_worker(key: bytes, salt: bytes, iterations: int) -> None:
+    global _cipher  # pylint: disable=global-statement
+    _cipher = Cipher.from_key(key, salt, iterations)
+
+
+def pool(cipher, count: int) -> ProcessPoolExecutor:
+    """Starts worker processes holding the key of the book.
+
+    The processes are spawned, not forked, as the bot may have threads
+    (the server) that a fork would copy in any state.
+    """
+    return ProcessPoolExecutor(
+        max_workers=count,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(cipher.key, cipher.salt, cipher.iterations),
+    )
+
+
+def batches(items, size: int = BATCH):
+    """Groups items into lists of size."""
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def decode_part(tokens: list, header: dict) -> tuple:
+    """Runs in a worker: unseals and decodes segments, and prepares the
+    index entries of their contacts for AddressBook.load_parts.
+
+    Records are sent back as lists of their fields, which pickle faster
+    than Record objects, with the phones unpacked, so the bot process
+    does not repeat the per-phone work of rebuild_index.
+    """
+    names, packed, ordinals, keys = [], [], [], []
+    phones, phone_owners, slots, slot_owners = [], [], [], []
+    unpack, size, key = Phone.unpack, Phone.SIZE, NameIndex.key
+    with paused_gc():
+        for token in tokens:
+            plaintext = fp.unseal(token, _cipher, header)
+            for record in codec.decode_records(plaintext):
+                owner = len(names)
+                names.append(record.name)
+                packed.append(record.packed_phones)
+                ordinals.append(record.birth_ordinal)
+                keys.append(key(record.name))
+                record_phones = record.packed_phones
+                for start in range(0, len(record_phones), size):
+                    phones.append(unpack(record_phones[start:start + size]))
+                    phone_owners.append(owner)
+                if record.birth_ordinal:
+                    slots.append(birth.ordinal_slot(record.birth_ordinal))
+                    slot_owners.append(owner)
+    return names, packed, ordinals, keys, phones, phone_owners, slots, \
+        slot_owners
+
+
+def encode_part(chunks: list, compression: tuple) -> list:
+    """Runs in a worker: encodes and seals segments, each given as the
+    lists of the names, packed phones and birthday ordinals of its
+    records.
+
+    Returns:
+        list: The first name, the last name and the sealed segment of
+            every chunk, for FileProcessor.write_tokens.
+    """
+    compress, sealed = fp.compressor(compression), []
+    for names, packed, ordinals in chunks:
+        block = codec.encode_records(map(Record.from_parts, names, packed,
+                                         ordinals))
+        sealed.append((names[0], names[-1],
+                       fp.seal(block, _cipher, compress)))
+    return sealed
+
+
+def columns(chunk: list) -> tuple:
+    """The fields of the records of a chunk, as encode_part takes them."""
+    return (
+        [record.name for record in chunk],
+        [record.packed_phones for record in chunk],
+        [record.birth_ordinal for record in chunk],
+    )
+
+
+@stats.timed('file.read_parallel')
+def read_file(database, cipher, count: int):
+    """Reads a contacts file like FileProcessor.read_file, unsealing and
+    decoding its segments in count worker processes.
+
+    Files that are not in the segments layout of app.codec are read by
+    FileProcessor.read_file.
+
+    Returns:
+        AddressBook: The book, or 'wrong pass' if the password is
+            incorrect.
+
+    Raises:
+        FileException: If the file is damaged.
+    """
+    header = fp.read_header(database)
+    if header.get('layout') != 'segments' or header.get('codec') is None:
+        return fp.read_file(database, cipher)
+    if not cipher.check(base64.b64decode(header['check'])):
+        return 'wrong pass'
+    book = AddressBook()
+    with pool(cipher, count) as executor, paused_gc():
+        try:
+            book.load_parts(executor.map(
+                decode_part, batches(fp.read_tokens(database)), repeat(header)
+            ))
+        except InvalidToken:
+            return 'wrong pass'
+        except codec.CodecError as e:
+            raise FileException(f"{database} is damaged: {e}") from e
+    book.journal_seq = header['seq']
+    return book
+
+
+@stats.timed('file.write_parallel')
+def write_file(database, records: dict, journal_seq: int, cipher,
+               count: int, compression=None) -> None:
+    """Writes contacts like FileProcessor.write_segments, encoding and
+    sealing the segments in count worker processes.
+
+    Args:
+        records (dict): Names to records, the data of a book or a frozen
+            copy of it (AddressBook.freeze).
+        journal_seq (int): The last journal entry in the snapshot.
+        compression (tuple, optional): The name and level of the
+            compression, ASSISTANT_COMPRESSION if not given.
+    """
+    compression = compression or fp.compression()
+    chunks = map(columns, fp.iter_chunks(records))
+    with pool(cipher, count) as executor:
+        fp.write_tokens(
+            database,
+            chain.from_iterable(
+                executor.map(encode_part, batches(chunks), repeat(compression))
+            ),
+            journal_seq,
+            cipher,
+            compression,
+        )
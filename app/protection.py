@@ -1,8 +1,133 @@
 """imports"""
 import base64
+import hashlib
+import hmac
+import json
+import os
+import time
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from app import stats
+
+
+DEFAULT_SALT = b'\x82z\xaa}\xa5\x03\xd2\xf0\x05\xda\xfdc\xbd\xe4:\x13'
+DEFAULT_ITERATIONS = 480000
+
+
+class KeyCache:
+    """Cache of derived keys with a time to live.
+
+    Keys are always cached in the memory of the process. When a path is
+    given (ASSISTANT_KEY_CACHE environment variable), they are also kept in
+    a file readable only by its owner, so short-lived invocations of the
+    bot can skip the key derivation. Anyone who can read that file can
+    decrypt the book until the entries expire, so it is off by default.
+    Expired entries are dropped from the memory and from the file
+    whenever the cache is used.
+
+    The entries of the file are found by a scrypt hash of the password
+    (file_lookup), which is memory-hard: testing password guesses against
+    the file costs about as much per guess as the PBKDF2 derivation. A hit
+    still saves most of the derivation time on a CPU.
+
+    Args:
+        ttl (float): Seconds a cached key stays valid.
+        path (str, optional): File to share the cache between processes.
+
+    Methods:
+        - get: Return a cached key or None.
+        - put: Store a derived key.
+    """
+    SCRYPT = {'n': 2 ** 14, 'r': 8, 'p': 1}
+
+    def __init__(self, ttl: float, path=None) -> None:
+        self.ttl = ttl
+        self.path = path
+        self.keys = {}
+
+    @classmethod
+    def from_env(cls) -> 'KeyCache':
+        """Creates the cache configured by the ASSISTANT_KEY_CACHE and
+        ASSISTANT_KEY_CACHE_TTL environment variables."""
+        return cls(
+            float(os.environ.get('ASSISTANT_KEY_CACHE_TTL', 300)),
+            os.environ.get('ASSISTANT_KEY_CACHE'),
+        )
+
+    @staticmethod
+    def lookup(password: str, salt: bytes, iterations: int) -> str:
+        """Builds the key of a password and KDF parameters in the memory
+        of the process."""
+        return hashlib.sha256(
+            salt + iterations.to_bytes(8, 'big') + password.encode('utf-8')
+        ).hexdigest()
+
+    @staticmethod
+    def file_lookup(password: str, salt: bytes, iterations: int) -> str:
+        """Builds the key of a password and KDF parameters in the file,
+        with scrypt, so it can not be used to test passwords quickly."""
+        return hashlib.scrypt(
+            password.encode('utf-8'),
+            salt=salt + iterations.to_bytes(8, 'big'),
+            dklen=32, **KeyCache.SCRYPT,
+        ).hex()
+
+    def get(self, password: str, salt: bytes, iterations: int):
+        """Returns the cached key for the password, or None if there is
+        no valid entry."""
+        self.keys = KeyCache.__alive(self.keys)
+        lookup = KeyCache.lookup(password, salt, iterations)
+        entry = self.keys.get(lookup)
+        if self.path:
+            entries = self.__load()
+            alive = KeyCache.__alive(entries)
+            if len(alive) < len(entries):
+                self.__save(alive)
+            if entry is None:
+                entry = alive.get(
+                    KeyCache.file_lookup(password, salt, iterations)
+                )
+                if entry is not None:
+                    self.keys[lookup] = entry
+        if entry is None:
+            return None
+        return entry[0].encode('ascii')
+
+    def put(self, password: str, salt: bytes, iterations: int,
+            key: bytes) -> None:
+        """Stores a derived key for the password."""
+        entry = (key.decode('ascii'), time.time() + self.ttl)
+        self.keys[KeyCache.lookup(password, salt, iterations)] = entry
+        if self.path:
+            entries = KeyCache.__alive(self.__load())
+            entries[KeyCache.file_lookup(password, salt, iterations)] = entry
+            self.__save(entries)
+
+    @staticmethod
+    def __alive(entries: dict) -> dict:
+        now = time.time()
+        return {
+            lookup: entry for lookup, entry in entries.items()
+            if entry[1] >= now
+        }
+
+    def __load(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return {
+                    lookup: tuple(entry)
+                    for lookup, entry in json.load(file).items()
+                }
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def __save(self, entries: dict) -> None:
+        descriptor = os.open(
+            self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        with open(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
 
 
 class Cipher:
@@ -13,6 +138,8 @@ class Cipher:
         key (bytes): The derived key from the given password.
         cipher (Fernet): The Fernet cipher object initialized with
             the derived key.
+        salt (bytes): The salt used for the key derivation.
+        iterations (int): The number of PBKDF2 iterations.
 
     Methods:
         encrypt_data(row_data: bytes) -> bytes:
@@ -20,31 +147,116 @@ class Cipher:
         
         decrypt_data(ciphered_data: bytes) -> bytes:
             Decrypts the provided encrypted data and returns the original data.
+
+        verifier() -> bytes:
+            Returns a value that proves knowledge of the key.
+
+        check(verifier: bytes) -> bool:
+            Tells whether a stored verifier belongs to this key.
+
+        mac(data: bytes) -> bytes:
+            Returns a keyed digest to look data up without storing it.
     """
-    def __init__(self, password: str) -> None:
-        self.key = Cipher.__passwd_to_key(password)
+    keys = KeyCache.from_env()
+
+    @stats.timed('cipher.init')
+    def __init__(self, password: str, salt: bytes = DEFAULT_SALT,
+                 iterations: int = DEFAULT_ITERATIONS) -> None:
+        self.salt = salt
+        self.iterations = iterations
+        self.key = Cipher.keys.get(password, salt, iterations)
+        if self.key is None:
+            self.key = Cipher.__passwd_to_key(password, salt, iterations)
+            Cipher.keys.put(password, salt, iterations, self.key)
+        elif stats.ENABLED:
+            stats.count('cipher.key_cache_hits')
         self.cipher = Fernet(self.key)
+        self.lookup_key = None
+
+    @classmethod
+    def from_key(cls, key: bytes, salt: bytes = DEFAULT_SALT,
+                 iterations: int = DEFAULT_ITERATIONS) -> 'Cipher':
+        """Builds a cipher from an already derived key, so another process
+        of the same book does not derive it again.
+
+        Args:
+            key (bytes): The key of a Cipher of the book.
+            salt (bytes): The salt the key was derived with.
+            iterations (int): The number of PBKDF2 iterations.
+
+        Returns:
+            Cipher: The cipher.
+        """
+        cipher = cls.__new__(cls)
+        cipher.salt = salt
+        cipher.iterations = iterations
+        cipher.key = key
+        cipher.cipher = Fernet(key)
+        cipher.lookup_key = None
+        return cipher
 
     @staticmethod
-    def __passwd_to_key(passwd: str) -> bytes:
+    @stats.timed('cipher.kdf')
+    def __passwd_to_key(passwd: str, salt: bytes, iterations: int) -> bytes:
         """Derives a key from the provided password using PBKDF2HMAC.
 
         Args:
             passwd (str): The password to derive the encryption key.
+            salt (bytes): The salt for the key derivation.
+            iterations (int): The number of PBKDF2 iterations.
 
         Returns:
             bytes: The derived key encoded in a URL-safe base64 format.
         """
         password = bytes(passwd, encoding='utf-8')
-        __salt = b'\x82z\xaa}\xa5\x03\xd2\xf0\x05\xda\xfdc\xbd\xe4:\x13'
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=__salt,
-            iterations=480000,
+            salt=salt,
+            iterations=iterations,
         )
         return base64.urlsafe_b64encode(kdf.derive(password))
 
+    def verifier(self) -> bytes:
+        """Returns a value that proves knowledge of the key without
+        revealing it.
+
+        Returns:
+            bytes: HMAC-SHA256 of a fixed label under the derived key.
+        """
+        return hmac.new(
+            base64.urlsafe_b64decode(self.key), b'key-check', hashlib.sha256
+        ).digest()
+
+    def check(self, verifier: bytes) -> bool:
+        """Tells whether a stored verifier was made with this key.
+
+        Args:
+            verifier (bytes): The verifier read from the database header.
+
+        Returns:
+            bool: True if the password is correct.
+        """
+        return hmac.compare_digest(self.verifier(), verifier)
+
+    def mac(self, data: bytes) -> bytes:
+        """Returns a keyed digest of the data, so encrypted rows can be
+        found by a value (a name or a phone) without storing it in clear.
+
+        Args:
+            data (bytes): The value to digest.
+
+        Returns:
+            bytes: HMAC-SHA256 of the data under a key derived from the
+                derived key, separate from the verifier.
+        """
+        if self.lookup_key is None:
+            self.lookup_key = hmac.new(
+                base64.urlsafe_b64decode(self.key), b'lookup', hashlib.sha256
+            ).digest()
+        return hmac.new(self.lookup_key, data, hashlib.sha256).digest()
+
+    @stats.timed('cipher.encrypt')
     def encrypt_data(self, row_data: bytes) -> bytes:
         """Encrypts the provided data using the derived key.
 
@@ -57,6 +269,7 @@ class Cipher:
         cipher_text = self.cipher.encrypt(row_data)
         return cipher_text
 
+    @stats.timed('cipher.decrypt')
     def decrypt_data(self, ciphered_data: bytes) -> bytes:
         """Decrypts the provided encrypted data using the derived key.
 
@@ -1,18 +1,31 @@
 """imports"""
-from datetime import datetime
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_PATTERN = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
 
 
 class Field:
     """Class for storing data of str type"""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
     def __str__(self):
         return str(self.value)
 
+    def __setstate__(self, state):
+        # Pickles made before __slots__ carry the instance __dict__.
+        if isinstance(state, tuple):
+            state = state[1]
+        self.value = state['value']
+
 
 class Name(Field):
     """Class for storing names of contacts. Str type of data."""
+    __slots__ = ()
 
 
 class Phone(Field):
@@ -20,7 +33,12 @@ class Phone(Field):
     
     Methods:
         - validate_phone: Validate a phone number format.
+        - pack: Convert a phone number into its 5 byte form.
+        - unpack: Convert a 5 byte phone number back into a string.
     """
+    __slots__ = ()
+    SIZE = 5
+
     def __init__(self, phone: str):
         self.validate_phone(phone)
         super().__init__(phone)
@@ -38,6 +56,16 @@ class Phone(Field):
         if len(phone) != 10 or not phone.isdigit():
             raise ValueError('Wrong phone format!')
 
+    @staticmethod
+    def pack(phone: str) -> bytes:
+        """Converts a 10 digit phone number into 5 bytes (a 40 bit int)."""
+        return int(phone).to_bytes(Phone.SIZE, 'big')
+
+    @staticmethod
+    def unpack(packed: bytes) -> str:
+        """Converts 5 packed bytes back into a 10 digit phone number."""
+        return f"{int.from_bytes(packed, 'big'):010d}"
+
 
 class Birthday(Field):
     """A class representing a birthday, inheriting from Field.
@@ -46,48 +74,143 @@ class Birthday(Field):
         birth_date (str): The birth date in the format 'DD.MM.YYYY'.
 
     Attributes:
-        birthday (datetime.date): The birthday date object.
+        value (datetime.date): The birthday date object.
+
+    Methods:
+        - parse: Convert a DD.MM.YYYY string into a date.
     """
+    __slots__ = ()
+
     def __init__(self, birth_date: str):
         try:
-            self.birthday = datetime.strptime(birth_date, '%d.%m.%Y').date()
-            super().__init__(self.birthday)
+            super().__init__(Birthday.parse(birth_date))
         except ValueError as e:
             raise ValueError("Invalid date format. Use DD.MM.YYYY") from e
 
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def parse(birth_date: str) -> date:
+        """Converts a DD.MM.YYYY birth date into a date. Accepts the same
+        input as strptime('%d.%m.%Y') at a fraction of its cost, and
+        birth dates repeat a lot, so results are cached.
+
+        Raises:
+            ValueError: If the date is malformed or does not exist.
+        """
+        match = DATE_PATTERN.fullmatch(birth_date)
+        if match is None:
+            raise ValueError(birth_date)
+        day, month, year = map(int, match.groups())
+        return date(year, month, day)
+
 
 class Record:
     """Class for storing and processing contact records.
-    
+
+    Records are compact: the name is a plain string, the phones are packed
+    into one bytes object of 5 bytes per number and the birthday is kept
+    as a date ordinal (0 when not set). Name, Phone and Birthday are only
+    used to validate input.
+
+    Attributes:
+        name (str): The name of the contact.
+        phones (tuple): The phone numbers of the contact as strings.
+        birthday (datetime.date): The birthday of the contact or None.
+
     Methods:
         - add_phone: Add a phone number to the list of phones.
         - edit_phone: Edit an existing phone number in the list.
         - find_phone: Find a phone number in the list.
         - remove_phone: Remove a phone number from the list.
     """
+    __slots__ = ('name', 'packed_phones', 'birth_ordinal')
+
     def __init__(self, contact_name: str):
-        self.name = Name(contact_name)
-        self.phones = []
-        self.birthday = None
+        self.name = Name(contact_name).value
+        self.packed_phones = b''
+        self.birth_ordinal = 0
 
     def __str__(self):
         return (
-            f"{self.name.value.ljust(30, '.')}" \
-            f"{'; '.join(phone.value for phone in self.phones)}"
+            f"{self.name.ljust(30, '.')}" \
+            f"{'; '.join(self.phones)}"
         )
 
+    @classmethod
+    def from_parts(cls, name: str, packed_phones: bytes = b'',
+                   birth_ordinal: int = 0) -> 'Record':
+        """Builds a record from already validated compact fields.
+
+        Args:
+            name (str): The name of the contact.
+            packed_phones (bytes): Phones packed with Phone.pack.
+            birth_ordinal (int): Date ordinal of the birthday, 0 if unset.
+
+        Returns:
+            Record: The new record.
+        """
+        record = cls.__new__(cls)
+        record.name = name
+        record.packed_phones = packed_phones
+        record.birth_ordinal = birth_ordinal
+        return record
+
+    def __getstate__(self):
+        return self.name, self.packed_phones, self.birth_ordinal
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            self.name, self.packed_phones, self.birth_ordinal = state
+            return
+        # Pickles made before __slots__: Name, Phone and Birthday objects.
+        self.name = state['name'].value
+        self.packed_phones = b''.join(
+            Phone.pack(phone.value) for phone in state['phones']
+        )
+        birthday = state['birthday']
+        self.birth_ordinal = birthday.value.toordinal() if birthday else 0
+
+    @property
+    def phones(self) -> tuple:
+        """The phone numbers of the contact as 10 digit strings."""
+        packed, size = self.packed_phones, Phone.SIZE
+        return tuple(
+            Phone.unpack(packed[start:start + size])
+            for start in range(0, len(packed), size)
+        )
+
+    @property
+    def birthday(self):
+        """The birthday of the contact as a date, or None if not set."""
+        if not self.birth_ordinal:
+            return None
+        return date.fromordinal(self.birth_ordinal)
+
+    def __phone_position(self, phone_number: str) -> int:
+        """Returns the byte offset of a phone number or -1."""
+        packed = self.packed_phones
+        if not packed or len(phone_number) != 10 \
+                or not phone_number.isdigit():
+            return -1
+        target = Phone.pack(phone_number)
+        start = packed.find(target)
+        while start > 0 and start % Phone.SIZE:
+            # A match across two packed numbers; look further.
+            start = packed.find(target, start + 1)
+        return start
+
     def add_phone(self, phone_number: str) -> None:
         """Add a phone number to the list of phones.
 
         This method adds a new phone number to the existing list of phones.
-        Raises ValueError if the provided phone number is already in the list.
+        Raises ValueError if the phone number format is incorrect.
 
         Args:
             phone_number (str): The phone number to be added.
         """
-        if phone_number in [str(phone) for phone in self.phones]:
+        if self.__phone_position(phone_number) >= 0:
             return 'This phone already in list'
-        self.phones.append(Phone(phone_number))
+        self.packed_phones += Phone.pack(Phone(phone_number).value)
         return 'Phone added'
 
     def edit_phone(self, old_number: str, new_number: str):
@@ -105,10 +228,11 @@ class Record:
         except ValueError:
             return 'New number already in list.'
 
-        for number in self.phones:
-            if number.value == old_number:
-                number.value = new_number
-                break
+        start = self.__phone_position(old_number)
+        if start >= 0:
+            self.packed_phones = self.packed_phones[:start] \
+                + Phone.pack(new_number) \
+                + self.packed_phones[start + Phone.SIZE:]
         return 'Phone changed'
 
     def find_phone(self, phone_number: str) -> str:
@@ -124,22 +248,27 @@ class Record:
             str: The found phone number if it exists in the list;
             otherwise, returns None.
         """
-        for number in self.phones:
-            if number.value == phone_number:
-                return phone_number
+        if self.__phone_position(phone_number) >= 0:
+            return phone_number
         return "No phone found"
 
-    def remove_phone(self, phone: str) -> None:
+    def remove_phone(self, phone: str) -> str:
         """Remove a phone number from the list.
 
         This method removes the specified phone number from the list of phones.
-        Raises ValueError if the provided phone number does not exist 
-        in the list.
 
         Args:
             phone (str): The phone number to be removed.
+
+        Returns:
+            str: A message indicating the status of the operation.
         """
-        self.phones.remove(self.find_phone(phone))
+        start = self.__phone_position(phone)
+        if start < 0:
+            return "No phone found"
+        self.packed_phones = self.packed_phones[:start] \
+            + self.packed_phones[start + Phone.SIZE:]
+        return 'Phone removed'
 
     def add_birthday(self, birth_date: str) -> str:
         """Adds a birthday to the contact if not already present.
@@ -151,9 +280,9 @@ class Record:
             str: A message indicating whether the birthday was added or if it
                 was already present.
         """
-        if self.birthday:
+        if self.birth_ordinal:
             return "Birthday already written"
-        self.birthday = Birthday(birth_date)
+        self.birth_ordinal = Birthday(birth_date).value.toordinal()
         return 'Birthday added.'
 
     def show_birthday(self) -> datetime:
@@ -164,7 +293,6 @@ class Record:
             str: A message indicating no birthday date is added if not set.
 
         """
-        try:
-            return self.birthday.value
-        except AttributeError:
+        if not self.birth_ordinal:
             return 'No birthday date added.'
+        return date.fromordinal(self.birth_ordinal)
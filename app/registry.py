@@ -0,0 +1,165 @@
+"""imports"""
+import inspect
+import os
+from importlib import import_module
+from importlib.metadata import entry_points
+from app import cache, stats
+
+PLUGIN_GROUP = 'assistant.commands'
+
+# Constructors of command objects by the parameters of the command class,
+# so building a command does not inspect its signature every time.
+FACTORIES = {
+    (): lambda cls: lambda args, contacts, storage: cls(),
+    ('storage',): lambda cls: lambda args, contacts, storage: cls(storage),
+    ('args',): lambda cls: lambda args, contacts, storage: cls(args),
+    ('contacts',): lambda cls: lambda args, contacts, storage: cls(contacts),
+    ('contacts', 'args'):
+        lambda cls: lambda args, contacts, storage: cls(contacts, args),
+    ('contacts', 'args', 'storage'):
+        lambda cls: lambda args, contacts, storage: cls(contacts, args,
+                                                        storage),
+}
+
+
+class CommandSpec:
+    """Everything the dispatcher knows about a registered command.
+
+    Attributes:
+        name (str): The command as typed, without '-' (e.g. 'addbirthday').
+        command_class (type): The Command class.
+        factory (callable): Builds the command from (args, contacts,
+            storage).
+        aliases (tuple): Other names of the command.
+        arity (tuple): The minimal and maximal number of arguments (None
+            for no limit), or None to leave the checks to the command.
+        validator (callable): Optional check of the arguments, returning
+            True if they are valid.
+        writes (bool): Whether the command changes the book.
+        files (bool): Whether the command opens files named by its
+            arguments.
+        shared (callable): Tells from the arguments whether the command
+            changes what all books of the process share, or None.
+        help (str): A help line, for commands added by plugins.
+    """
+    def __init__(self, name, command_class, aliases=(), arity=None,
+                 validator=None, writes=False, files=False, shared=None,
+                 help=None) -> None:
+        self.name = name
+        self.command_class = command_class
+        self.aliases = tuple(aliases)
+        self.arity = arity
+        self.validator = validator
+        self.writes = writes
+        self.files = files
+        self.shared = shared
+        self.help = help
+        parameters = tuple(inspect.signature(command_class).parameters)
+        if parameters not in FACTORIES:
+            raise TypeError(
+                f"{command_class.__name__} must take some of "
+                "(contacts, args, storage), in this order"
+            )
+        self.factory = FACTORIES[parameters](command_class)
+
+    def local(self, args: list) -> bool:
+        """Tells whether the command, with these arguments, is only for
+        the user of the process: it opens files named by its arguments
+        or changes what all books share."""
+        return self.files or self.shared is not None and self.shared(args)
+
+    def accepts(self, args: list) -> bool:
+        """Checks the arguments against the arity and the validator."""
+        if self.arity is not None:
+            least, most = self.arity
+            if len(args) < least or most is not None and len(args) > most:
+                return False
+        return self.validator is None or self.validator(args)
+
+
+# Command names and aliases to their specs.
+COMMANDS = {}
+
+
+def register(name: str, aliases=(), arity=None, validator=None,
+             writes=False, files=False, shared=None, help=None,
+             cache_key=None):
+    """Class decorator that makes a Command available under a name.
+
+    Args:
+        name (str): The command, lowercase letters only.
+        aliases (tuple, optional): Other names of the command.
+        arity (tuple, optional): Minimal and maximal number of arguments
+            (None for no maximum). Other counts are answered with
+            'invalid args' without building the command.
+        validator (callable, optional): Takes the arguments and returns
+            True if they are valid.
+        writes (bool, optional): Whether the command changes the book, so
+            it runs alone in the server.
+        files (bool, optional): Whether the command reads or writes files
+            named by its arguments. Clients of the server could reach any
+            file of the server with it, so the server refuses it.
+        shared (callable, optional): Takes the arguments and returns True
+            if the command changes what all books of the process share
+            (statistics, caches). One client of the server would change it
+            for all, so the server refuses it.
+        help (str, optional): A line for the help command.
+        cache_key (callable, optional): For commands that only read the
+            book: takes the arguments and returns a hashable key of what
+            the answer depends on, so the rendered answer is kept in the
+            render cache (app.cache) until the book changes.
+
+    With ASSISTANT_STATS, execute of the class is timed as
+    'command.<name>'.
+
+    Raises:
+        ValueError: If the name or an alias is already taken.
+    """
+    def decorator(command_class):
+        spec = CommandSpec(name, command_class, aliases, arity, validator,
+                           writes, files, shared, help)
+        for key in (name, *aliases):
+            if key in COMMANDS:
+                raise ValueError(f"Command {key!r} is already registered")
+        for key in (name, *aliases):
+            COMMANDS[key] = spec
+        if cache_key is not None:
+            command_class.execute = cache.cached(name, cache_key)(
+                command_class.execute
+            )
+        command_class.execute = stats.timed(f"command.{name}")(
+            command_class.execute
+        )
+        return command_class
+
+    return decorator
+
+
+def specs() -> list:
+    """The registered commands, each once, in registration order."""
+    return list({id(spec): spec for spec in COMMANDS.values()}.values())
+
+
+def load_plugins() -> list:
+    """Imports the modules that register additional commands.
+
+    Plugins are the modules listed, comma separated, in the
+    ASSISTANT_PLUGINS environment variable and the entry points of the
+    'assistant.commands' group of installed packages. A plugin registers
+    its Command classes with register() when it is imported.
+
+    Returns:
+        list: The names of the loaded plugins.
+
+    Raises:
+        ImportError: If a plugin can not be imported.
+    """
+    loaded = []
+    for module in os.environ.get('ASSISTANT_PLUGINS', '').split(','):
+        if module.strip():
+            import_module(module.strip())
+            loaded.append(module.strip())
+    for entry_point in entry_points(group=PLUGIN_GROUP):
+        entry_point.load()
+        loaded.append(entry_point.name)
+    return loaded
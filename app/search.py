@@ -0,0 +1,203 @@
+"""imports"""
+import threading
+from bisect import bisect_left, insort
+
+SEPARATOR = '\0'
+INSORT_LIMIT = 64
+# At most this many trigrams of a text change with one edit (a swap of
+# two letters; other edits change 3).
+GRAMS_PER_EDIT = 4
+
+
+class NameIndex:
+    """Search index over contact names.
+
+    Prefix queries use a sorted list of 'casefolded name\\0name' keys and
+    binary search. Typo tolerant queries use an index of character
+    trigrams per name length, built on the first fuzzy query and then
+    kept up to date; under the None key it holds all names of a length.
+    Names added in bulk are buffered and merged into the sorted list on
+    the next query, so imports don't pay for an insertion sort. Those
+    lazy updates take a lock, so queries may run in several threads.
+
+    Methods:
+        - add: Index a new name.
+        - remove: Drop a name from the index.
+        - prefix: Find names starting with a text.
+        - fuzzy: Find names similar to a text.
+    """
+    def __init__(self, names=()) -> None:
+        self.keys = sorted(NameIndex.key(name) for name in names)
+        self.pending = []
+        self.grams = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str) -> str:
+        """Builds the sort key of a name."""
+        return f"{name.casefold()}{SEPARATOR}{name}"
+
+    @staticmethod
+    def trigrams(text: str) -> set:
+        """Splits a text into its character trigrams, padded with spaces
+        so short words and word starts get trigrams too."""
+        padded = f"  {text.casefold()} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, name: str) -> None:
+        """Indexes a new name."""
+        self.pending.append(NameIndex.key(name))
+        if self.grams is not None:
+            self.__index_grams(name)
+
+    def extend(self, keys: list) -> None:
+        """Indexes many names by their keys (NameIndex.key), built
+        elsewhere, e.g. in the worker processes of app.parallel."""
+        self.pending.extend(keys)
+        if self.grams is not None:
+            for key in keys:
+                self.__index_grams(key.split(SEPARATOR, 1)[1])
+
+    def remove(self, name: str) -> None:
+        """Drops a name from the index."""
+        self.__merge()
+        key = NameIndex.key(name)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+        if self.grams is not None:
+            postings = self.grams.get(len(name.casefold()), {})
+            for gram in (None, *NameIndex.trigrams(name)):
+                postings.get(gram, set()).discard(name)
+
+    def prefix(self, text: str, limit: int = 20) -> list:
+        """Finds names starting with the text, ignoring case.
+
+        Args:
+            text (str): The beginning of the name.
+            limit (int): The maximal number of names to return.
+
+        Returns:
+            list: Matching names in alphabetical order.
+        """
+        self.__merge()
+        folded = text.casefold()
+        found = []
+        position = bisect_left(self.keys, folded)
+        while position < len(self.keys) and len(found) < limit:
+            key = self.keys[position]
+            if not key.startswith(folded):
+                break
+            found.append(key.split(SEPARATOR, 1)[1])
+            position += 1
+        return found
+
+    def fuzzy(self, text: str, limit: int = 20, max_edits=None) -> list:
+        """Finds names within a few typos (edits) of the text.
+
+        Trigrams are indexed per name length, so only names whose length
+        is within max_edits of the text are looked at. One edit changes
+        at most four trigrams (GRAMS_PER_EDIT), so a match shares all but
+        4 * max_edits trigrams with the text; by the pigeonhole principle
+        it appears in one of the 4 * max_edits + 1 rarest of them. Names
+        found there that miss more trigrams are dropped. A text with no
+        more trigrams than that may share none with a match, so all names
+        of the lengths are candidates then. The candidates are checked
+        with the edit distance, where a swap of two neighbouring letters
+        is one edit.
+
+        Args:
+            text (str): The (possibly misspelled) name.
+            limit (int): The maximal number of names to return.
+            max_edits (int, optional): Allowed typos; 1 for names of up
+                to 6 letters and 2 for longer ones by default.
+
+        Returns:
+            list: Matching names, the closest first.
+        """
+        self.__merge()
+        with self.lock:
+            if self.grams is None:
+                self.grams = {}
+                for key in self.keys:
+                    self.__index_grams(key.split(SEPARATOR, 1)[1])
+        folded = text.casefold()
+        if max_edits is None:
+            max_edits = 1 if len(folded) <= 6 else 2
+        wanted = NameIndex.trigrams(folded)
+        found = []
+        for length in range(len(folded) - max_edits,
+                            len(folded) + max_edits + 1):
+            postings = self.grams.get(length)
+            if not postings:
+                continue
+            spread = GRAMS_PER_EDIT * max_edits
+            if len(wanted) > spread:
+                lists = sorted(
+                    (postings.get(gram, ()) for gram in wanted), key=len
+                )
+                candidates = [
+                    name for name in set().union(*lists[:spread + 1])
+                    if sum(name in names for names in lists)
+                    >= len(wanted) - spread
+                ]
+            else:
+                candidates = postings[None]
+            for name in candidates:
+                distance = edit_distance(folded, name.casefold(), max_edits)
+                if distance <= max_edits:
+                    found.append((distance, name))
+        found.sort()
+        return [name for _, name in found[:limit]]
+
+    def __index_grams(self, name: str) -> None:
+        postings = self.grams.setdefault(len(name.casefold()), {})
+        for gram in (None, *NameIndex.trigrams(name)):
+            postings.setdefault(gram, set()).add(name)
+
+    def __merge(self) -> None:
+        """Moves buffered names into the sorted list: one by one if there
+        are few of them, by sorting the whole list after a bulk insert."""
+        if self.pending:
+            with self.lock:
+                if len(self.pending) <= INSORT_LIMIT:
+                    for key in self.pending:
+                        insort(self.keys, key)
+                elif self.pending:
+                    self.keys.extend(self.pending)
+                    self.keys.sort()
+                self.pending = []
+
+
+def edit_distance(first: str, second: str, bound: int) -> int:
+    """Edit distance of two strings (optimal string alignment: Levenshtein
+    distance where a swap of two neighbouring letters is one edit), giving
+    up early once it is certain to exceed bound (then bound + 1 is
+    returned). Only the cells within bound of the diagonal are computed,
+    the others are further apart than bound anyway."""
+    if abs(len(first) - len(second)) > bound:
+        return bound + 1
+    beyond = bound + 1
+    before = None
+    previous = [min(column, beyond) for column in range(len(second) + 1)]
+    for row, char in enumerate(first, start=1):
+        current = [beyond] * len(previous)
+        if row <= bound:
+            current[0] = row
+        for column in range(max(1, row - bound),
+                            min(len(second), row + bound) + 1):
+            other = second[column - 1]
+            distance = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (char != other),
+            )
+            if before is not None and column > 1 and char != other \
+                    and char == second[column - 2] \
+                    and first[row - 2] == other:
+                distance = min(distance, before[column - 2] + 1)
+            current[column] = distance
+        if min(current) > bound:
+            return beyond
+        before, previous = previous, current
+    return min(previous[-1], beyond)
@@ -0,0 +1,307 @@
+"""imports"""
+import asyncio
+from collections import deque
+from collections.abc import Iterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from app.books import book_path
+from app.dispatch import COMMAND_ERRORS, COMMANDS, EXIT_COMMANDS, \
+    command_error, make_command, parse_input
+from app.file import FileException
+from app.interface import Interface
+from app.protection import Cipher
+from app.storage import backend
+
+PROMPT = "Enter a command: "
+PASSWORD_PROMPT = "Please, enter password to AddressBook: "
+BOOK_PROMPT = "Please, enter the name of your AddressBook: "
+LIMIT = 64 * 1024
+NOT_ON_SERVER = "This command is not available on the server.\n"
+
+
+class ReadWriteLock:
+    """An asyncio lock shared by readers and exclusive to writers.
+
+    Waiting tasks are queued in arrival order and only the ones that can
+    proceed are woken, so a release does not wake every waiting client.
+    A waiting writer holds back the readers queued behind it, so a steady
+    stream of reads can not starve the writes.
+
+    Methods:
+        - read: Context manager for shared access.
+        - write: Context manager for exclusive access.
+    """
+    def __init__(self) -> None:
+        self.readers = 0
+        self.writer = False
+        self.waiting = deque()
+
+    @asynccontextmanager
+    async def read(self):
+        await self.__acquire(writer=False)
+        try:
+            yield
+        finally:
+            self.readers -= 1
+            self.__wake()
+
+    @asynccontextmanager
+    async def write(self):
+        await self.__acquire(writer=True)
+        try:
+            yield
+        finally:
+            self.writer = False
+            self.__wake()
+
+    async def __acquire(self, writer: bool) -> None:
+        if not self.waiting and not self.writer \
+                and not (writer and self.readers):
+            self.__grant(writer)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append((writer, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation: give it back.
+                if writer:
+                    self.writer = False
+                else:
+                    self.readers -= 1
+            else:
+                self.waiting.remove((writer, future))
+            self.__wake()
+            raise
+
+    def __grant(self, writer: bool) -> None:
+        if writer:
+            self.writer = True
+        else:
+            self.readers += 1
+
+    def __wake(self) -> None:
+        """Grants the lock to the tasks at the head of the queue: one
+        writer, or all readers up to the next writer."""
+        while self.waiting and not self.writer:
+            writer, future = self.waiting[0]
+            if writer and self.readers:
+                return
+            self.waiting.popleft()
+            self.__grant(writer)
+            future.set_result(None)
+
+
+class StreamInterface(Interface):
+    """Interface over an asyncio stream (a TCP or Unix socket connection).
+
+    The conversation is the same as on the command line: every answer is
+    followed by the prompt, so clients read up to the prompt to get
+    a complete answer.
+    """
+    def __init__(self, reader, writer) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def asking(self, phrase):
+        """Sends the prompt and waits for a line.
+
+        Raises:
+            EOFError: If the client closed the connection.
+        """
+        self.writer.write(phrase.encode('utf-8'))
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError
+        return line.decode('utf-8', errors='replace')
+
+    async def answer(self, phrase):
+        self.writer.write(f"{phrase}\n".encode('utf-8'))
+        await self.writer.drain()
+
+
+def render(message) -> str:
+    """Executes a command and renders its answer as the command line
+    interface prints it."""
+    result = message.execute()
+    if isinstance(result, Iterator):
+        return ''.join(result)
+    return result
+
+
+class BookServer:
+    """Serves address books to many clients at once.
+
+    With a default book, every client works on it. Otherwise every client
+    first names its book, a file in the folder of books (book_path), which
+    the registry loads on first use and closes when nobody has used it for
+    a while, so one process can host the books of many users. Then the
+    client gives the password of the book and sends one command per line.
+    Commands run in worker threads, so a long answer (all, fuzzy search)
+    does not hold up other clients. Reading commands of a book run side
+    by side, commands registered as writing to the book run alone in it.
+    Commands that open files named by the client (import, export,
+    snapshot) are refused: they would run with the rights of the server
+    on any of its files. So are those that change what all books share
+    (stats --reset), which one client would change for the others.
+
+    Args:
+        books (BookRegistry): The open books.
+        default (Path, optional): The book of every client, already open
+            in the registry.
+        folder (Path, optional): The folder of the named books.
+        suffix (str, optional): The file suffix of the named books, which
+            picks their storage (app.storage.backend).
+    """
+    def __init__(self, books, default=None, folder=None,
+                 suffix='.pkl') -> None:
+        self.books = books
+        self.default = default
+        self.folder = folder
+        self.suffix = suffix
+        self.locks = {}
+        self.login_lock = asyncio.Lock()
+
+    def lock(self, path) -> ReadWriteLock:
+        """The lock of the commands of a book."""
+        return self.locks.setdefault(path, ReadWriteLock())
+
+    async def choose(self, interface: StreamInterface):
+        """Asks for the name of the book, unless there is a default one.
+
+        Returns:
+            Path: The database of the book, or None after three invalid
+                names.
+        """
+        if self.default is not None:
+            return self.default
+        for attempt in range(3):
+            name = (await interface.asking(BOOK_PROMPT)).strip()
+            try:
+                return book_path(self.folder, name, self.suffix)
+            except ValueError as e:
+                await interface.answer(f"{e}. {2 - attempt} attempts left.")
+        await interface.answer("Access denied.")
+        return None
+
+    async def login(self, interface: StreamInterface, path):
+        """Asks for the password of the book, three attempts like the
+        command line, and opens the book.
+
+        Keys are derived one at a time: a crowd of clients connecting at
+        once then derives the key once and finds it in Cipher.keys, and
+        guessing passwords gets no faster with more connections.
+
+        A book that is not encrypted (a snapshot) is opened without a
+        password.
+
+        Returns:
+            Book: The opened book, to be released, or None if access is
+                denied.
+        """
+        if not backend(path).ENCRYPTED:
+            return await asyncio.to_thread(self.books.open, path, None)
+        for attempt in range(3):
+            password = await interface.asking(PASSWORD_PROMPT)
+            password = password.rstrip('\r\n')
+            async with self.login_lock:
+                cipher = await asyncio.to_thread(
+                    lambda: Cipher(password, **self.books.kdf_params(path))
+                )
+            book = await asyncio.to_thread(self.books.open, path, cipher)
+            if book is not None:
+                return book
+            await interface.answer(
+                f"Incorrect password. {2 - attempt} attempts left."
+            )
+        await interface.answer("Access denied.")
+        return None
+
+    async def execute(self, book, command: str, args: list) -> str:
+        """Runs a command on a book under its lock and returns the
+        answer."""
+        spec = COMMANDS.get(command)
+        if spec is not None and spec.local(args):
+            return NOT_ON_SERVER
+        message = make_command(command, args, book.contacts, book.storage)
+        lock = self.lock(book.path)
+        access = lock.write if spec is not None and spec.writes \
+            else lock.read
+        async with access():
+            return await asyncio.to_thread(render, message)
+
+    async def handle(self, reader, writer) -> None:
+        """Talks to one client until it exits or disconnects."""
+        interface = StreamInterface(reader, writer)
+        book = None
+        try:
+            path = await self.choose(interface)
+            if path is None:
+                return
+            book = await self.login(interface, path)
+            if book is None:
+                return
+            await interface.answer("Welcome to the assistant bot!\n"
+                                   "(enter 'help' for list of commands)\n")
+            while True:
+                command, *args = parse_input(await interface.asking(PROMPT))
+                if command in EXIT_COMMANDS:
+                    await interface.answer("Good bye!\n")
+                    return
+                try:
+                    answer = await self.execute(book, command, args)
+                except COMMAND_ERRORS as e:
+                    answer = command_error(e)
+                await interface.answer(answer)
+        except FileException as e:
+            await interface.answer(f"{e}\n")
+        except (EOFError, ConnectionError, ValueError):
+            # ValueError: a line longer than LIMIT.
+            pass
+        finally:
+            if book is not None:
+                await asyncio.to_thread(self.books.release, book)
+            writer.close()
+
+    async def sweep(self) -> None:
+        """Closes idle books now and then, also while no client comes or
+        goes."""
+        while True:
+            await asyncio.sleep(min(self.books.idle, 60))
+            await asyncio.to_thread(self.books.evict)
+
+    async def start(self, address: str):
+        """Starts listening. An address with a ':' is a TCP host:port,
+        anything else a Unix socket path.
+
+        Returns:
+            asyncio.Server: The listening server.
+        """
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            return await asyncio.start_server(
+                self.handle, host, int(port), limit=LIMIT
+            )
+        return await asyncio.start_unix_server(
+            self.handle, address, limit=LIMIT
+        )
+
+
+async def serve(books, address: str, default=None, folder=None,
+                suffix='.pkl') -> None:
+    """Serves books on the address until cancelled, then closes them when
+    their running commands are done. The arguments are those of
+    BookServer."""
+    book_server = BookServer(books, default, folder, suffix)
+    server = await book_server.start(address)
+    sweeper = asyncio.create_task(book_server.sweep())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+        async with AsyncExitStack() as stack:
+            for lock in list(book_server.locks.values()):
+                await stack.enter_async_context(lock.write())
+            books.close()
@@ -0,0 +1,330 @@
+"""Splits a contacts file (data/contacts.pkl and its journal) into shards
+for ShardedBook.
+
+Usage:
+    python -m app.shards data/contacts.pkl data/shards 4
+"""
+import heapq
+import multiprocessing
+import sys
+import threading
+import zlib
+from datetime import date
+from getpass import getpass
+from itertools import islice
+from pathlib import Path
+from app.book import AddressBook
+from app.file import FileException, FileProcessor as fp
+from app.interface import CommandLineInterface
+from app.journal import Journal
+from app.protection import Cipher
+from app.storage import FileStorage
+
+SHARD_FILE = "shard-{index:03d}-of-{count:03d}.pkl"
+
+
+def shard_of(contact_name: str, count: int) -> int:
+    """The shard holding a contact. CRC32 of the name is the same in every
+    process, unlike hash() of a string."""
+    return zlib.crc32(contact_name.encode('utf-8')) % count
+
+
+def shard_paths(folder, count: int) -> list:
+    """The files of the shards of a book split in count."""
+    return [
+        Path(folder) / SHARD_FILE.format(index=index, count=count)
+        for index in range(count)
+    ]
+
+
+def split(contacts, folder, cipher, count: int) -> list:
+    """Writes the contacts of a book into shard files.
+
+    Args:
+        contacts (AddressBook): The book to split.
+        folder (Path): The folder of the shards, created if missing.
+        cipher (Cipher): The cipher of the book; the shards keep its KDF
+            parameters, so the password stays the same.
+        count (int): The number of shards.
+
+    Returns:
+        list: The number of contacts in every shard.
+
+    Raises:
+        FileException: If the folder already holds shards.
+    """
+    folder = Path(folder)
+    if any(folder.glob('shard-*.pkl')):
+        raise FileException(f"{folder} already holds shards")
+    folder.mkdir(parents=True, exist_ok=True)
+    parts = [{} for _ in range(count)]
+    for contact_name, record in contacts.data.items():
+        parts[shard_of(contact_name, count)][contact_name] = record
+    for path, part in zip(shard_paths(folder, count), parts):
+        fp.write_segments(path, fp.iter_segments(part), 0, cipher)
+    return [len(part) for part in parts]
+
+
+def apply(contacts, storage, operation: str, args) -> str:
+    """Executes a change in a shard and journals it, as the commands do."""
+    result = Journal.OPERATIONS[operation](contacts, args)
+    storage.append(contacts, operation, args)
+    return result
+
+
+def listing(contacts, storage, stop, sort: bool, contains) -> list:
+    """The records of a shard for show_all: the first stop ones (all if
+    stop is None), in name order if sort."""
+    names = iter(contacts.data)
+    if contains:
+        needle = contains.casefold()
+        names = (name for name in names if needle in name.casefold())
+    if sort:
+        names = iter(
+            sorted(names) if stop is None else heapq.nsmallest(stop, names)
+        )
+    return [contacts.data[name] for name in islice(names, stop)]
+
+
+# Requests a shard worker answers: operation names to functions of the
+# shard book, its storage and the arguments of the request.
+OPERATIONS = {
+    'len': lambda contacts, storage: len(contacts),
+    'apply': apply,
+    'find': lambda contacts, storage, args: contacts.find(args),
+    'show_birth_date':
+        lambda contacts, storage, args: contacts.show_birth_date(args),
+    'records': lambda contacts, storage, names:
+        [contacts.data.get(name) for name in names],
+    'owners': lambda contacts, storage, phone:
+        contacts.phone_index.get(phone, []),
+    'listing': listing,
+    'birthdays': lambda contacts, storage, days, today:
+        contacts.upcoming_birthdays(days, today),
+}
+
+
+def serve_shard(database, key: bytes, salt: bytes, iterations: int,
+                connection) -> None:
+    """Runs in a worker process: loads one shard and answers requests
+    until it gets None.
+
+    Every answer is (True, result), or (False, exception) if the request
+    failed. The first answer tells that the shard is loaded.
+    """
+    cipher = Cipher.from_key(key, salt, iterations)
+    storage = FileStorage(database, cipher)
+    try:
+        contacts = storage.load()
+        if contacts == 'wrong pass':
+            connection.send((False, FileException("Incorrect password.")))
+            return
+        connection.send((True, len(contacts)))
+        while (request := connection.recv()) is not None:
+            operation, args = request
+            try:
+                answer = (True, OPERATIONS[operation](contacts, storage, *args))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                answer = (False, e)
+            connection.send(answer)
+    finally:
+        storage.close()
+        connection.close()
+
+
+class ShardedBook:
+    """An address book split into shards held by worker processes.
+
+    Contacts are partitioned by a hash of their name (shard_of), and every
+    shard is an ordinary contacts file with its own journal, loaded by its
+    own process; AddressBook stays one per process. Requests for a contact
+    go to its shard. Lookups over all contacts (find_by_phone, show_all,
+    upcoming birthdays) are sent to all shards at once, so the shards work
+    in parallel, and their answers are merged. find_many groups many names
+    by shard into one request per shard, which is how lookups scale with
+    the cores: the cost of a round trip to a worker is paid per batch.
+
+    A request and its answers hold a lock, so threads can share the book;
+    their requests take turns on the pipes. The bot and the server do not
+    open books this way yet, benchmarks.bench_shards measures it.
+
+    Args:
+        folder (Path): The folder with the shard files made by split.
+        cipher (Cipher): The cipher of the book.
+
+    Raises:
+        FileException: If the folder holds no complete set of shards or
+            the password is wrong.
+    """
+    def __init__(self, folder, cipher) -> None:
+        paths = sorted(Path(folder).glob('shard-*.pkl'))
+        if not paths or paths != shard_paths(folder, len(paths)):
+            raise FileException(f"{folder} holds no complete set of shards")
+        context = multiprocessing.get_context('spawn')
+        self.connections, self.workers = [], []
+        self.lock = threading.Lock()
+        for path in paths:
+            ours, theirs = context.Pipe()
+            worker = context.Process(
+                target=serve_shard,
+                args=(str(path), cipher.key, cipher.salt, cipher.iterations,
+                      theirs),
+                daemon=True,
+            )
+            worker.start()
+            theirs.close()
+            self.connections.append(ours)
+            self.workers.append(worker)
+        try:
+            self.sizes = [
+                ShardedBook.__unwrap(connection.recv())
+                for connection in self.connections
+            ]
+        except (FileException, EOFError):
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return sum(self.__ask_all('len'))
+
+    def __enter__(self) -> 'ShardedBook':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def __unwrap(answer: tuple):
+        succeeded, result = answer
+        if not succeeded:
+            raise result
+        return result
+
+    def __ask(self, contact_name: str, operation: str, *args):
+        """Sends a request to the shard of a contact."""
+        connection = self.connections[
+            shard_of(contact_name, len(self.connections))
+        ]
+        with self.lock:
+            connection.send((operation, args))
+            answer = connection.recv()
+        return ShardedBook.__unwrap(answer)
+
+    def __ask_all(self, operation: str, *args) -> list:
+        """Sends a request to all shards, then collects the answers."""
+        with self.lock:
+            for connection in self.connections:
+                connection.send((operation, args))
+            answers = [connection.recv() for connection in self.connections]
+        return [ShardedBook.__unwrap(answer) for answer in answers]
+
+    def add_record(self, args) -> str:
+        return self.__ask(args[0] if args else '', 'apply', 'add', args)
+
+    def birthday_date(self, contact_name, birth_date) -> str:
+        return self.__ask(contact_name, 'apply', 'add-birthday',
+                          (contact_name, birth_date))
+
+    def change_phone(self, contact_name, old_phone, new_phone) -> str:
+        return self.__ask(contact_name, 'apply', 'change',
+                          (contact_name, old_phone, new_phone))
+
+    def delete(self, args) -> str:
+        return self.__ask(args[0] if args else '', 'apply', 'delete', args)
+
+    def find(self, args):
+        return self.__ask(args[0] if args else '', 'find', args)
+
+    def show_birth_date(self, args):
+        return self.__ask(args[0] if args else '', 'show_birth_date', args)
+
+    def find_many(self, names) -> dict:
+        """Finds many contacts with one request per shard.
+
+        Returns:
+            dict: Names to records, None for unknown names.
+        """
+        groups = [[] for _ in self.connections]
+        for contact_name in names:
+            groups[shard_of(contact_name, len(groups))].append(contact_name)
+        asked = []
+        with self.lock:
+            for connection, group in zip(self.connections, groups):
+                if group:
+                    connection.send(('records', (group,)))
+                    asked.append((connection, group))
+            answers = [(group, connection.recv())
+                       for connection, group in asked]
+        found = {}
+        for group, answer in answers:
+            found.update(zip(group, ShardedBook.__unwrap(answer)))
+        return found
+
+    def find_by_phone(self, phone_number: str) -> str:
+        """Finds the owner of a phone in all shards at once."""
+        for owners in self.__ask_all('owners', phone_number):
+            if owners:
+                return owners[0]
+        return "No contact found with this phone number"
+
+    def show_all(self, page=None, size=20, sort=False, contains=None):
+        """Lists the contacts of all shards like AddressBook.show_all.
+
+        Every shard sends at most page * size records; sorted listings are
+        merged by name.
+        """
+        start = stop = None
+        if page is not None:
+            start, stop = (page - 1) * size, page * size
+        parts = self.__ask_all('listing', stop, sort, contains)
+        records = heapq.merge(*parts, key=lambda record: record.name) \
+            if sort else (record for part in parts for record in part)
+        for record in islice(records, start, stop):
+            yield f"{record}\n"
+
+    def upcoming_birthdays(self, days=7, today=None) -> list:
+        """Collects the birthdays of all shards, merged by congratulation
+        date."""
+        today = today or date.today()
+        return list(heapq.merge(
+            *self.__ask_all('birthdays', days, today),
+            key=lambda birthday: birthday[0],
+        ))
+
+    get_upcoming_birthdays = AddressBook.get_upcoming_birthdays
+
+    def close(self) -> None:
+        """Stops the workers; they close their journals."""
+        with self.lock:
+            for connection in self.connections:
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for worker, connection in zip(self.workers, self.connections):
+                worker.join()
+                connection.close()
+            self.connections, self.workers = [], []
+
+
+def main():
+    if len(sys.argv) != 4 or not sys.argv[3].isdigit():
+        sys.exit(__doc__)
+    source, folder, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    password = getpass("Please, enter password to AddressBook: ")
+    cipher = Cipher(password, **FileStorage.kdf_params(source))
+    contacts = FileStorage(source, cipher).load()
+    if contacts == 'wrong pass':
+        sys.exit("Incorrect password.")
+    try:
+        sizes = split(contacts, folder, cipher, max(count, 1))
+    except FileException as e:
+        sys.exit(str(e))
+    CommandLineInterface().answer(
+        f"Split {sum(sizes)} contacts into {len(sizes)} shards in "
+        f"{folder}: {', '.join(map(str, sizes))}."
+    )
+
+
+if __name__ == "__main__":
+    main()
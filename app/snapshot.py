@@ -0,0 +1,356 @@
+"""imports"""
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from app.book import AddressBook
+from app.file import FileException, FileProcessor
+from app.functions import BirthdayFunctions as birth
+from app.record import Phone, Record
+from app.search import edit_distance
+
+MAGIC = b'ABS1'
+ALIGNMENT = 8
+SECTIONS = (
+    # name, array type code
+    ('name_offsets', 'Q'),
+    ('names', 'B'),
+    ('phone_offsets', 'I'),
+    ('phones', 'B'),
+    ('birth_ordinals', 'I'),
+    ('fold_order', 'I'),
+    ('phone_keys', 'q'),
+    ('phone_owners', 'I'),
+    ('slot_offsets', 'I'),
+    ('slot_owners', 'I'),
+)
+
+
+def write_snapshot(path, contacts) -> int:
+    """Writes a book into a snapshot file.
+
+    The snapshot is NOT encrypted: anyone who can read the file can read
+    the contacts, so it is created readable by its owner only, and it is
+    opened without a password.
+
+    Args:
+        path (Path): The snapshot file to write.
+        contacts (AddressBook): The book to write.
+
+    Returns:
+        int: The number of written contacts.
+    """
+    names = sorted(contacts.data)
+    records = [contacts.data[name] for name in names]
+    encoded = [name.encode('utf-8') for name in names]
+    name_offsets = array('Q', [0])
+    for name in encoded:
+        name_offsets.append(name_offsets[-1] + len(name))
+    phone_offsets = array('I', [0])
+    for record in records:
+        phone_offsets.append(
+            phone_offsets[-1] + len(record.packed_phones) // Phone.SIZE
+        )
+    phones = sorted(
+        (int.from_bytes(record.packed_phones[i:i + Phone.SIZE], 'big'),
+         position)
+        for position, record in enumerate(records)
+        for i in range(0, len(record.packed_phones), Phone.SIZE)
+    )
+    slots = [[] for _ in range(birth.SLOTS)]
+    for position, record in enumerate(records):
+        if record.birth_ordinal:
+            slots[birth.ordinal_slot(record.birth_ordinal)].append(position)
+    slot_offsets = array('I', [0])
+    for owners in slots:
+        slot_offsets.append(slot_offsets[-1] + len(owners))
+    sections = {
+        'name_offsets': name_offsets,
+        'names': b''.join(encoded),
+        'phone_offsets': phone_offsets,
+        'phones': b''.join(record.packed_phones for record in records),
+        'birth_ordinals': array(
+            'I', (record.birth_ordinal for record in records)
+        ),
+        'fold_order': array('I', sorted(
+            range(len(names)), key=lambda i: (names[i].casefold(), names[i])
+        )),
+        'phone_keys': array('q', (phone for phone, _ in phones)),
+        'phone_owners': array('I', (owner for _, owner in phones)),
+        'slot_offsets': slot_offsets,
+        'slot_owners': array(
+            'I', (position for owners in slots for position in owners)
+        ),
+    }
+    layout, position = {}, 0
+    for name, _ in SECTIONS:
+        size = len(memoryview(sections[name]).cast('B'))
+        layout[name] = (position, size)
+        position += size + -size % ALIGNMENT
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'count': len(names),
+        'seq': contacts.journal_seq,
+        'sections': layout,
+    }).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+    temporary = f"{path}.tmp"
+    descriptor = os.open(
+        temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+    )
+    with open(descriptor, 'wb') as file:
+        file.write(MAGIC + len(header).to_bytes(4, 'big') + header)
+        for name, _ in SECTIONS:
+            data = memoryview(sections[name]).cast('B')
+            file.write(data)
+            file.write(b'\0' * (-len(data) % ALIGNMENT))
+        FileProcessor.sync(file)
+    FileProcessor.replace(temporary, path)
+    return len(names)
+
+
+class Snapshot:
+    """A snapshot file, mapped into memory.
+
+    Opening a snapshot only reads its header: all sections are views of
+    the mapped file, and the operating system pages them in as they are
+    touched. The contacts are sorted by name, so a contact is found by
+    a binary search that decodes about log2(count) names.
+
+    Sections:
+        - name_offsets, names: The UTF-8 names, sorted.
+        - phone_offsets, phones: The 5 byte packed phones of every contact.
+        - birth_ordinals: Date ordinals of the birthdays, 0 if none.
+        - fold_order: Contacts ordered by casefolded name, for prefix search.
+        - phone_keys, phone_owners: Sorted phone numbers and their owners.
+        - slot_offsets, slot_owners: Contacts by day of year of birth.
+
+    Raises:
+        FileException: If the file is not a snapshot of this platform.
+    """
+    def __init__(self, path) -> None:
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise FileException(f"{path} is not a snapshot")
+            length = int.from_bytes(file.read(4), 'big')
+            self.header = json.loads(file.read(length))
+            if self.header['byteorder'] != sys.byteorder:
+                raise FileException(f"{path} was written on another platform")
+            start = len(MAGIC) + 4 + length
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = self.header['count']
+        self.view = memoryview(self.map)
+        for name, code in SECTIONS:
+            position, size = self.header['sections'][name]
+            section = self.view[start + position:start + position + size]
+            setattr(self, name, section.cast(code))
+
+    def encoded_name(self, position: int) -> bytes:
+        """The UTF-8 name of the contact at a position."""
+        offsets = self.name_offsets
+        return self.names[offsets[position]:offsets[position + 1]].tobytes()
+
+    def name(self, position: int) -> str:
+        """Decodes the name of the contact at a position."""
+        return self.encoded_name(position).decode('utf-8')
+
+    def position(self, contact_name: str):
+        """Finds the position of a contact, or None if there is none.
+
+        UTF-8 keeps the order of code points, so the encoded names are
+        compared without decoding them.
+        """
+        encoded = contact_name.encode('utf-8')
+        position = bisect_left(
+            range(self.count), encoded, key=self.encoded_name
+        )
+        if position < self.count and self.encoded_name(position) == encoded:
+            return position
+        return None
+
+    def record(self, position: int) -> Record:
+        """Materializes the Record of the contact at a position."""
+        offsets = self.phone_offsets
+        return Record.from_parts(
+            self.name(position),
+            bytes(self.phones[offsets[position] * Phone.SIZE:
+                              offsets[position + 1] * Phone.SIZE]),
+            self.birth_ordinals[position],
+        )
+
+    def close(self) -> None:
+        """Releases the views and unmaps the file."""
+        for name, _ in SECTIONS:
+            getattr(self, name).release()
+        self.view.release()
+        self.map.close()
+
+
+class SnapshotRecords(Mapping):
+    """Read-only mapping of names to records over a snapshot, in the
+    order of the names. Records are built on access."""
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+
+    def __getitem__(self, contact_name: str) -> Record:
+        position = self.snapshot.position(contact_name)
+        if position is None:
+            raise KeyError(contact_name)
+        return self.snapshot.record(position)
+
+    def __contains__(self, contact_name) -> bool:
+        return self.snapshot.position(contact_name) is not None
+
+    def __iter__(self):
+        return map(self.snapshot.name, range(self.snapshot.count))
+
+    def __len__(self) -> int:
+        return self.snapshot.count
+
+    def values(self):
+        return map(self.snapshot.record, range(self.snapshot.count))
+
+
+class SnapshotPhones(Mapping):
+    """Read-only phone_index over a snapshot: phone numbers to the names
+    of their owners."""
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+
+    def __getitem__(self, phone_number: str) -> list:
+        if len(phone_number) != 10 or not phone_number.isdigit():
+            raise KeyError(phone_number)
+        keys, phone = self.snapshot.phone_keys, int(phone_number)
+        position = bisect_left(keys, phone)
+        owners = []
+        while position < len(keys) and keys[position] == phone:
+            owners.append(
+                self.snapshot.name(self.snapshot.phone_owners[position])
+            )
+            position += 1
+        if not owners:
+            raise KeyError(phone_number)
+        return owners
+
+    def __iter__(self):
+        keys, previous = self.snapshot.phone_keys, None
+        for phone in keys:
+            if phone != previous:
+                yield f"{phone:010d}"
+            previous = phone
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class SnapshotBirthdays:
+    """Read-only birthday_index over a snapshot: the names of the contacts
+    born on every day of year slot."""
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+
+    def __getitem__(self, slot: int) -> list:
+        offsets, owners = self.snapshot.slot_offsets, self.snapshot.slot_owners
+        return [
+            self.snapshot.name(owners[position])
+            for position in range(offsets[slot], offsets[slot + 1])
+        ]
+
+    def __len__(self) -> int:
+        return birth.SLOTS
+
+
+class SnapshotNames:
+    """Read-only name_index over a snapshot.
+
+    Prefix search runs a binary search over the contacts in casefolded
+    order. Fuzzy search has no trigram index in the file and scans all
+    names.
+    """
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+
+    def folded(self, rank: int) -> str:
+        """The casefolded name at a position of the casefolded order."""
+        return self.snapshot.name(self.snapshot.fold_order[rank]).casefold()
+
+    def prefix(self, text: str, limit: int = 20) -> list:
+        folded = text.casefold()
+        rank = bisect_left(range(self.snapshot.count), folded,
+                           key=self.folded)
+        found = []
+        while rank < self.snapshot.count and len(found) < limit:
+            name = self.snapshot.name(self.snapshot.fold_order[rank])
+            if not name.casefold().startswith(folded):
+                break
+            found.append(name)
+            rank += 1
+        return found
+
+    def fuzzy(self, text: str, limit: int = 20, max_edits=None) -> list:
+        folded = text.casefold()
+        if max_edits is None:
+            max_edits = 1 if len(folded) <= 6 else 2
+        found = []
+        for name in map(self.snapshot.name, range(self.snapshot.count)):
+            distance = edit_distance(folded, name.casefold(), max_edits)
+            if distance <= max_edits:
+                found.append((distance, name))
+        found.sort()
+        return [name for _, name in found[:limit]]
+
+
+class SnapshotBook:
+    """Read-only address book over a snapshot file.
+
+    It offers the lookups of AddressBook with the same results, backed
+    by the sections of the mapped file instead of dicts, so opening it
+    takes the same time for any number of contacts. Changes are refused.
+    The contacts are in name order: an unsorted listing, and the owners of
+    a shared phone, follow it instead of the order the contacts were added
+    in.
+
+    Attributes:
+        snapshot (Snapshot): The mapped file.
+        data (SnapshotRecords): Names to records, built on access.
+        phone_index (SnapshotPhones): Phones to the names of their owners.
+        birthday_index (SnapshotBirthdays): Names by day of year of birth.
+        name_index (SnapshotNames): Prefix and fuzzy name search.
+        journal_seq (int): The last journal entry in the snapshot.
+    """
+    READ_ONLY = "The book is opened from a read-only snapshot."
+
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+        self.data = SnapshotRecords(snapshot)
+        self.phone_index = SnapshotPhones(snapshot)
+        self.birthday_index = SnapshotBirthdays(snapshot)
+        self.name_index = SnapshotNames(snapshot)
+        self.journal_seq = snapshot.header['seq']
+
+    def __contains__(self, contact_name) -> bool:
+        return contact_name in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    find = AddressBook.find
+    find_by_phone = AddressBook.find_by_phone
+    search = AddressBook.search
+    show_all = AddressBook.show_all
+    show_birth_date = AddressBook.show_birth_date
+    upcoming_birthdays = AddressBook.upcoming_birthdays
+    get_upcoming_birthdays = AddressBook.get_upcoming_birthdays
+
+    def read_only(self, *args) -> str:
+        """Refuses a change of the book."""
+        return SnapshotBook.READ_ONLY
+
+    add_record = birthday_date = change_phone = delete = read_only
+    add_phone = remove_phone = read_only
+
+    def insert(self, user_record, phones=None) -> bool:
+        raise FileException(SnapshotBook.READ_ONLY)
@@ -0,0 +1,163 @@
+"""imports"""
+import atexit
+import cProfile
+import functools
+import os
+import sys
+import threading
+from time import perf_counter
+
+# Timers are only installed when ASSISTANT_STATS is set, so without it
+# the decorated functions are the plain functions.
+ENABLED = bool(os.environ.get('ASSISTANT_STATS'))
+# cProfile output file, for pstats or snakeviz.
+PROFILE = os.environ.get('ASSISTANT_PROFILE')
+# Histogram buckets are powers of two microseconds: up to 2**(BUCKETS - 1).
+BUCKETS = 32
+
+TIMERS = {}
+COUNTERS = {}
+_lock = threading.Lock()
+
+
+class Timer:
+    """Calls and latencies of one code path.
+
+    Latencies are kept in a histogram of power of two microsecond
+    buckets, so a timer takes the same memory for any number of calls and
+    percentiles are known to a factor of two.
+
+    Attributes:
+        count (int): The number of calls.
+        total (float): The time of all calls, in seconds.
+        longest (float): The longest call, in seconds.
+        buckets (list): Calls by bucket; bucket b holds the calls that
+            took less than 2**b microseconds and not less than half that.
+    """
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, elapsed: float) -> None:
+        bucket = min(int(elapsed * 1e6).bit_length(), BUCKETS - 1)
+        with self.lock:
+            self.count += 1
+            self.total += elapsed
+            self.longest = max(self.longest, elapsed)
+            self.buckets[bucket] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """The upper bound of the bucket holding a percentile, in seconds."""
+        wanted, seen = fraction * self.count, 0
+        for bucket, calls in enumerate(self.buckets):
+            seen += calls
+            if calls and seen >= wanted:
+                return min((1 << bucket) / 1e6, self.longest)
+        return self.longest
+
+
+def timer(name: str) -> Timer:
+    """Returns the timer of a name, creating it on first use."""
+    with _lock:
+        return TIMERS.setdefault(name, Timer())
+
+
+def timed(name: str):
+    """Decorator that times every call of a function under a name.
+
+    Without ASSISTANT_STATS the function is returned as it is, so the
+    instrumentation costs nothing. Functions returning an iterator are
+    timed until they return it, not while it is consumed.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        path = timer(name)
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                path.add(perf_counter() - start)
+
+        return inner
+
+    return decorator
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds to a counter. Callers check ENABLED first on hot paths."""
+    with _lock:
+        COUNTERS[name] = COUNTERS.get(name, 0) + amount
+
+
+def reset() -> None:
+    """Forgets all measurements."""
+    with _lock:
+        for path in TIMERS.values():
+            with path.lock:
+                path.clear()
+        COUNTERS.clear()
+
+
+def report(histograms: bool = False) -> str:
+    """Renders the timers, slowest in total first, and the counters.
+
+    Args:
+        histograms (bool, optional): Whether to add the latency histogram
+            of every timer.
+
+    Returns:
+        str: The report, one line per timer and counter.
+    """
+    lines = [f"{'name':<28}{'calls':>9}{'total ms':>11}{'mean us':>10}"
+             f"{'p50 us':>9}{'p99 us':>9}{'max us':>10}"]
+    with _lock:
+        timers = sorted(TIMERS.items(), key=lambda item: -item[1].total)
+        counters = sorted(COUNTERS.items())
+    for name, path in timers:
+        if not path.count:
+            continue
+        lines.append(
+            f"{name:<28}{path.count:>9}{path.total * 1e3:>11.1f}"
+            f"{path.total / path.count * 1e6:>10.0f}"
+            f"{path.percentile(0.5) * 1e6:>9.0f}"
+            f"{path.percentile(0.99) * 1e6:>9.0f}"
+            f"{path.longest * 1e6:>10.0f}"
+        )
+        if histograms:
+            lines.extend(
+                f"    < {1 << bucket:>10} us {calls:>9}"
+                for bucket, calls in enumerate(path.buckets) if calls
+            )
+    lines.extend(f"{name:<28}{value:>9}" for name, value in counters)
+    return '\n'.join(lines) + '\n'
+
+
+def run(main) -> None:
+    """Runs the bot, under cProfile if ASSISTANT_PROFILE names a file.
+
+    The profile is written when the bot exits, and with ASSISTANT_STATS
+    the report with histograms goes to stderr. cProfile only sees the
+    main thread, not the workers of the server.
+    """
+    if ENABLED:
+        atexit.register(lambda: sys.stderr.write(report(histograms=True)))
+    if not PROFILE:
+        main()
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        main()
+    finally:
+        profile.disable()
+        profile.dump_stats(PROFILE)
@@ -0,0 +1,509 @@
+"""imports"""
+import base64
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from cryptography.fernet import InvalidToken
+from app import codec, parallel
+from app.book import AddressBook
+from app.file import FileException, FileProcessor as fp
+from app.functions import BirthdayFunctions as birth
+from app.journal import Journal
+from app.lazy import LazyBook
+from app.record import Phone
+from app.snapshot import MAGIC as SNAPSHOT_MAGIC, Snapshot, SnapshotBook
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+SNAPSHOT_SUFFIXES = ('.snap',)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name_mac BLOB NOT NULL UNIQUE,
+    record BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phones (
+    phone_mac BLOB NOT NULL,
+    contact_id INTEGER NOT NULL REFERENCES contacts (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS phones_by_mac ON phones (phone_mac);
+CREATE INDEX IF NOT EXISTS phones_by_contact ON phones (contact_id);
+CREATE TABLE IF NOT EXISTS birthdays (
+    slot INTEGER NOT NULL,
+    contact_id INTEGER NOT NULL UNIQUE
+        REFERENCES contacts (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS birthdays_by_slot ON birthdays (slot);
+"""
+
+
+class Storage(ABC):
+    """Where an AddressBook is kept between sessions.
+
+    The commands work on the AddressBook in memory and report every
+    mutation to the storage right after it was applied, so each backend
+    decides how much has to be written per change.
+
+    Args:
+        database (Path): The location of the book.
+        cipher (Cipher): The cipher of the book, None if it is not
+            ENCRYPTED.
+
+    Attributes:
+        ENCRYPTED (bool): Whether the book is encrypted and opened with a
+            password.
+
+    Methods:
+        - kdf_params: Read the KDF parameters the book was written with.
+        - load: Read the book.
+        - append: Persist a mutation made by a command.
+        - compact: Persist the whole book, after bulk changes.
+        - save_changes: Persist the contacts changed since the last save.
+        - close: Flush everything and release the database.
+    """
+    ENCRYPTED = True
+
+    def __init__(self, database, cipher) -> None:
+        self.database = Path(database)
+        self.cipher = cipher
+
+    @staticmethod
+    @abstractmethod
+    def kdf_params(database) -> dict:
+        pass
+
+    @abstractmethod
+    def load(self):
+        pass
+
+    @abstractmethod
+    def append(self, contacts, operation: str, args) -> None:
+        pass
+
+    @abstractmethod
+    def compact(self, contacts) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def save_changes(self, contacts, names) -> None:
+        """Persists the given contacts, as they are in the book now, after
+        changes that were not appended one by one. Writes the whole book
+        unless the backend can do better.
+
+        Args:
+            contacts (AddressBook): The changed book.
+            names (set): The names of the changed contacts.
+        """
+        self.compact(contacts)
+
+
+def backend(database) -> type:
+    """Picks the storage class for a database by its suffix: SQLite for
+    .db, .sqlite and .sqlite3 files, a read-only snapshot for .snap files,
+    the encrypted contacts file otherwise.
+    """
+    suffix = Path(database).suffix.lower()
+    if suffix in SQLITE_SUFFIXES:
+        return SQLiteStorage
+    if suffix in SNAPSHOT_SUFFIXES:
+        return SnapshotStorage
+    return FileStorage
+
+
+class FileStorage(Storage):
+    """The encrypted contacts file of FileProcessor with its journal.
+
+    Mutations go to the journal and the file is rewritten as a whole
+    when the journal is compacted. With ASSISTANT_WORKERS above one, the
+    file is loaded and saved by that many processes (app.parallel).
+    """
+    def __init__(self, database, cipher) -> None:
+        super().__init__(database, cipher)
+        self.journal = Journal(database, cipher)
+
+    @staticmethod
+    def kdf_params(database) -> dict:
+        return fp.kdf_params(fp.read_header(database))
+
+    def load(self):
+        """Reads the last snapshot and replays the journal on top of it.
+
+        Returns:
+            AddressBook: The book, or 'wrong pass' if the password is
+                incorrect.
+        """
+        if self.journal.workers > 1:
+            contacts = parallel.read_file(self.database, self.cipher,
+                                          self.journal.workers)
+        else:
+            contacts = fp.read_file(self.database, self.cipher)
+        if contacts == 'wrong pass' or not self.journal.readable():
+            return 'wrong pass'
+        self.journal.replay(contacts)
+        return contacts
+
+    def append(self, contacts, operation: str, args) -> None:
+        self.journal.append(contacts, operation, args)
+
+    def compact(self, contacts) -> None:
+        self.journal.compact(contacts)
+
+    def close(self) -> None:
+        self.journal.close()
+
+
+class SQLiteStorage(Storage):
+    """SQLite database with one encrypted row per contact.
+
+    The contacts table holds each record encoded with app.codec and
+    encrypted with the Fernet key of the book (rows written before the
+    codec hold a pickle, which is still read). Names and phone numbers
+    are never stored in clear: rows are found by their HMAC (Cipher.mac),
+    which the indexes of the contacts and phones tables are built on. The
+    birthdays table keeps the day of year slot of every birthday in clear,
+    so upcoming birthdays are an indexed range query; the full date stays
+    encrypted.
+
+    A mutation rewrites just the rows of the contact it touched, in its
+    own transaction, instead of the whole book.
+
+    With ASSISTANT_LAZY_DECRYPT=1 (or `lazy` set) the book is not read at
+    all on load: a LazyBook (app.lazy) decrypts the contacts it needs
+    when they are used. The connection may be used from many threads, one
+    at a time.
+
+    Methods:
+        - read_record: Read a single contact by name.
+        - has_record: Tell if there is a contact, without decrypting it.
+        - count_records: Count the contacts.
+        - iter_records: Read all contacts, a batch of rows at a time.
+        - find_by_phone: Read the contacts holding a phone number.
+        - read_birthdays: Read the contacts born on the given days.
+    """
+    def __init__(self, database, cipher) -> None:
+        super().__init__(database, cipher)
+        self.connection = None
+        self.lazy = bool(os.environ.get('ASSISTANT_LAZY_DECRYPT'))
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def kdf_params(database) -> dict:
+        if not Path(database).exists():
+            return {}
+        connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.OperationalError:
+            return {}
+        finally:
+            connection.close()
+        if meta:
+            meta['iterations'] = int(meta['iterations'])
+        return fp.kdf_params(meta)
+
+    def load(self):
+        """Reads all contacts into an AddressBook, or only checks the key
+        for a LazyBook.
+
+        Returns:
+            AddressBook: The book, or 'wrong pass' if the password is
+                incorrect.
+        """
+        connection = self.__connect()
+        meta = dict(connection.execute("SELECT key, value FROM meta"))
+        if not self.cipher.check(base64.b64decode(meta['check'])):
+            return 'wrong pass'
+        if self.lazy:
+            return LazyBook(self)
+        book = AddressBook()
+        try:
+            for (token,) in connection.execute("SELECT record FROM contacts"):
+                record = self.__decrypt(token)
+                book.data[record.name] = record
+        except InvalidToken:
+            return 'wrong pass'
+        book.rebuild_index()
+        return book
+
+    def append(self, contacts, operation: str, args) -> None:
+        """Writes the rows of the contact named by the first argument, as
+        it is in the book now (or deletes them if it is gone)."""
+        if not args:
+            return
+        with self.lock, self.__connect() as connection:
+            self.__write(connection, args[0], contacts.data.get(args[0]))
+        self.__saved(contacts, args[:1])
+
+    def compact(self, contacts) -> None:
+        """Replaces all rows with the contacts of the book, in a single
+        transaction. The rows of a LazyBook are its contacts already, so
+        only its pending changes are written."""
+        if isinstance(contacts, LazyBook):
+            self.save_changes(contacts, list(contacts.data.pending))
+            return
+        contacts_rows, phones_rows, birthdays_rows = [], [], []
+        for contact_id, (contact_name, record) in enumerate(
+            contacts.data.items(), start=1
+        ):
+            contacts_rows.append(
+                (contact_id, *self.__contact_row(contact_name, record))
+            )
+            phones_rows.extend(self.__phone_rows(record, contact_id))
+            if record.birth_ordinal:
+                birthdays_rows.append(
+                    (birth.ordinal_slot(record.birth_ordinal), contact_id)
+                )
+        with self.lock, self.__connect() as connection:
+            connection.execute("DELETE FROM birthdays")
+            connection.execute("DELETE FROM phones")
+            connection.execute("DELETE FROM contacts")
+            connection.executemany(
+                "INSERT INTO contacts (id, name_mac, record) VALUES (?, ?, ?)",
+                contacts_rows,
+            )
+            connection.executemany(
+                "INSERT INTO phones (phone_mac, contact_id) VALUES (?, ?)",
+                phones_rows,
+            )
+            connection.executemany(
+                "INSERT INTO birthdays (slot, contact_id) VALUES (?, ?)",
+                birthdays_rows,
+            )
+
+    def save_changes(self, contacts, names) -> None:
+        """Writes the rows of the changed contacts in a single
+        transaction."""
+        names = list(names)
+        with self.lock, self.__connect() as connection:
+            for contact_name in names:
+                self.__write(
+                    connection, contact_name, contacts.data.get(contact_name)
+                )
+        self.__saved(contacts, names)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def read_record(self, contact_name: str):
+        """Reads a single contact.
+
+        Returns:
+            Record: The contact record, or None if there is no such
+            contact.
+        """
+        with self.lock:
+            row = self.__connect().execute(
+                "SELECT record FROM contacts WHERE name_mac = ?",
+                (self.cipher.mac(contact_name.encode('utf-8')),),
+            ).fetchone()
+        return self.__decrypt(row[0]) if row else None
+
+    def has_record(self, contact_name: str) -> bool:
+        """Tells if there is a contact, by the HMAC of its name."""
+        with self.lock:
+            row = self.__connect().execute(
+                "SELECT 1 FROM contacts WHERE name_mac = ?",
+                (self.cipher.mac(contact_name.encode('utf-8')),),
+            ).fetchone()
+        return row is not None
+
+    def count_records(self) -> int:
+        """The number of contacts."""
+        with self.lock:
+            (count,) = self.__connect().execute(
+                "SELECT COUNT(*) FROM contacts"
+            ).fetchone()
+        return count
+
+    def iter_records(self, batch: int = 1024):
+        """Reads all contacts in the order of the rows, fetching and
+        decrypting `batch` rows at a time.
+
+        Yields:
+            Record: One contact record after the other.
+        """
+        with self.lock:
+            cursor = self.__connect().execute(
+                "SELECT record FROM contacts ORDER BY id"
+            )
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            for (token,) in rows:
+                yield self.__decrypt(token)
+
+    def find_by_phone(self, phone_number: str) -> list:
+        """Reads the contacts holding the phone number.
+
+        Returns:
+            list: The records of the owners of the phone.
+        """
+        with self.lock:
+            rows = self.__connect().execute(
+                "SELECT contacts.record FROM phones "
+                "JOIN contacts ON contacts.id = phones.contact_id "
+                "WHERE phones.phone_mac = ? ORDER BY contacts.id",
+                (self.cipher.mac(Phone.pack(phone_number)),),
+            ).fetchall()
+        return [self.__decrypt(token) for (token,) in rows]
+
+    def read_birthdays(self, first_slot: int, last_slot: int) -> list:
+        """Reads the contacts born on the days of year (slots of
+        BirthdayFunctions.day_slot) from first_slot to last_slot inclusive.
+
+        Returns:
+            list: The records of the contacts, ordered by slot.
+        """
+        with self.lock:
+            rows = self.__connect().execute(
+                "SELECT contacts.record FROM birthdays "
+                "JOIN contacts ON contacts.id = birthdays.contact_id "
+                "WHERE birthdays.slot BETWEEN ? AND ? "
+                "ORDER BY birthdays.slot, contacts.id",
+                (first_slot, last_slot),
+            ).fetchall()
+        return [self.__decrypt(token) for (token,) in rows]
+
+    def __connect(self) -> sqlite3.Connection:
+        """Opens the database. A new database gets the schema and the KDF
+        parameters of the cipher."""
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.database, check_same_thread=False
+            )
+            self.connection.execute("PRAGMA foreign_keys = ON")
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.executescript(SCHEMA)
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                    self.__meta().items(),
+                )
+        return self.connection
+
+    def __meta(self) -> dict:
+        return {
+            'kdf': 'pbkdf2-sha256',
+            'salt': base64.b64encode(self.cipher.salt).decode('ascii'),
+            'iterations': str(self.cipher.iterations),
+            'check': base64.b64encode(self.cipher.verifier()).decode('ascii'),
+        }
+
+    @staticmethod
+    def __saved(contacts, names) -> None:
+        """Lets a LazyBook forget the changes that were written."""
+        if isinstance(contacts, LazyBook):
+            contacts.data.saved(names)
+
+    def __decrypt(self, token: bytes):
+        return codec.decode_any(self.cipher.decrypt_data(token))[0]
+
+    def __contact_row(self, contact_name: str, record) -> tuple:
+        return (
+            self.cipher.mac(contact_name.encode('utf-8')),
+            self.cipher.encrypt_data(codec.encode_records((record,))),
+        )
+
+    def __phone_rows(self, record, contact_id: int) -> list:
+        packed = record.packed_phones
+        return [
+            (self.cipher.mac(packed[i:i + Phone.SIZE]), contact_id)
+            for i in range(0, len(packed), Phone.SIZE)
+        ]
+
+    def __write(self, connection, contact_name: str, record) -> None:
+        """Brings the rows of one contact in line with its record."""
+        if record is None:
+            connection.execute(
+                "DELETE FROM contacts WHERE name_mac = ?",
+                (self.cipher.mac(contact_name.encode('utf-8')),),
+            )
+            return
+        row = self.__contact_row(contact_name, record)
+        connection.execute(
+            "INSERT INTO contacts (name_mac, record) VALUES (?, ?) "
+            "ON CONFLICT (name_mac) DO UPDATE SET record = excluded.record",
+            row,
+        )
+        (contact_id,) = connection.execute(
+            "SELECT id FROM contacts WHERE name_mac = ?", row[:1]
+        ).fetchone()
+        connection.execute(
+            "DELETE FROM phones WHERE contact_id = ?", (contact_id,)
+        )
+        connection.executemany(
+            "INSERT INTO phones (phone_mac, contact_id) VALUES (?, ?)",
+            self.__phone_rows(record, contact_id),
+        )
+        connection.execute(
+            "DELETE FROM birthdays WHERE contact_id = ?", (contact_id,)
+        )
+        if record.birth_ordinal:
+            connection.execute(
+                "INSERT INTO birthdays (slot, contact_id) VALUES (?, ?)",
+                (birth.ordinal_slot(record.birth_ordinal), contact_id),
+            )
+
+
+class SnapshotStorage(Storage):
+    """A snapshot file (app.snapshot), mapped into memory and opened
+    read-only. Startup and lookups do not depend on the size of the book,
+    and no changes are written.
+
+    The snapshot is not encrypted, so it is opened without a password: a
+    password would protect nothing that reading the file does not give
+    away.
+    """
+    ENCRYPTED = False
+
+    def __init__(self, database, cipher) -> None:
+        super().__init__(database, cipher)
+        self.snapshot = None
+
+    @staticmethod
+    def kdf_params(database) -> dict:
+        """There are none, the snapshot is not encrypted.
+
+        Raises:
+            FileException: If there is no snapshot file.
+        """
+        try:
+            with open(database, 'rb') as file:
+                if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    raise FileException(f"{database} is not a snapshot")
+        except FileNotFoundError as e:
+            raise FileException(f"{database} not found") from e
+        return {}
+
+    def load(self):
+        """Maps the snapshot.
+
+        Returns:
+            SnapshotBook: The book.
+        """
+        self.snapshot = Snapshot(self.database)
+        return SnapshotBook(self.snapshot)
+
+    def append(self, contacts, operation: str, args) -> None:
+        pass
+
+    def compact(self, contacts) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
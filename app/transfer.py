@@ -0,0 +1,192 @@
+"""imports"""
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from app.file import FileException
+from app.record import Birthday, Phone, Record
+
+BATCH_SIZE = 10_000
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def file_format(path) -> str:
+    """Tells the format of an import/export file by its suffix.
+
+    Raises:
+        FileException: If the suffix is not supported.
+    """
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError as e:
+        raise FileException(
+            f"Unsupported file type {Path(path).suffix!r}, use .csv or .jsonl"
+        ) from e
+
+
+def read_rows(path):
+    """Streams the contacts of a CSV or JSONL file.
+
+    CSV files have the columns name, phones (separated by ';') and
+    birthday (DD.MM.YYYY), with an optional header row. JSONL files hold
+    one object per line with the keys name, phones (a list) and birthday.
+    Blank lines are skipped.
+
+    Yields:
+        tuple: Line number, name, list of phones and birthday (or '').
+    """
+    with open(path, encoding='utf-8', newline='') as file:
+        if file_format(path) == 'csv':
+            for line, row in enumerate(csv.reader(file), start=1):
+                if line == 1 and row[:1] == ['name'] \
+                        or not ''.join(row).strip():
+                    continue
+                row += [''] * (3 - len(row))
+                phones = row[1].split(';') if row[1] else []
+                yield line, row[0], phones, row[2]
+        else:
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    item = json.loads(text)
+                    yield line, item['name'], item.get('phones') or [], \
+                        item.get('birthday') or ''
+                except (ValueError, KeyError, TypeError):
+                    yield line, None, [], ''
+
+
+def parse_birthday(birthday: str) -> int:
+    """Converts a DD.MM.YYYY birth date into a date ordinal. Birth dates
+    repeat a lot in real books, and Birthday.parse keeps the parsed ones.
+
+    Raises:
+        ValueError: If the date is malformed or does not exist.
+        TypeError: If the birthday is not a string.
+    """
+    return Birthday.parse(birthday).toordinal()
+
+
+def build_records(rows: list):
+    """Validates a batch of rows and builds their records.
+
+    Phones are checked and packed, and birthdays converted to ordinals,
+    without going through the command decorators.
+
+    Args:
+        rows (list): Rows as yielded by read_rows.
+
+    Yields:
+        tuple: Line number, name, and either a Record with its list of
+            phones or None with an error message.
+    """
+    for line, name, phones, birthday in rows:
+        if not name or not isinstance(name, str):
+            yield line, name, None, 'missing name'
+            continue
+        bad = [
+            phone for phone in phones
+            if not isinstance(phone, str) or len(phone) != 10
+            or not phone.isdigit()
+        ]
+        if bad:
+            yield line, name, None, f'invalid phone {bad[0]}'
+            continue
+        birth_ordinal = 0
+        if birthday:
+            try:
+                birth_ordinal = parse_birthday(birthday)
+            except (ValueError, TypeError):
+                yield line, name, None, f"invalid birthday {birthday}"
+                continue
+        if len(phones) > 1:
+            phones = list(dict.fromkeys(phones))
+        packed_phones = b''.join([
+            int(phone).to_bytes(Phone.SIZE, 'big') for phone in phones
+        ])
+        yield line, name, \
+            Record.from_parts(name, packed_phones, birth_ordinal), phones
+
+
+def import_contacts(contacts, path, report=None) -> tuple:
+    """Imports contacts from a CSV or JSONL file in batches.
+
+    Rows that fail validation or name an existing contact are skipped and
+    written to the report, a CSV file with the columns line, name and
+    error (by default next to the source, with '.errors.csv' appended).
+
+    Args:
+        contacts (AddressBook): The book to import into.
+        path (str): The file to import.
+        report (str, optional): Where to write rejected rows.
+
+    Returns:
+        tuple: The number of imported and of rejected rows.
+    """
+    report = Path(report or f"{path}.errors.csv")
+    imported = rejected = 0
+    rows = read_rows(path)
+    report_file = None
+    try:
+        while batch := list(islice(rows, BATCH_SIZE)):
+            errors = []
+            for line, name, record, phones in build_records(batch):
+                if record is None:
+                    errors.append((line, name, phones))
+                elif contacts.insert(record, phones):
+                    imported += 1
+                else:
+                    errors.append((line, name, 'contact exists'))
+            if errors and report_file is None:
+                report_file = open(report, 'w', encoding='utf-8', newline='')
+                csv.writer(report_file).writerow(('line', 'name', 'error'))
+            if errors:
+                csv.writer(report_file).writerows(errors)
+                rejected += len(errors)
+    finally:
+        if report_file is not None:
+            report_file.close()
+    if not rejected:
+        report.unlink(missing_ok=True)
+    return imported, rejected
+
+
+def export_rows(contacts):
+    """Streams the contacts of a book as plain rows.
+
+    Yields:
+        tuple: Name, list of phones and birthday (DD.MM.YYYY or '').
+    """
+    for name, record in contacts.data.items():
+        birthday = record.birthday
+        yield name, record.phones, \
+            birthday.strftime('%d.%m.%Y') if birthday else ''
+
+
+def export_contacts(contacts, path) -> int:
+    """Writes all contacts to a CSV or JSONL file.
+
+    Args:
+        contacts (AddressBook): The book to export.
+        path (str): The file to write; the format follows its suffix.
+
+    Returns:
+        int: The number of exported contacts.
+    """
+    exported = 0
+    kind = file_format(path)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if kind == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(('name', 'phones', 'birthday'))
+            for name, phones, birthday in export_rows(contacts):
+                writer.writerow((name, ';'.join(phones), birthday))
+                exported += 1
+        else:
+            for name, phones, birthday in export_rows(contacts):
+                file.write(json.dumps(
+                    {'name': name, 'phones': phones, 'birthday': birthday},
+                    ensure_ascii=False,
+                ) + '\n')
+                exported += 1
+    return exported
@@ -0,0 +1,45 @@
+"""Benchmark of the NumPy analytics path against the per-record Python code.
+
+Usage:
+    python -m benchmarks.bench_analytics
+"""
+from app import analytics
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZES = (10_000, 100_000)
+DAYS = 90
+
+
+def main():
+    if not analytics.HAS_NUMPY:
+        print("NumPy is not installed, nothing to compare.")
+        return
+    for size in SIZES:
+        book = make_book(size, birthdays=True)
+        export = timeit(lambda: analytics.ColumnarBook.from_book(book))
+        columns = analytics.ColumnarBook.from_book(book)
+        python_window = timeit(lambda: book.upcoming_birthdays(DAYS), 3)
+        numpy_window = timeit(
+            lambda: analytics.upcoming_birthdays(book, DAYS, columns=columns), 3
+        )
+        numpy_arrays = timeit(
+            lambda: analytics.upcoming_birthday_arrays(columns, DAYS), 3
+        )
+        python_duplicates = timeit(
+            lambda: [o for o in book.phone_index.values() if len(o) > 1], 3
+        )
+        numpy_duplicates = timeit(
+            lambda: analytics.duplicate_phones(book, columns), 3
+        )
+        print(f"{size:>9} contacts: export {export * 1000:8.2f} ms")
+        print(f"{'':>20}{DAYS} day window: python {python_window * 1000:8.2f}"
+              f" ms, numpy {numpy_window * 1000:8.2f} ms"
+              f" ({numpy_arrays * 1000:.2f} ms as arrays)")
+        print(f"{'':>20}duplicate phones: python "
+              f"{python_duplicates * 1000:8.2f} ms, numpy "
+              f"{numpy_duplicates * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark of the pause a background save causes to the command loop.
+
+Times the change that triggers a compaction of the journal (the command
+waits for it), the changes made while the new snapshot is written in the
+background, and the time until the snapshot is on disk. Serializing the
+book on the calling thread, as compactions did before the copy-on-write
+handoff, is timed for comparison.
+
+Usage:
+    python -m benchmarks.bench_autosave
+"""
+import tempfile
+import time
+from pathlib import Path
+from app.file import FileProcessor
+from app.journal import Journal
+from app.protection import Cipher
+from benchmarks.common import timeit
+from tests.helpers import make_birthday, make_book, make_name
+
+SIZES = (100_000, 1_000_000)
+CHANGES = 200
+
+
+def main():
+    cipher = Cipher('AddressBook')
+    for size in SIZES:
+        book = make_book(size)
+        serialize = timeit(lambda: list(FileProcessor.iter_segments(book.data)))
+        with tempfile.TemporaryDirectory() as folder:
+            journal = Journal(Path(folder) / 'contacts.pkl', cipher,
+                              compact_every=CHANGES)
+            for number in range(CHANGES - 1):
+                journal.append(book, 'add-birthday',
+                               [make_name(number), make_birthday(number)])
+            args = [make_name(CHANGES), make_birthday(CHANGES)]
+            book.birthday_date(*args)
+            start = time.perf_counter()
+            journal.append(book, 'add-birthday', args)
+            pause = time.perf_counter() - start
+            start = time.perf_counter()
+            for number in range(CHANGES - 1):
+                args = [make_name(number), make_birthday(number + 1)]
+                book.birthday_date(*args)
+                journal.append(book, 'add-birthday', args)
+            during = (time.perf_counter() - start) / (CHANGES - 1)
+            journal.wait()
+            total = time.perf_counter() - start + pause
+            journal.close()
+        print(f"{size:>9} contacts: serialize on the caller {serialize:6.2f} s,"
+              f" pause {pause * 1000:7.1f} ms, change while saving "
+              f"{during * 1000:5.2f} ms, saved in {total:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
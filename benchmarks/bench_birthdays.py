@@ -0,0 +1,25 @@
+"""Benchmark of upcoming birthday windows on books of growing size.
+
+Usage:
+    python -m benchmarks.bench_birthdays
+"""
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZES = (1_000, 10_000, 100_000)
+WINDOWS = (7, 30, 90)
+
+
+def main():
+    for size in SIZES:
+        book = make_book(size, birthdays=True)
+        timings = []
+        for days in WINDOWS:
+            elapsed = timeit(lambda: book.upcoming_birthdays(days), 5)
+            timings.append(f"{days:>2} days {elapsed * 1000:8.2f} ms")
+        timings = ', '.join(timings)
+        print(f"{size:>9} contacts: {timings}")
+
+
+if __name__ == "__main__":
+    main()
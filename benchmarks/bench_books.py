@@ -0,0 +1,87 @@
+"""Benchmark of a process hosting many small books (BookRegistry).
+
+Writes BOOKS books of CONTACTS contacts each, then runs SESSIONS
+sessions: open a book, look up a contact, release it. The books of the
+sessions follow a skewed distribution (a few users come back often), as
+the users of a server would. The registry keeps at most --capacity books
+loaded. Reports the time of a session when the book has to be loaded and
+when it is already open, how many books were loaded, and the peak memory
+of the process.
+
+All books share one password and salt, so the key is derived once; a real
+server derives it for every new book.
+
+Usage:
+    python -m benchmarks.bench_books [--books N] [--capacity N]
+"""
+import argparse
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+from app.book import AddressBook
+from app.books import BookRegistry
+from app.file import FileProcessor
+from app.protection import Cipher
+from app.record import Record
+from tests.helpers import make_name, make_phone
+
+BOOKS = 2_000
+CONTACTS = 50
+SESSIONS = 20_000
+
+
+def write_books(folder: Path, count: int, cipher) -> list:
+    """Writes the books and returns their paths."""
+    paths = []
+    for index in range(count):
+        book = AddressBook()
+        for number in range(CONTACTS):
+            record = Record(make_name(number))
+            record.add_phone(make_phone(index * CONTACTS + number))
+            book.insert(record)
+        path = folder / f"user-{index}.pkl"
+        FileProcessor.write_segments(
+            path, FileProcessor.iter_segments(book.data), 0, cipher
+        )
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=BOOKS)
+    parser.add_argument('--capacity', type=int, default=BOOKS // 10)
+    options = parser.parse_args()
+    cipher = Cipher('AddressBook')
+    generator = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_books(Path(folder), options.books, cipher)
+        books = BookRegistry(capacity=options.capacity)
+        cold, warm = [], []
+        for _ in range(SESSIONS):
+            path = paths[min(int(generator.paretovariate(1.2)) - 1,
+                             len(paths) - 1)]
+            if generator.random() < 0.3:
+                path = generator.choice(paths)
+            loaded = path in books
+            start = time.perf_counter()
+            book = books.open(path, cipher)
+            book.contacts.find([make_name(generator.randrange(CONTACTS))])
+            books.release(book)
+            (warm if loaded else cold).append(time.perf_counter() - start)
+        books.close()
+    print(f"{options.books} books of {CONTACTS} contacts, capacity "
+          f"{options.capacity}, {SESSIONS} sessions")
+    print(f"  loaded: {len(cold):6} sessions, "
+          f"{sum(cold) / max(len(cold), 1) * 1e6:8.1f} us each")
+    print(f"    open: {len(warm):6} sessions, "
+          f"{sum(warm) / max(len(warm), 1) * 1e6:8.1f} us each")
+    print(f"  peak memory: "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}"
+          " MiB")
+
+
+if __name__ == "__main__":
+    main()
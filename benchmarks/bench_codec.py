@@ -0,0 +1,69 @@
+"""Benchmark of the record codec against pickle.
+
+Compares, on books with phones and birthdays, the length-prefixed
+pickled records the segments held before with app.codec blocks: encoding
+and decoding time and the plaintext size. Then times a full save and
+load of the contacts file, which also encrypts.
+
+Usage:
+    python -m benchmarks.bench_codec
+"""
+import pickle
+import tempfile
+from pathlib import Path
+from app import codec
+from app.file import FileProcessor
+from app.protection import Cipher
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZES = (100_000, 1_000_000)
+
+
+def pickle_records(records: list) -> bytes:
+    """The segment plaintext before the codec."""
+    parts = []
+    for record in records:
+        serialized = pickle.dumps(record)
+        parts.append(len(serialized).to_bytes(4, 'big'))
+        parts.append(serialized)
+    return b''.join(parts)
+
+
+def unpickle_records(plaintext: bytes) -> list:
+    view, position, records = memoryview(plaintext), 0, []
+    while position < len(view):
+        length = int.from_bytes(view[position:position + 4], 'big')
+        position += 4
+        records.append(pickle.loads(view[position:position + length]))
+        position += length
+    return records
+
+
+def main():
+    cipher = Cipher('AddressBook')
+    for size in SIZES:
+        book = make_book(size, birthdays=True)
+        records = list(book.data.values())
+        pickled = pickle_records(records)
+        encoded = codec.encode_records(records)
+        print(f"{size} contacts")
+        for label, encode, decode, data in (
+            ("pickle", pickle_records, unpickle_records, pickled),
+            ("codec", codec.encode_records, codec.decode_records, encoded),
+        ):
+            print(f"  {label:>6}: encode {timeit(lambda: encode(records)):6.2f} s,"
+                  f" decode {timeit(lambda: decode(data)):6.2f} s,"
+                  f" {len(data) / 2**20:6.1f} MiB")
+        with tempfile.TemporaryDirectory() as folder:
+            database = Path(folder) / 'contacts.pkl'
+            save = timeit(
+                lambda: FileProcessor.write_file(database, book, cipher)
+            )
+            load = timeit(lambda: FileProcessor.read_file(database, cipher))
+            print(f"  file: save {save:6.2f} s, load {load:6.2f} s, "
+                  f"{database.stat().st_size / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
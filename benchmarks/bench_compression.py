@@ -0,0 +1,43 @@
+"""Benchmark of the compression of the contacts file.
+
+Saves and loads a book with every compression setting and reports the
+file size and the save and load times, so the tradeoff of a setting for
+ASSISTANT_COMPRESSION can be read off.
+
+Usage:
+    python -m benchmarks.bench_compression [size]
+"""
+import sys
+import tempfile
+from pathlib import Path
+from app.file import FileProcessor
+from app.protection import Cipher
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZE = 100_000
+SETTINGS = (
+    (None, None), ('zlib', 1), ('zlib', 6), ('zlib', 9),
+    ('lzma', 0), ('lzma', 6),
+)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+    cipher = Cipher('AddressBook')
+    book = make_book(size, birthdays=True)
+    segments = list(FileProcessor.iter_segments(book.data))
+    with tempfile.TemporaryDirectory() as folder:
+        database = Path(folder) / 'contacts.pkl'
+        for name, level in SETTINGS:
+            label = f"{name}:{level}" if name else "none"
+            save = timeit(lambda: FileProcessor.write_segments(
+                database, segments, 0, cipher, (name, level)
+            ))
+            load = timeit(lambda: FileProcessor.read_file(database, cipher))
+            print(f"{label:>7}: {database.stat().st_size / 2**20:6.2f} MiB, "
+                  f"save {save:6.2f} s, load {load:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
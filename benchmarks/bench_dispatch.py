@@ -0,0 +1,92 @@
+"""Benchmark of parsing and dispatching a command line.
+
+Compares the original parser (re.sub per line) and match statement with
+parse_input (translation table) and make_command (one registry lookup),
+on a mix of commands, with the commands built but not executed.
+
+Usage:
+    python -m benchmarks.bench_dispatch [lines]
+"""
+import re
+import sys
+import time
+import app.commands as cmd
+from app.book import AddressBook
+from app.dispatch import make_command, parse_input
+
+LINES = 200_000
+MIX = (
+    "add John 0123456789", "Add-Birthday John 01.02.1990",
+    "change John 0123456789 9876543210", "phone John", "show-birthday John",
+    "search Jo", "all --page 2", "birthdays 30", "del John", "hello",
+    "unknown command",
+)
+
+
+def regex_parse(user_input: str) -> tuple:
+    """The parser before the translation table."""
+    command, *args = user_input.split()
+    command = command.strip().lower()
+    command = re.sub("[^A-Za-z]", "", command)
+    return command, *args
+
+
+def match_dispatch(command, args, contacts, storage):
+    """The dispatch before the registry."""
+    match command:
+        case "close" | "exit":
+            return cmd.Close(storage)
+        case "hello":
+            return cmd.Hello()
+        case "help":
+            return cmd.Help()
+        case "add":
+            return cmd.Add(contacts, args, storage)
+        case "addbirthday":
+            return cmd.AddBirthday(contacts, args, storage)
+        case "change":
+            return cmd.Change(contacts, args, storage)
+        case "del":
+            return cmd.Delete(contacts, args, storage)
+        case "phone":
+            return cmd.Phone(contacts, args)
+        case "all":
+            return cmd.All(contacts, args)
+        case "search":
+            return cmd.Search(contacts, args)
+        case "showbirthday":
+            return cmd.ShowBirthday(contacts, args)
+        case "birthdays":
+            return cmd.Birthdays(contacts, args)
+        case _:
+            return cmd.WrongCommand()
+
+
+def run(parse, dispatch, lines: list, contacts) -> float:
+    start = time.perf_counter()
+    for line in lines:
+        command, *args = parse(line)
+        dispatch(command, args, contacts, None)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else LINES
+    lines = [MIX[i % len(MIX)] for i in range(count)]
+    contacts = AddressBook()
+    for name, parse, dispatch in (
+        ("re.sub + match", regex_parse, match_dispatch),
+        ("translate + registry", parse_input, make_command),
+    ):
+        elapsed = min(run(parse, dispatch, lines, contacts) for _ in range(3))
+        print(f"{name:>22}: {elapsed * 1e9 / count:6.0f} ns/line")
+    for name, parse in (("re.sub", regex_parse), ("translate", parse_input)):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        elapsed = time.perf_counter() - start
+        print(f"{name + ' parse only':>22}: {elapsed * 1e9 / count:6.0f} ns/line")
+
+
+if __name__ == '__main__':
+    main()
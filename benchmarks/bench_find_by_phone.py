@@ -0,0 +1,27 @@
+"""Benchmark of AddressBook.find_by_phone on books of growing size.
+
+Usage:
+    python -m benchmarks.bench_find_by_phone
+"""
+from benchmarks.common import sample, timeit
+from tests.helpers import make_book, make_phone
+
+SIZES = (1_000, 10_000, 100_000)
+LOOKUPS = 10_000
+
+
+def main():
+    for size in SIZES:
+        book = make_book(size)
+        phones = [make_phone(number) for number in sample(size, LOOKUPS)]
+
+        def lookups():
+            for phone in phones:
+                book.find_by_phone(phone)
+
+        elapsed = timeit(lookups, repeat=3)
+        print(f"{size:>9} contacts: {elapsed / LOOKUPS * 1e9:8.0f} ns/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark of a lazily decrypted SQLite book (app.lazy) against a fully
+loaded one, for books of growing size.
+
+For every size, writes an SQLite book and reports the time to open it,
+to look up a contact by name and by phone, and to change the birthday of
+a contact and write it, with the book loaded into an AddressBook and as a
+LazyBook. The lookups and changes of the LazyBook should take about the
+same time for every size; opening the loaded book grows with it.
+
+Usage:
+    python -m benchmarks.bench_lazy [sizes, e.g. 1000,10000,100000]
+"""
+import sys
+import tempfile
+from pathlib import Path
+from app.protection import Cipher
+from app.storage import SQLiteStorage
+from benchmarks.common import sample, timeit
+from tests.helpers import make_birthday, make_book, make_name, make_phone
+
+SIZES = (1_000, 10_000, 100_000)
+LOOKUPS = 1_000
+CHANGES = 200
+
+
+def measure(storage, size: int) -> tuple:
+    """Opens the book of a storage and times the lookups and changes.
+
+    Returns:
+        tuple: Seconds to open, and per lookup by name, lookup by phone
+            and change.
+    """
+    book = None
+
+    def load():
+        nonlocal book
+        book = storage.load()
+
+    opening = timeit(load)
+    numbers = sample(size, LOOKUPS)
+    find = timeit(lambda: [
+        book.find([make_name(number)]) for number in numbers
+    ]) / LOOKUPS
+    by_phone = timeit(lambda: [
+        book.find_by_phone(make_phone(number)) for number in numbers
+    ]) / LOOKUPS
+
+    def change():
+        for index, number in enumerate(numbers[:CHANGES]):
+            name = make_name(number)
+            book.birthday_date(name, make_birthday(index))
+            storage.append(book, 'add-birthday', [name])
+
+    return opening, find, by_phone, timeit(change) / CHANGES
+
+
+def main():
+    sizes = SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(size) for size in sys.argv[1].split(',')]
+    cipher = Cipher('AddressBook')
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            storage = SQLiteStorage(Path(folder) / f"{size}.db", cipher)
+            storage.compact(make_book(size, birthdays=True))
+            print(f"{size} contacts")
+            for label, lazy in (("loaded", False), ("lazy", True)):
+                storage.lazy = lazy
+                opening, find, by_phone, change = measure(storage, size)
+                storage.close()
+                print(f"{label:>8}: open {opening * 1000:9.1f} ms, find "
+                      f"{find * 1e6:6.1f} us, find by phone "
+                      f"{by_phone * 1e6:6.1f} us, change "
+                      f"{change * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
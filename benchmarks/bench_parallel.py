@@ -0,0 +1,58 @@
+"""Benchmark of loading and saving a book in worker processes.
+
+Saves and loads a book with FileProcessor (in the calling process) and
+with app.parallel for every number of workers, and reports the times and
+the speedup over FileProcessor, so the effect of ASSISTANT_WORKERS can be
+read off. The times include starting the workers. Only the work that is
+split between the workers scales: on a single core the parallel path is
+slower than the serial one. Files are compressed as ASSISTANT_COMPRESSION
+says; compression is done by the workers, so compressed saves gain the
+most.
+
+Usage:
+    python -m benchmarks.bench_parallel [size] [workers, e.g. 1,2,4]
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+from app import parallel
+from app.file import FileProcessor
+from app.protection import Cipher
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZE = 1_000_000
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+    counts = [1, 2, 4, os.cpu_count() or 1]
+    if len(sys.argv) > 2:
+        counts = [int(count) for count in sys.argv[2].split(',')]
+    print(f"{size} contacts, {os.cpu_count()} cores")
+    cipher = Cipher('AddressBook')
+    compression = FileProcessor.compression()
+    book = make_book(size, birthdays=True)
+    with tempfile.TemporaryDirectory() as folder:
+        database = Path(folder) / 'contacts.pkl'
+        save = timeit(lambda: FileProcessor.write_segments(
+            database, FileProcessor.iter_segments(book.data), 0, cipher,
+            compression
+        ))
+        load = timeit(lambda: FileProcessor.read_file(database, cipher))
+        print(f" serial: save {save:6.2f} s, load {load:6.2f} s")
+        for count in sorted(set(counts)):
+            parallel_save = timeit(lambda: parallel.write_file(
+                database, book.data, 0, cipher, count, compression
+            ))
+            parallel_load = timeit(
+                lambda: parallel.read_file(database, cipher, count)
+            )
+            print(f"{count:>7}: save {parallel_save:6.2f} s "
+                  f"({save / parallel_save:4.1f}x), load "
+                  f"{parallel_load:6.2f} s ({load / parallel_load:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
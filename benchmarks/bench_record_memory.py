@@ -0,0 +1,71 @@
+"""Benchmark of the heap used per contact by Record.
+
+Compares the slotted Record with a copy of the previous model, in which
+every record, name, phone and birthday was an object with its own
+__dict__ and phones were kept in a list.
+
+Usage:
+    python -m benchmarks.bench_record_memory
+"""
+import tracemalloc
+from datetime import date
+from app.record import Record
+from tests.helpers import make_name, make_phone
+
+SIZE = 100_000
+
+
+class DictField:
+    """The Field of the previous model."""
+    def __init__(self, value):
+        self.value = value
+
+
+class DictRecord:
+    """The Record of the previous model."""
+    def __init__(self, contact_name: str):
+        self.name = DictField(contact_name)
+        self.phones = []
+        self.birthday = None
+
+
+def build_dict_records() -> list:
+    records = []
+    for number in range(SIZE):
+        record = DictRecord(make_name(number))
+        record.phones.append(DictField(make_phone(number)))
+        record.birthday = DictField(date(1990, 1, 1 + number % 28))
+        records.append(record)
+    return records
+
+
+def build_slotted_records() -> list:
+    records = []
+    for number in range(SIZE):
+        record = Record(make_name(number))
+        record.add_phone(make_phone(number))
+        record.add_birthday(f"{1 + number % 28:02d}.01.1990")
+        records.append(record)
+    return records
+
+
+def per_contact(build) -> float:
+    """Returns the traced bytes per contact kept alive by build()."""
+    tracemalloc.start()
+    records = build()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return current / SIZE
+
+
+def main():
+    before = per_contact(build_dict_records)
+    after = per_contact(build_slotted_records)
+    print(f"__dict__ model: {before:6.0f} bytes/contact")
+    print(f"slotted model:  {after:6.0f} bytes/contact")
+    print(f"saved:          {1 - after / before:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
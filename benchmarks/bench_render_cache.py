@@ -0,0 +1,58 @@
+"""Benchmark of the render cache on repeated queries.
+
+Runs a read-heavy mix of command lines as batch and server mode do: the
+same contacts are asked for again and again (phone, show-birthday), with
+a few listings and birthday queries and one change in every WRITE_EVERY
+lines. The mix runs with the render cache and with a cache that keeps
+nothing, so every lookup misses.
+
+Usage:
+    python -m benchmarks.bench_render_cache [size]
+"""
+import sys
+from app.cache import CACHE
+from benchmarks.common import sample, timeit
+from tests.helpers import make_birthday, make_book, make_name
+from benchmarks.suite import NoStorage, dispatch
+
+SIZE = 100_000
+HOT = 20
+LINES = 50_000
+WRITE_EVERY = 100
+
+
+def commands(size: int) -> list:
+    """The mix: queries of HOT contacts and some changes."""
+    hot = [make_name(number) for number in sample(size, HOT)]
+    lines = []
+    for index in range(LINES):
+        name = hot[index % HOT]
+        if index % WRITE_EVERY == WRITE_EVERY - 1:
+            lines.append(f"add-birthday {name} {make_birthday(index)}")
+        elif index % 10 == 0:
+            lines.append(f"all --page {index % 5 + 1} --size 20 --sort")
+        elif index % 10 == 5:
+            lines.append("birthdays 7")
+        elif index % 2:
+            lines.append(f"phone {name}")
+        else:
+            lines.append(f"show-birthday {name}")
+    return lines
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+    book = make_book(size, birthdays=True)
+    lines = commands(size)
+    storage = NoStorage()
+    entries = CACHE.entries
+    for label, kept in (("no cache", 0), ("cache", entries)):
+        CACHE.clear()
+        CACHE.entries = kept
+        seconds = timeit(lambda: dispatch(lines, book, storage))
+        print(f"{label:>8}: {seconds / len(lines) * 1e6:7.1f} us per line, "
+              f"{CACHE.report()}", end='')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark of the batch (script) mode.
+
+Writes a change script of LINES commands (adds, birthdays and phone
+changes), runs it against a new book and reports commands per second,
+including the final save.
+
+Usage:
+    python -m benchmarks.bench_script [lines]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from app.batch import run_script
+from app.protection import Cipher
+from app.storage import FileStorage
+from tests.helpers import make_birthday, make_name, make_phone
+
+LINES = 1_000_000
+
+
+def write_script(path: Path, lines: int) -> None:
+    """Writes a script where every contact is added, gets a birthday and
+    has its phone changed."""
+    contacts = lines // 3
+    with open(path, 'w', encoding='utf-8') as script:
+        for number in range(contacts):
+            name, phone = make_name(number), make_phone(number)
+            script.write(f"add {name} {phone}\n"
+                         f"add-birthday {name} {make_birthday(number)}\n"
+                         f"change {name} {phone} {make_phone(number + contacts)}\n")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else LINES
+    cipher = Cipher('AddressBook')
+    with tempfile.TemporaryDirectory() as folder:
+        script = Path(folder) / 'script.txt'
+        write_script(script, lines)
+        storage = FileStorage(Path(folder) / 'contacts.pkl', cipher)
+        contacts = storage.load()
+        start = time.perf_counter()
+        with open(script, encoding='utf-8') as commands, \
+                open(os.devnull, 'w', encoding='utf-8') as output:
+            executed = run_script(commands, contacts, storage, output)
+        elapsed = time.perf_counter() - start
+    print(f"{executed} commands in {elapsed:.2f} s "
+          f"({executed / elapsed:,.0f} commands/s, final save included)")
+
+
+if __name__ == "__main__":
+    main()
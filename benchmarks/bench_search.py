@@ -0,0 +1,59 @@
+"""Benchmark of prefix and fuzzy name search on a large name index.
+
+Usage:
+    python -m benchmarks.bench_search
+"""
+import random
+from app.search import NameIndex
+from benchmarks.common import timeit
+
+SIZE = 1_000_000
+QUERIES = 200
+SYLLABLES = (
+    'an', 'bo', 'da', 'el', 'fi', 'ga', 'hu', 'iv', 'jo', 'ka', 'le', 'mi',
+    'na', 'ol', 'pe', 'ro', 'sa', 'ta', 'ul', 'va', 'yu', 'za', 'ch', 'sh',
+    'ber', 'dor', 'ens', 'gri', 'kov', 'lin', 'mar', 'nik', 'ost', 'pra',
+    'rin', 'sto', 'tek', 'vel', 'wig', 'zen', 'ley', 'son', 'enko', 'ska',
+)
+
+
+def make_names(size: int, seed: int = 7) -> list:
+    """Builds unique 'First Last' names from pools of 3000 first and
+    20000 last names, so common name parts repeat like in real books."""
+    rng = random.Random(seed)
+
+    def word(syllables: int) -> str:
+        return ''.join(rng.choices(SYLLABLES, k=syllables)).title()
+
+    first_names = [word(rng.randint(2, 3)) for _ in range(3000)]
+    last_names = [word(rng.randint(2, 4)) for _ in range(20000)]
+    names = set()
+    while len(names) < size:
+        names.add(f"{rng.choice(first_names)} {rng.choice(last_names)}")
+    return list(names)
+
+
+def typo(name: str, rng: random.Random) -> str:
+    """Replaces one letter of a name."""
+    position = rng.randrange(len(name))
+    return name[:position] + 'x' + name[position + 1:]
+
+
+def main():
+    rng = random.Random(1)
+    names = make_names(SIZE)
+    build = timeit(lambda: NameIndex(names))
+    index = NameIndex(names)
+    prefixes = [rng.choice(names)[:4] for _ in range(QUERIES)]
+    misspelled = [typo(rng.choice(names), rng) for _ in range(QUERIES)]
+    prefix = timeit(lambda: [index.prefix(text) for text in prefixes], 3)
+    grams = timeit(lambda: index.fuzzy('warmup'))
+    fuzzy = timeit(lambda: [index.fuzzy(text) for text in misspelled])
+    print(f"{SIZE} names, index built in {build:.2f} s, "
+          f"trigrams built in {grams:.2f} s")
+    print(f"prefix: {prefix / QUERIES * 1e6:10.1f} us/query")
+    print(f"fuzzy:  {fuzzy / QUERIES * 1e6:10.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
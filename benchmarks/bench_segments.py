@@ -0,0 +1,49 @@
+"""Benchmark of the segmented file layout against the single Fernet blob.
+
+Reports load time and peak traced memory of a full load for both layouts,
+and the time to read a single contact from the segmented file.
+
+Usage:
+    python -m benchmarks.bench_segments
+"""
+import pickle
+import tempfile
+import tracemalloc
+from pathlib import Path
+from app.file import FileProcessor as fp
+from app.protection import Cipher
+from benchmarks.common import timeit
+from tests.helpers import make_book, make_name
+
+SIZE = 100_000
+
+
+def peak_memory(func) -> int:
+    """Runs a function and returns its peak traced memory in bytes."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    cipher = Cipher('AddressBook')
+    book = make_book(SIZE)
+    with tempfile.TemporaryDirectory() as folder:
+        legacy = Path(folder) / 'legacy.pkl'
+        segmented = Path(folder) / 'segmented.pkl'
+        legacy.write_bytes(cipher.encrypt_data(pickle.dumps(book)))
+        fp.write_file(segmented, book, cipher)
+        for label, database in (('blob', legacy), ('segments', segmented)):
+            elapsed = timeit(lambda: fp.read_file(database, cipher))
+            peak = peak_memory(lambda: fp.read_file(database, cipher))
+            print(f"{label:>9}: load {elapsed * 1000:8.1f} ms, "
+                  f"peak {peak / 2**20:7.1f} MiB")
+        name = make_name(SIZE // 2)
+        single = timeit(lambda: fp.read_record(segmented, cipher, name), 5)
+        print(f"single contact from segments: {single * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Load test of the book server.
+
+Starts the server in a separate process on localhost and connects
+hundreds of simulated clients. Every client logs in and sends a mix of
+lookups, prefix searches and additions (one in ten requests changes the
+book). Reports requests per second and latency percentiles.
+
+Usage:
+    python -m benchmarks.bench_server [clients] [requests per client]
+"""
+import asyncio
+import multiprocessing
+import random
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from app.books import BookRegistry
+from app.protection import Cipher
+from app.server import PASSWORD_PROMPT, PROMPT, serve
+from app.storage import FileStorage
+from tests.helpers import make_book, make_name, make_phone
+
+SIZE = 100_000
+CLIENTS = 200
+REQUESTS = 50
+WRITE_SHARE = 0.1
+
+
+def run_server(port: int, folder: str, ready) -> None:
+    cipher = Cipher('AddressBook')
+    path = Path(folder) / 'contacts.pkl'
+    storage = FileStorage(path, cipher)
+    books = BookRegistry()
+    books.add(path, make_book(SIZE), storage)
+    ready.set()
+    asyncio.run(serve(books, f"127.0.0.1:{port}", default=path))
+
+
+async def client(port: int, number: int, requests: int,
+                 latencies: list) -> None:
+    rng = random.Random(number)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    await reader.readuntil(PASSWORD_PROMPT.encode())
+    writer.write(b'AddressBook\n')
+    await reader.readuntil(PROMPT.encode())
+    for request in range(requests):
+        if rng.random() < WRITE_SHARE:
+            new = SIZE + number * requests + request
+            line = f"add {make_name(new)} {make_phone(new)}"
+        elif rng.random() < 0.5:
+            line = f"phone {make_name(rng.randrange(SIZE))}"
+        else:
+            line = f"search {make_name(rng.randrange(SIZE))[:-2]}"
+        start = time.perf_counter()
+        writer.write(f"{line}\n".encode())
+        await reader.readuntil(PROMPT.encode())
+        latencies.append(time.perf_counter() - start)
+    writer.write(b'exit\n')
+    await reader.read()
+    writer.close()
+
+
+async def load(port: int, clients: int, requests: int) -> tuple:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, number, requests, latencies)
+        for number in range(clients)
+    ))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else REQUESTS
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    with tempfile.TemporaryDirectory() as folder:
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=run_server, args=(port, folder, ready), daemon=True
+        )
+        server.start()
+        ready.wait()
+        time.sleep(0.5)
+        try:
+            elapsed, latencies = asyncio.run(load(port, clients, requests))
+        finally:
+            server.terminate()
+            server.join()
+    total = len(latencies)
+    print(f"{clients} clients x {requests} requests on {SIZE} contacts")
+    print(f"throughput: {total / elapsed:8.0f} requests/s")
+    for label, share in (('p50', 0.5), ('p99', 0.99)):
+        latency = latencies[min(total - 1, int(total * share))]
+        print(f"{label}:        {latency * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark of ShardedBook with growing numbers of shards.
+
+Splits a book into 1, 2, 4 and 8 shards and times opening it (the shards
+load in parallel), batched lookups with find_many, find_by_phone, the
+upcoming birthdays of a year and the first sorted page of all contacts,
+which are answered by all shards at once. Throughput grows with the
+shards up to the number of cores; beyond it only the overhead shows.
+
+Usage:
+    python -m benchmarks.bench_shards [size]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from app.protection import Cipher
+from app.shards import ShardedBook, split
+from benchmarks.common import sample, timeit
+from tests.helpers import make_book, make_name, make_phone
+
+SIZE = 200_000
+SHARDS = (1, 2, 4, 8)
+LOOKUPS = 100_000
+BATCH = 1_000
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+    cipher = Cipher('AddressBook')
+    book = make_book(size, birthdays=True)
+    names = [make_name(number) for number in sample(size, LOOKUPS)]
+    batches = [names[i:i + BATCH] for i in range(0, len(names), BATCH)]
+    phones = [make_phone(number) for number in sample(size, 100)]
+    print(f"{size} contacts, {os.cpu_count()} cores")
+    for shards in SHARDS:
+        with tempfile.TemporaryDirectory() as folder:
+            split(book, Path(folder), cipher, shards)
+            start = time.perf_counter()
+            with ShardedBook(folder, cipher) as sharded:
+                opened = time.perf_counter() - start
+                lookups = timeit(lambda: [
+                    sharded.find_many(batch) for batch in batches
+                ])
+                by_phone = timeit(lambda: [
+                    sharded.find_by_phone(phone) for phone in phones
+                ]) / len(phones)
+                birthdays = timeit(lambda: sharded.upcoming_birthdays(365))
+                page = timeit(
+                    lambda: list(sharded.show_all(page=1, sort=True))
+                )
+        print(f"{shards} shards: open {opened:5.2f} s, "
+              f"find_many {LOOKUPS / lookups:9,.0f}/s, "
+              f"find_by_phone {by_phone * 1000:5.2f} ms, "
+              f"birthdays {birthdays * 1000:6.1f} ms, "
+              f"sorted page {page * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
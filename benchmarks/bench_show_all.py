@@ -0,0 +1,57 @@
+"""Benchmark of rendering the `all` command.
+
+Compares building the whole listing as one string with streaming it
+line by line, and shows the cost of single pages.
+
+Usage:
+    python -m benchmarks.bench_show_all
+"""
+import io
+import tracemalloc
+from benchmarks.common import timeit
+from tests.helpers import make_book
+
+SIZE = 200_000
+
+
+def concatenated(book) -> str:
+    """The rendering of `all` before it became a generator."""
+    output_of_contacts = ''
+    for _, phone_record in book.data.items():
+        output_of_contacts += f"{phone_record}\n"
+    return output_of_contacts
+
+
+def streamed(book) -> None:
+    sink = io.StringIO()
+    for line in book.show_all():
+        sink.write(line)
+        sink.seek(0)
+
+
+def peak(func) -> float:
+    tracemalloc.start()
+    func()
+    result = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result / 2**20
+
+
+def main():
+    book = make_book(SIZE)
+    print(f"{SIZE} contacts")
+    print(f"one string: {timeit(lambda: concatenated(book)) * 1000:8.1f} ms, "
+          f"peak {peak(lambda: concatenated(book)):6.1f} MiB")
+    print(f"streamed:   {timeit(lambda: streamed(book)) * 1000:8.1f} ms, "
+          f"peak {peak(lambda: streamed(book)):6.1f} MiB")
+    for page in (1, 100, 1000):
+        for sort in (False, True):
+            elapsed = timeit(
+                lambda: list(book.show_all(page, 50, sort=sort)), 3
+            )
+            label = 'sorted' if sort else 'unsorted'
+            print(f"page {page:>4} (50 per page), {label:>8}: {elapsed * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark of the mapped snapshot against the encrypted contacts file.
+
+For books of growing size, reports the time from opening the book to the
+answer of the first lookup, and the time of a single lookup afterwards.
+
+Usage:
+    python -m benchmarks.bench_snapshot
+"""
+import tempfile
+import time
+from pathlib import Path
+from app.file import FileProcessor as fp
+from app.protection import Cipher
+from app.snapshot import Snapshot, SnapshotBook, write_snapshot
+from benchmarks.common import sample, timeit
+from tests.helpers import make_book, make_name
+
+SIZES = (10_000, 100_000, 300_000)
+LOOKUPS = 1000
+
+
+def open_file(database, cipher):
+    return fp.read_file(database, cipher)
+
+
+def open_snapshot(database, cipher):
+    return SnapshotBook(Snapshot(database))
+
+
+def main():
+    cipher = Cipher('AddressBook')
+    with tempfile.TemporaryDirectory() as folder:
+        for size in SIZES:
+            book = make_book(size, birthdays=True)
+            database = Path(folder) / 'contacts.pkl'
+            snapshot = Path(folder) / 'contacts.snap'
+            fp.write_file(database, book, cipher)
+            write_snapshot(snapshot, book)
+            names = [make_name(number) for number in sample(size, LOOKUPS)]
+            for label, opener, path in (
+                ('pickle', open_file, database),
+                ('snapshot', open_snapshot, snapshot),
+            ):
+                start = time.perf_counter()
+                contacts = opener(path, cipher)
+                contacts.find([names[0]])
+                first = time.perf_counter() - start
+                lookup = timeit(lambda: [
+                    contacts.find([name]) for name in names
+                ]) / LOOKUPS
+                print(f"{size:>8} {label:>9}: open + first lookup "
+                      f"{first * 1000:9.2f} ms, lookup "
+                      f"{lookup * 1e6:7.2f} us")
+                if label == 'snapshot':
+                    contacts.snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
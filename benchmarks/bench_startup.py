@@ -0,0 +1,57 @@
+"""Benchmark of cold and warm startup: key derivation plus loading the book.
+
+Every measurement runs in a fresh interpreter, like a short-lived
+invocation of bot.py. The warm run reuses the derived key through the
+ASSISTANT_KEY_CACHE file written by the cold run.
+
+Usage:
+    python -m benchmarks.bench_startup
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from app.file import FileProcessor as fp
+from app.protection import Cipher
+from tests.helpers import make_book
+
+PASSWORD = 'AddressBook'
+SIZE = 10_000
+STARTUP = """
+import sys
+from app.file import FileProcessor as fp
+from app.protection import Cipher
+cipher = Cipher(sys.argv[2], **fp.kdf_params(fp.read_header(sys.argv[1])))
+result = fp.read_file(sys.argv[1], cipher)
+sys.exit(result == 'wrong pass')
+"""
+
+
+def start(database: Path, password: str, env: dict) -> float:
+    """Runs one startup in a subprocess and returns its wall time."""
+    begin = time.perf_counter()
+    subprocess.run(
+        [sys.executable, '-c', STARTUP, str(database), password],
+        env=env, check=False,
+    )
+    return time.perf_counter() - begin
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        database = Path(folder) / 'contacts.pkl'
+        fp.write_file(database, make_book(SIZE), Cipher(PASSWORD))
+        env = dict(os.environ, ASSISTANT_KEY_CACHE=str(Path(folder) / 'keys'))
+        cold = start(database, PASSWORD, env)
+        warm = start(database, PASSWORD, env)
+        wrong = start(database, 'wrong password', env)
+    print(f"book of {SIZE} contacts")
+    print(f"cold startup (no cache):   {cold * 1000:8.1f} ms")
+    print(f"warm startup (key cached): {warm * 1000:8.1f} ms")
+    print(f"wrong password rejected:   {wrong * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
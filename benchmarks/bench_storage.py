@@ -0,0 +1,43 @@
+"""Benchmark of the storage backends.
+
+Reports the time to persist a single changed contact (a journal entry
+for the contacts file, the rows of the contact for SQLite), the time to
+write the whole book, and the load time of both backends.
+
+Usage:
+    python -m benchmarks.bench_storage
+"""
+import tempfile
+from pathlib import Path
+from app.protection import Cipher
+from app.storage import FileStorage, SQLiteStorage
+from benchmarks.common import timeit
+from tests.helpers import make_book, make_name
+
+SIZE = 100_000
+CHANGES = 200
+
+
+def main():
+    cipher = Cipher('AddressBook')
+    book = make_book(SIZE, birthdays=True)
+    names = [[make_name(number)] for number in range(CHANGES)]
+    with tempfile.TemporaryDirectory() as folder:
+        for storage in (
+            FileStorage(Path(folder) / 'contacts.pkl', cipher),
+            SQLiteStorage(Path(folder) / 'contacts.db', cipher),
+        ):
+            label = type(storage).__name__
+            write = timeit(lambda: (storage.compact(book), storage.close()))
+            change = timeit(lambda: [
+                storage.append(book, 'add-birthday', args) for args in names
+            ]) / CHANGES
+            storage.close()
+            load = timeit(storage.load)
+            storage.close()
+            print(f"{label:>13}: write {write:7.2f} s, "
+                  f"change {change * 1000:7.2f} ms, load {load:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
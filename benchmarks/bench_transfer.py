@@ -0,0 +1,42 @@
+"""Benchmark of bulk CSV/JSONL import and export throughput.
+
+Usage:
+    python -m benchmarks.bench_transfer
+"""
+import tempfile
+import time
+from pathlib import Path
+from app import transfer
+from app.book import AddressBook
+from tests.helpers import make_birthday, make_book, make_name, make_phone
+
+SIZE = 200_000
+
+
+def main():
+    source = make_book(SIZE, birthdays=True)
+    with tempfile.TemporaryDirectory() as folder:
+        for suffix in ('.csv', '.jsonl'):
+            path = Path(folder) / f"contacts{suffix}"
+            start = time.perf_counter()
+            transfer.export_contacts(source, path)
+            exported = time.perf_counter() - start
+            book = AddressBook()
+            start = time.perf_counter()
+            imported, rejected = transfer.import_contacts(book, path)
+            elapsed = time.perf_counter() - start
+            print(f"{suffix:>7}: export {SIZE / exported:10,.0f} rows/s, "
+                  f"import {imported / elapsed:10,.0f} rows/s "
+                  f"({rejected} rejected)")
+        bad = Path(folder) / 'bad.csv'
+        bad.write_text(
+            f"{make_name(1)},{make_phone(1)},{make_birthday(1)}\n"
+            f"{make_name(2)},12345,\n{make_name(3)},,31.02.2000\n",
+            encoding='utf-8',
+        )
+        print("rejected rows:", transfer.import_contacts(AddressBook(), bad))
+        print(Path(f"{bad}.errors.csv").read_text(encoding='utf-8'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared helpers for the benchmark scripts."""
+import random
+import time
+
+
+def sample(size: int, count: int, seed: int = 42) -> list:
+    """Returns a reproducible list of record numbers to query."""
+    rng = random.Random(seed)
+    return [rng.randrange(size) for _ in range(count)]
+
+
+def timeit(func, repeat: int = 1) -> float:
+    """Runs a function and returns the best wall time in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
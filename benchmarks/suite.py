@@ -0,0 +1,195 @@
+"""Benchmark suite of the whole life of a book, with JSON results.
+
+Builds synthetic books of every size and times, for each of them:
+    - add_record: adding the contacts (with birthdays) one by one;
+    - save, load: FileProcessor.write_file and read_file (the segmented
+        record codec, compressed as set by ASSISTANT_COMPRESSION);
+    - find, find_by_phone: lookups of random contacts;
+    - show_all: rendering the whole listing;
+    - upcoming_birthdays: get_upcoming_birthdays for 7 and 30 days;
+    - dispatch: a mix of command lines through parse_input, make_command
+        and execute, as the loop of bot.main runs them.
+
+Every result is the best of --repeat runs, in seconds per operation.
+The results are written as JSON with the environment they were measured
+in. With --compare, they are checked against a saved run, and slower
+results than --threshold percent are reported; the exit status is 1 if
+there are any, so the suite can gate a change.
+
+Usage:
+    python -m benchmarks.suite [--sizes 1000,100000,1000000]
+        [--repeat N] [--output results.json] [--compare baseline.json]
+        [--threshold PERCENT]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from app.dispatch import make_command, parse_input
+from app.file import FileProcessor
+from app.protection import Cipher
+from benchmarks.common import sample, timeit
+from tests.helpers import make_birthday, make_book, make_name, make_phone
+
+SIZES = (1_000, 100_000)
+LOOKUPS = 10_000
+LINES = 10_000
+
+
+def commands(size: int, count: int) -> list:
+    """A reproducible mix of reading and changing command lines."""
+    lines = []
+    for number in sample(size, count):
+        name = make_name(number)
+        lines.extend((
+            f"phone {name}",
+            f"show-birthday {name}",
+            f"add-birthday {name} {make_birthday(number + 1)}",
+            f"search {name[:-2]}",
+            "birthdays 7",
+        ))
+    return lines[:count]
+
+
+class NoStorage:
+    """Storage that keeps nothing, so dispatch times the commands only."""
+    def append(self, contacts, operation, args) -> None:
+        pass
+
+
+def dispatch(lines: list, book, storage) -> None:
+    """Runs command lines as bot.main does, rendering the answers."""
+    for line in lines:
+        command, *args = parse_input(line)
+        result = make_command(command, args, book, storage).execute()
+        if isinstance(result, Iterator):
+            ''.join(result)
+
+
+def measure(size: int, repeat: int, cipher: Cipher) -> dict:
+    """Times every operation on a book of a size.
+
+    Returns:
+        dict: Operation names to seconds per operation.
+    """
+    results = {}
+    start = time.perf_counter()
+    book = make_book(size, birthdays=True)
+    results['add_record'] = (time.perf_counter() - start) / size
+    lookups = sample(size, LOOKUPS)
+    names = [make_name(number) for number in lookups]
+    phones = [make_phone(number) for number in lookups]
+    lines = commands(size, LINES)
+    with tempfile.TemporaryDirectory() as folder:
+        database = Path(folder) / 'contacts.pkl'
+        results['save'] = timeit(
+            lambda: FileProcessor.write_file(database, book, cipher), repeat
+        )
+        results['load'] = timeit(
+            lambda: FileProcessor.read_file(database, cipher), repeat
+        )
+    results['find'] = timeit(
+        lambda: [book.find([name]) for name in names], repeat
+    ) / LOOKUPS
+    results['find_by_phone'] = timeit(
+        lambda: [book.find_by_phone(phone) for phone in phones], repeat
+    ) / LOOKUPS
+    results['show_all'] = timeit(lambda: ''.join(book.show_all()), repeat)
+    for days in (7, 30):
+        results[f'upcoming_birthdays_{days}'] = timeit(
+            lambda: book.get_upcoming_birthdays(days), repeat
+        )
+    storage = NoStorage()
+    results['dispatch'] = timeit(
+        lambda: dispatch(lines, book, storage), repeat
+    ) / len(lines)
+    return results
+
+
+def environment() -> dict:
+    """Where the results were measured, to tell comparable runs apart."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints the change of every result against a baseline.
+
+    Args:
+        results (dict): Sizes to operations to seconds, of this run.
+        baseline (dict): The same, of the saved run.
+        threshold (float): Slowdown in percent that counts as a regression.
+
+    Returns:
+        list: The (size, operation) pairs that regressed.
+    """
+    regressions = []
+    for size, operations in results.items():
+        for operation, seconds in operations.items():
+            before = baseline.get(size, {}).get(operation)
+            if not before:
+                print(f"{size:>8} {operation:<24} {seconds:12.3e} s   (new)")
+                continue
+            change = (seconds / before - 1) * 100
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((size, operation))
+            print(f"{size:>8} {operation:<24} {seconds:12.3e} s "
+                  f"{change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--sizes', default=','.join(map(str, SIZES)),
+        help="comma separated book sizes (default: %(default)s)",
+    )
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per result, the best counts")
+    parser.add_argument('--output', help="write the results to a JSON file")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="compare with the JSON results of another run")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="slowdown in percent reported as a regression")
+    options = parser.parse_args()
+    cipher = Cipher('AddressBook')
+    results = {}
+    for size in map(int, options.sizes.split(',')):
+        results[str(size)] = measure(size, options.repeat, cipher)
+        if not options.compare:
+            for operation, seconds in results[str(size)].items():
+                print(f"{size:>8} {operation:<24} {seconds:12.3e} s")
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump({'environment': environment(), 'results': results},
+                      file, indent=2)
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline['environment']['machine'] != platform.machine():
+            print("The baseline was measured on another machine.")
+        if compare(results, baseline['results'], options.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,62 @@
 """imports"""
-import re
+import argparse
+import asyncio
+import os
 import sys
+from collections.abc import Iterator
 from pathlib import Path
-from app.file import FileProcessor as fp
+from app.books import BookRegistry
+from app.file import FileException
 from app.protection import Cipher
+from app.storage import backend
 from app.interface import CommandLineInterface
-import app.commands as cmd
+from app.batch import run_script
+from app.dispatch import COMMAND_ERRORS, EXIT_COMMANDS, command_error, \
+    make_command, parse_input
+from app.registry import load_plugins
+from app import stats
+from app.server import serve
 
 
-database = Path("data/contacts.pkl")
+database = Path(os.environ.get('ASSISTANT_DATABASE', "data/contacts.pkl"))
 interface = CommandLineInterface()
 
 def password_check(base: Path):
     """ Function to prompt the user for a password and validate it 
-        against the database.
+        against the database. The ASSISTANT_PASSWORD environment variable,
+        if set, is tried instead of prompting. A book that is not encrypted
+        (a snapshot) is opened without a password.
 
     Args:
         database (Path): Path to the file containing the encrypted contacts 
             database.
 
     Returns:
-        Dict, Cipher: AddressBook instance and the corresponding cipher object 
+        Dict, Storage: AddressBook instance and the storage it is kept in
             if the password is correct, or None if access is denied
             after three incorrect attempts.
     """
-    for attempt in range(3):
-        password = interface.asking("Please, enter password to AddressBook: ")
-        cryptograph = Cipher(password)
-        contacts = fp.read_file(base, cryptograph)
+    storage_class = backend(base)
+    kdf_params = storage_class.kdf_params(base)
+    if not storage_class.ENCRYPTED:
+        storage = storage_class(base, None)
+        return storage.load(), storage
+    preset = os.environ.get('ASSISTANT_PASSWORD')
+    attempts = 3 if preset is None else 1
+    for attempt in range(attempts):
+        password = preset if preset is not None else \
+            interface.asking("Please, enter password to AddressBook: ")
+        storage = storage_class(base, Cipher(password, **kdf_params))
+        contacts = storage.load()
         if contacts != 'wrong pass':
-            return contacts, cryptograph
+            return contacts, storage
+        storage.close()
         interface.answer(
-            f"Incorrect password. {2 - attempt} attempts left."
+            f"Incorrect password. {attempts - 1 - attempt} attempts left."
         )
     interface.answer("Access denied.")
     return None
 
-def parse_input(user_input: str) -> tuple:
-    """Split the user's input into command and arguments.
-        
-    Args:
-        user_input (str): User input string.
-
-    Returns:
-        tuple: A tuple containing the command and its arguments.
-    """
-    command, *args = user_input.split()
-    command = command.strip().lower()
-    command = re.sub("[^A-Za-z]", "", command)
-    return command, *args
-
 def main():
     """This code is designed to create a simple command-line interface (CLI)
     application that interacts with a contacts database. The user can perform
@@ -57,10 +64,70 @@ def main():
     uses the 'colorama' module to add colors to the output strings for better
     readability and Fernet for encrypting file.
     """
+    parser = argparse.ArgumentParser(description="Assistant bot.")
+    parser.add_argument(
+        '--serve', metavar='ADDRESS',
+        help="serve the book to many clients on host:port or a Unix socket",
+    )
+    parser.add_argument(
+        '--books', metavar='FOLDER',
+        help="with --serve, serve the books of a folder, each client "
+             "naming its own",
+    )
+    parser.add_argument(
+        '--script', metavar='FILE',
+        help="execute the commands of a file ('-' for stdin) and exit",
+    )
+    parser.add_argument(
+        '--save-every', metavar='N', type=int,
+        help="in script mode, save after every N changes instead of "
+             "only at the end",
+    )
+    options = parser.parse_args()
+    if options.books and not options.serve:
+        parser.error("--books needs --serve")
     try:
-        contacts, cryptograph = password_check(database)
+        load_plugins()
+    except (ImportError, ValueError, TypeError) as e:
+        sys.exit(f"Can not load a plugin: {e}")
+    if options.books:
+        interface.answer(
+            f"Serving the books of {options.books} on {options.serve}."
+        )
+        try:
+            asyncio.run(serve(BookRegistry(), options.serve,
+                              folder=Path(options.books),
+                              suffix=database.suffix or '.pkl'))
+        except KeyboardInterrupt:
+            pass
+        return
+    try:
+        contacts, storage = password_check(database)
+    except FileException as e:
+        sys.exit(str(e))
     except TypeError:
         sys.exit()
+    if options.serve:
+        interface.answer(f"Serving the book on {options.serve}.")
+        books = BookRegistry()
+        books.add(database, contacts, storage)
+        try:
+            asyncio.run(serve(books, options.serve, default=database))
+        except KeyboardInterrupt:
+            pass
+        return
+    if options.script:
+        try:
+            if options.script == '-':
+                run_script(sys.stdin, contacts, storage, sys.stdout,
+                           options.save_every)
+                return
+            with open(options.script, encoding='utf-8') as script:
+                run_script(script, contacts, storage, sys.stdout,
+                           options.save_every)
+        except FileException as e:
+            sys.exit(str(e))
+        return
     interface.answer("Welcome to the assistant bot!\n" \
                 "(enter 'help' for list of commands)\n")
     working = True
@@ -68,35 +135,17 @@ def main():
     while working:
         user_input = interface.asking("Enter a command: ")
         command, *args = parse_input(user_input)
-
-        match command:
-            case "close" | "exit":
-                message = cmd.Close(database, contacts, cryptograph)
-                working = False
-            case "hello":
-                message = cmd.Hello()
-            case "help":
-                message = cmd.Help()
-            case "add":
-                message = cmd.Add(contacts, args)
-            case "addbirthday":
-                message = cmd.AddBirthday(contacts, args)
-            case "change":
-                message = cmd.Change(contacts, *args)
-            case "del":
-                message = cmd.Delete(contacts, args)
-            case "phone":
-                message = cmd.Phone(contacts, args)
-            case "all":
-                message = cmd.All(contacts)
-            case "showbirthday":
-                message = cmd.ShowBirthday(contacts, args)
-            case "birthdays":
-                message = cmd.Birthdays(contacts)
-            case _:
-                message = cmd.WrongCommand()
-        interface.answer(message.execute())
+        message = make_command(command, args, contacts, storage)
+        working = command not in EXIT_COMMANDS
+        try:
+            result = message.execute()
+            if isinstance(result, Iterator):
+                interface.answer_lines(result)
+            else:
+                interface.answer(result)
+        except COMMAND_ERRORS as e:
+            interface.answer(command_error(e))
 
 
 if __name__ == "__main__":
-    main()
+    stats.run(main)
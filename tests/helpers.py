@@ -0,0 +1,37 @@
+"""Builders of synthetic contacts, shared by the tests and the benchmarks."""
+from datetime import date, timedelta
+from app.book import AddressBook
+
+
+def make_name(number: int) -> str:
+    """Builds a unique synthetic contact name for the given number."""
+    return f"Contact{number:08d}"
+
+
+def make_phone(number: int) -> str:
+    """Builds a unique synthetic 10 digit phone number for the given number."""
+    return f"{5000000000 + number:010d}"
+
+
+def make_birthday(number: int) -> str:
+    """Builds a synthetic birth date spread over the whole calendar."""
+    day = date(1950, 1, 1) + timedelta(days=number * 7919 % 20000)
+    return day.strftime('%d.%m.%Y')
+
+
+def make_book(size: int, birthdays: bool = False) -> AddressBook:
+    """Creates an address book filled with synthetic contacts.
+
+    Args:
+        size (int): The number of contacts to generate.
+        birthdays (bool): Whether every contact gets a birth date.
+
+    Returns:
+        AddressBook: The filled address book.
+    """
+    book = AddressBook()
+    for number in range(size):
+        book.add_record([make_name(number), make_phone(number)])
+        if birthdays:
+            book.birthday_date(make_name(number), make_birthday(number))
+    return book
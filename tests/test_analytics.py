@@ -0,0 +1,84 @@
+"""Tests of the NumPy analytics of app.analytics and of their fallback
+without NumPy, against the methods of AddressBook."""
+import importlib
+import sys
+from datetime import date
+import pytest
+from app import analytics
+from app.book import AddressBook
+from tests.helpers import make_book
+
+# Born on the edges of the calendar, on top of the synthetic contacts.
+BIRTHDAYS = {
+    'Leap': '29.02.1996', 'March': '01.03.1990', 'February': '28.02.1985',
+    'Eve': '31.12.1979', 'NewYear': '01.01.2001', 'Saturday': '04.01.1992',
+}
+WINDOWS = [
+    (date(2024, 2, 25), 7), (date(2025, 2, 25), 7), (date(2023, 12, 30), 70),
+    (date(2024, 2, 29), 1), (date(2025, 3, 1), 0), (date(2024, 12, 28), 8),
+    (date(2024, 6, 15), 365), (date(2025, 3, 2), 400),
+]
+
+
+@pytest.fixture(scope='module')
+def book():
+    book = make_book(500, birthdays=True)
+    for number, (name, birthday) in enumerate(BIRTHDAYS.items()):
+        book.add_record([name, f"{6000000000 + number:010d}"])
+        book.birthday_date(name, birthday)
+    # Phones shared by two and by three contacts.
+    book.add_phone(['Leap', '5000000001'])
+    book.add_phone(['Eve', '5000000001'])
+    book.add_phone(['March', '5000000002'])
+    return book
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """app.analytics imported as if NumPy were not installed."""
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    yield importlib.reload(analytics)
+    monkeypatch.undo()
+    importlib.reload(analytics)
+
+
+def duplicates(book: AddressBook) -> dict:
+    return {phone: sorted(owners)
+            for phone, owners in book.phone_index.items() if len(owners) > 1}
+
+
+@pytest.mark.skipif(not analytics.HAS_NUMPY, reason="needs NumPy")
+@pytest.mark.parametrize('today, days', WINDOWS)
+def test_numpy_birthdays_match_the_book(book, today, days):
+    expected = book.upcoming_birthdays(days, today)
+    found = analytics.upcoming_birthdays(book, days, today)
+    assert sorted(found) == sorted(expected)
+    dates = [day for day, _ in found]
+    assert dates == sorted(dates)
+
+
+@pytest.mark.skipif(not analytics.HAS_NUMPY, reason="needs NumPy")
+def test_numpy_columns_and_duplicate_phones(book):
+    columns = analytics.ColumnarBook.from_book(book)
+    assert columns.names == list(book.data)
+    assert len(columns.phones) == sum(
+        len(record.phones) for record in book.data.values()
+    )
+    found = analytics.duplicate_phones(book, columns)
+    assert {phone: sorted(owners) for phone, owners in found.items()} == \
+        duplicates(book)
+    assert sorted(found['5000000001']) == ['Contact00000001', 'Eve', 'Leap']
+
+
+@pytest.mark.parametrize('today, days', WINDOWS)
+def test_fallback_birthdays_match_the_book(book, fallback, today, days):
+    assert not fallback.HAS_NUMPY
+    assert fallback.upcoming_birthdays(book, days, today) == \
+        book.upcoming_birthdays(days, today)
+
+
+def test_fallback_duplicate_phones(book, fallback):
+    assert not fallback.HAS_NUMPY
+    assert {phone: sorted(owners)
+            for phone, owners in fallback.duplicate_phones(book).items()} \
+        == duplicates(book)
@@ -0,0 +1,25 @@
+"""Tests of the batch mode."""
+import io
+from cryptography.fernet import Fernet
+from app.batch import run_script
+from app.book import AddressBook
+from app.protection import Cipher
+from app.storage import FileStorage
+
+
+def test_a_failed_line_is_reported_and_the_script_goes_on(tmp_path):
+    path = tmp_path / 'contacts.pkl'
+    cipher = Cipher.from_key(Fernet.generate_key())
+    output = io.StringIO()
+    executed = run_script(
+        io.StringIO("add Alice 0501234567\n"
+                    "# a comment\n"
+                    "change Nobody 0501234567 0671234567\n"
+                    "add Bob 0671234567\n"),
+        AddressBook(), FileStorage(path, cipher), output,
+    )
+    assert executed == 3
+    assert "line 3: Contact not found: Nobody" in output.getvalue()
+    storage = FileStorage(path, cipher)
+    assert sorted(storage.load().data) == ['Alice', 'Bob']
+    storage.close()
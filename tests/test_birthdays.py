@@ -0,0 +1,113 @@
+"""Tests of the upcoming birthdays of AddressBook against a scan of all
+contacts."""
+from calendar import isleap
+from datetime import date, timedelta
+import pytest
+import app.book
+from app.book import AddressBook
+from tests.helpers import make_book
+
+# Born on the edges of the calendar, on top of the synthetic contacts.
+BIRTHDAYS = {
+    'Leap': '29.02.1996', 'March': '01.03.1990', 'February': '28.02.1985',
+    'Eve': '31.12.1979', 'NewYear': '01.01.2001', 'Epiphany': '05.01.1970',
+    'Childermas': '28.12.1992',
+}
+
+
+@pytest.fixture(scope='module')
+def book():
+    book = make_book(400, birthdays=True)
+    for number, (name, birthday) in enumerate(BIRTHDAYS.items()):
+        book.add_record([name, f"{6000000000 + number:010d}"])
+        book.birthday_date(name, birthday)
+    return book
+
+
+def monday(day: date) -> date:
+    if day.weekday() >= 5:
+        return day + timedelta(days=7 - day.weekday())
+    return day
+
+
+def scan(contacts: AddressBook, days: int, today: date) -> list:
+    """The upcoming birthdays by a look at every contact: the first day of
+    the window on its birthday, February 29 falling on March 1 of
+    non-leap years."""
+    found = []
+    for name, record in contacts.data.items():
+        birthday = record.birthday
+        if birthday is None:
+            continue
+        for offset in range(min(days, 365) + 1):
+            day = today + timedelta(days=offset)
+            if (day.month, day.day) == (birthday.month, birthday.day) or (
+                (birthday.month, birthday.day) == (2, 29)
+                and (day.month, day.day) == (3, 1)
+                and not isleap(day.year)
+            ):
+                found.append((monday(day), name))
+                break
+    return sorted(found)
+
+
+@pytest.mark.parametrize('today, days', [
+    (date(2024, 2, 25), 7),
+    (date(2025, 2, 25), 7),
+    (date(2025, 2, 28), 1),
+    (date(2024, 12, 28), 8),
+    (date(2025, 12, 28), 8),
+    (date(2025, 3, 1), 400),
+    (date(2024, 6, 15), 365),
+    (date(2024, 6, 15), 366),
+])
+def test_upcoming_birthdays_match_a_scan(book, today, days):
+    upcoming = book.upcoming_birthdays(days, today)
+    assert sorted(upcoming) == scan(book, days, today)
+    assert len({name for _, name in upcoming}) == len(upcoming)
+
+
+def test_february_29_in_leap_and_other_years(book):
+    assert (date(2024, 2, 29), 'Leap') in \
+        book.upcoming_birthdays(7, date(2024, 2, 27))
+    assert (date(2025, 3, 3), 'Leap') in \
+        book.upcoming_birthdays(7, date(2025, 2, 27))
+    assert 'Leap' not in [
+        name for _, name in book.upcoming_birthdays(1, date(2024, 2, 27))
+    ]
+
+
+def test_the_window_wraps_around_the_new_year(book):
+    names = [name for _, name in book.upcoming_birthdays(8, date(2024, 12, 28))
+             if name in BIRTHDAYS]
+    assert names == ['Childermas', 'Eve', 'NewYear', 'Epiphany']
+
+
+def test_weekend_birthdays_move_to_monday():
+    book = AddressBook()
+    for name, birthday in (('Saturday', '01.03.1990'),
+                           ('Sunday', '02.03.1990'),
+                           ('Monday', '03.03.1990')):
+        book.add_record([name, '5000000000'])
+        book.birthday_date(name, birthday)
+    # March 1 2025 is a Saturday.
+    assert book.upcoming_birthdays(7, date(2025, 3, 1)) == [
+        (date(2025, 3, 3), 'Saturday'), (date(2025, 3, 3), 'Sunday'),
+        (date(2025, 3, 3), 'Monday'),
+    ]
+
+
+def test_get_upcoming_birthdays_shows_the_monday(monkeypatch):
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return cls(2025, 2, 27)
+
+    monkeypatch.setattr(app.book, 'date', Today)
+    book = AddressBook()
+    book.add_record(['Saturday', '5000000000'])
+    book.birthday_date('Saturday', '01.03.1990')
+    listing = book.get_upcoming_birthdays(7)
+    assert 'Saturday' in listing and '03.03.2025' in listing
+    assert book.get_upcoming_birthdays(1) == \
+        'No birthdays expected in the next 1 days.'
@@ -0,0 +1,87 @@
+"""Tests of the phone index of AddressBook through every change of the
+phones of a contact."""
+import pickle
+import pytest
+from app.book import AddressBook
+
+NOT_FOUND = "No contact found with this phone number"
+
+
+def scan(book: AddressBook) -> dict:
+    """The phone index built from the records, owners in the order of
+    the book."""
+    index = {}
+    for name, record in book.data.items():
+        for phone in record.phones:
+            index.setdefault(phone, []).append(name)
+    return index
+
+
+def assert_index(book: AddressBook) -> None:
+    expected = scan(book)
+    assert book.phone_index == expected
+    for phone, owners in expected.items():
+        assert book.find_by_phone(phone) == owners[0]
+
+
+@pytest.fixture
+def book():
+    book = AddressBook()
+    book.add_record(['Olena', '5000000001'])
+    book.add_record(['Taras', '5000000002'])
+    book.add_record(['Iryna', '5000000003'])
+    book.add_phone(['Olena', '5000000011'])
+    # A phone shared by two contacts.
+    book.add_phone(['Taras', '5000000003'])
+    return book
+
+
+def test_added_phones_are_found(book):
+    assert_index(book)
+    assert book.find_by_phone('5000000011') == 'Olena'
+    assert book.phone_index['5000000003'] == ['Taras', 'Iryna']
+    assert book.find_by_phone('5000000003') == 'Taras'
+
+
+def test_removed_phone_is_not_found(book):
+    book.remove_phone(['Olena', '5000000011'])
+    assert_index(book)
+    assert book.find_by_phone('5000000011') == NOT_FOUND
+    book.remove_phone(['Iryna', '5000000003'])
+    assert_index(book)
+    assert book.find_by_phone('5000000003') == 'Taras'
+
+
+def test_changed_phone_moves_in_the_index(book):
+    book.change_phone('Olena', '5000000001', '5000000021')
+    assert_index(book)
+    assert book.find_by_phone('5000000001') == NOT_FOUND
+    assert book.find_by_phone('5000000021') == 'Olena'
+
+
+def test_deleted_contact_is_not_an_owner(book):
+    book.delete(['Taras'])
+    assert_index(book)
+    assert book.find_by_phone('5000000002') == NOT_FOUND
+    assert book.find_by_phone('5000000003') == 'Iryna'
+    book.delete(['Iryna'])
+    assert book.find_by_phone('5000000003') == NOT_FOUND
+
+
+def test_index_is_rebuilt_after_pickling(book):
+    book.change_phone('Olena', '5000000001', '5000000021')
+    book.delete(['Iryna'])
+    loaded = pickle.loads(pickle.dumps(book))
+    assert 'phone_index' not in book.__getstate__()
+    assert_index(loaded)
+    assert loaded.phone_index == book.phone_index
+    loaded.remove_phone(['Taras', '5000000003'])
+    assert_index(loaded)
+    assert loaded.find_by_phone('5000000003') == NOT_FOUND
+
+
+def test_rebuild_index_matches_the_kept_index(book):
+    book.remove_phone(['Olena', '5000000011'])
+    kept = book.phone_index
+    book.rebuild_index()
+    assert book.phone_index == kept
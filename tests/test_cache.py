@@ -0,0 +1,66 @@
+"""Tests of the render cache: answers kept until the book changes."""
+import pytest
+from app.book import AddressBook
+from app.cache import CACHE
+from app.dispatch import make_command, parse_input
+from app.server import render
+
+
+class NoStorage:
+    """Storage that keeps nothing, the changes are only in the book."""
+    def append(self, contacts, operation, args) -> None:
+        pass
+
+
+@pytest.fixture
+def book():
+    CACHE.clear()
+    book = AddressBook()
+    book.add_record(['Olena', '5000000001'])
+    book.add_record(['Taras', '5000000002'])
+    yield book
+    CACHE.clear()
+
+
+def run(book, line: str) -> str:
+    command, *args = parse_input(line)
+    return render(make_command(command, args, book, NoStorage()))
+
+
+def test_repeated_answers_come_from_the_cache(book):
+    first = run(book, 'all')
+    hits = CACHE.hits
+    assert run(book, 'all') == first
+    assert run(book, 'phone Olena') == run(book, 'phone Olena')
+    assert CACHE.hits == hits + 2
+
+
+@pytest.mark.parametrize('change, seen, gone', [
+    ('add Iryna 5000000003', '5000000003', None),
+    ('change Olena 5000000001 5000000021', '5000000021', '5000000001'),
+    ('del Olena', None, '5000000001'),
+    ('del Taras', None, '5000000002'),
+])
+def test_answers_change_with_the_book(book, change, seen, gone):
+    before = run(book, 'all'), run(book, 'phone Olena')
+    run(book, change)
+    after = run(book, 'all'), run(book, 'phone Olena')
+    assert after != before
+    assert after == (''.join(book.show_all()), str(book.find(['Olena'])))
+    if seen is not None:
+        assert seen in ''.join(after)
+    if gone is not None:
+        assert gone not in ''.join(after)
+
+
+def test_birthday_answers_change_with_the_book(book):
+    assert run(book, 'show-birthday Olena') == \
+        run(book, 'show-birthday Olena')
+    run(book, 'add-birthday Olena 01.02.1990')
+    assert '01.02.1990' in run(book, 'show-birthday Olena')
+
+
+def test_books_do_not_share_answers(book):
+    other = AddressBook()
+    other.add_record(['Olena', '5000000099'])
+    assert run(book, 'phone Olena') != run(other, 'phone Olena')
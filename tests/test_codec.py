@@ -0,0 +1,56 @@
+"""Tests of the binary record codec."""
+import pickle
+import pytest
+from app import codec
+from app.record import Phone, Record
+
+
+def record(name, phones=(), birth_ordinal=0):
+    return Record.from_parts(
+        name, b''.join(Phone.pack(phone) for phone in phones), birth_ordinal
+    )
+
+
+def fields(records):
+    return [
+        (item.name, item.packed_phones, item.birth_ordinal)
+        for item in records
+    ]
+
+
+def test_records_round_trip():
+    records = [
+        record('Alice', ['0501234567', '0000000001'], 726468),
+        record('Ölga Ñúñez 李', ['9999999999']),
+        record('Nobody'),
+    ]
+    assert fields(codec.decode_records(codec.encode_records(records))) == \
+        fields(records)
+
+
+def test_an_empty_block():
+    assert codec.decode_records(codec.encode_records([])) == []
+
+
+@pytest.mark.parametrize('cut', [1, 5, 8, 12, -1])
+def test_truncated_blocks_are_refused(cut):
+    data = codec.encode_records([record('Alice', ['0501234567'])])
+    with pytest.raises(codec.CodecError):
+        codec.decode_records(data[:cut])
+
+
+def test_another_version_is_refused():
+    data = bytearray(codec.encode_records([record('Alice')]))
+    data[0] = codec.VERSION + 1
+    with pytest.raises(codec.CodecError, match="version"):
+        codec.decode_records(bytes(data))
+
+
+def test_too_long_names_are_refused():
+    with pytest.raises(codec.CodecError):
+        codec.encode_records([record('x' * 70000)])
+
+
+def test_pickled_records_are_still_read():
+    old = record('Alice', ['0501234567'])
+    assert fields(codec.decode_any(pickle.dumps(old))) == fields([old])
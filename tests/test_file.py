@@ -0,0 +1,91 @@
+"""Tests of the segmented contacts file of FileProcessor."""
+import pytest
+from cryptography.fernet import Fernet
+from app.file import FileException, FileProcessor
+from app.protection import Cipher
+from tests.helpers import make_book
+
+
+@pytest.fixture
+def cipher():
+    return Cipher.from_key(Fernet.generate_key())
+
+
+def write(path, book, cipher, compression=None, segment_size=1024):
+    FileProcessor.write_segments(
+        path, FileProcessor.iter_segments(book.data, segment_size),
+        book.journal_seq, cipher, compression,
+    )
+
+
+@pytest.mark.parametrize('setting, expected', [
+    ('none', (None, None)),
+    ('zlib', ('zlib', 6)),
+    ('zlib:9', ('zlib', 9)),
+    ('lzma:0', ('lzma', 0)),
+])
+def test_compression_settings(monkeypatch, setting, expected):
+    monkeypatch.setenv('ASSISTANT_COMPRESSION', setting)
+    assert FileProcessor.compression() == expected
+
+
+@pytest.mark.parametrize('setting', ['zlib:10', 'lzma:12', 'zlib:x', 'gzip'])
+def test_invalid_compression_settings_are_refused(monkeypatch, setting):
+    monkeypatch.setenv('ASSISTANT_COMPRESSION', setting)
+    with pytest.raises(FileException):
+        FileProcessor.compression()
+
+
+@pytest.mark.parametrize('compression', [('zlib', 1), ('lzma', 6)])
+def test_compressed_files_read_back(tmp_path, cipher, compression):
+    path = tmp_path / 'contacts.pkl'
+    book = make_book(300, birthdays=True)
+    write(path, book, cipher, compression)
+    assert FileProcessor.read_header(path)['compression'] == \
+        compression[0]
+    loaded = FileProcessor.read_file(path, cipher)
+    assert {name: str(record) for name, record in loaded.data.items()} == \
+        {name: str(record) for name, record in book.data.items()}
+
+
+def test_a_book_spans_many_segments(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    book = make_book(500, birthdays=True)
+    book.journal_seq = 42
+    write(path, book, cipher)
+    assert sum(1 for _ in FileProcessor.iter_segments(book.data, 1024)) > 5
+    loaded = FileProcessor.read_file(path, cipher)
+    assert loaded.journal_seq == 42
+    assert sorted(loaded.data) == sorted(book.data)
+    assert loaded.find_by_phone(book.data['Contact00000123'].phones[0]) == \
+        'Contact00000123'
+
+
+def test_single_records_and_ranges_are_read(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    book = make_book(500)
+    write(path, book, cipher)
+    names = sorted(book.data)
+    # The first and last contacts of every segment, and their neighbours.
+    edges = {
+        name for first, last, _ in FileProcessor.iter_segments(
+            book.data, 1024
+        ) for name in (first, last)
+    }
+    for name in edges:
+        assert FileProcessor.read_record(path, cipher, name).name == name
+    assert FileProcessor.read_record(path, cipher, 'Contact') is None
+    assert FileProcessor.read_record(path, cipher, 'Zed') is None
+    found = FileProcessor.read_range(path, cipher, names[37], names[301])
+    assert [record.name for record in found] == names[37:302]
+
+
+def test_a_wrong_key_is_rejected(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    write(path, make_book(10), cipher)
+    other = Cipher.from_key(Fernet.generate_key())
+    assert FileProcessor.read_file(path, other) == 'wrong pass'
+
+
+def test_a_missing_file_is_an_empty_book(tmp_path, cipher):
+    assert len(FileProcessor.read_file(tmp_path / 'none.pkl', cipher)) == 0
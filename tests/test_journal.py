@@ -0,0 +1,141 @@
+"""Tests of the journal of FileStorage: replay, torn writes, sequence
+numbers and failed compactions."""
+import pytest
+from cryptography.fernet import Fernet
+from app.book import AddressBook
+from app.file import FileException, FileProcessor
+from app.journal import Journal
+from app.protection import Cipher
+from app.storage import FileStorage
+
+
+@pytest.fixture
+def cipher():
+    return Cipher.from_key(Fernet.generate_key())
+
+
+def add(storage, book, number):
+    args = [f"Contact{number}", f"{5000000000 + number:010d}"]
+    book.add_record(list(args))
+    storage.append(book, 'add', args)
+
+
+def reload(path, cipher):
+    storage = FileStorage(path, cipher)
+    try:
+        return storage.load()
+    finally:
+        storage.close()
+
+
+def test_replay_restores_the_changes(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    for number in range(3):
+        add(storage, book, number)
+    book.birthday_date('Contact1', '01.02.1990')
+    storage.append(book, 'add-birthday', ['Contact1', '01.02.1990'])
+    storage.close()
+    loaded = reload(path, cipher)
+    assert sorted(loaded.data) == ['Contact0', 'Contact1', 'Contact2']
+    assert loaded.data['Contact1'].birth_ordinal
+    assert loaded.journal_seq == 4
+
+
+def test_entries_in_the_snapshot_are_skipped(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    add(storage, book, 0)
+    journal = path.with_suffix('.journal').read_bytes()
+    storage.compact(book)
+    storage.close()
+    # A compaction interrupted before the journal was deleted.
+    path.with_suffix('.journal.old').write_bytes(journal)
+    book = reload(path, cipher)
+    storage = FileStorage(path, cipher)
+    assert storage.journal.replay(book) == 0
+    assert sorted(book.data) == ['Contact0']
+    storage.close()
+
+
+def test_a_torn_entry_is_cut_off(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    for number in range(2):
+        add(storage, book, number)
+    storage.close()
+    journal = path.with_suffix('.journal')
+    journal.write_bytes(journal.read_bytes() + b'gAAAAAB-torn')
+    storage = FileStorage(path, cipher)
+    book = storage.load()
+    assert sorted(book.data) == ['Contact0', 'Contact1']
+    add(storage, book, 2)
+    storage.close()
+    assert sorted(reload(path, cipher).data) == \
+        ['Contact0', 'Contact1', 'Contact2']
+
+
+def test_a_damaged_entry_is_moved_aside(tmp_path, cipher, capsys):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    for number in range(3):
+        add(storage, book, number)
+    storage.close()
+    journal = path.with_suffix('.journal')
+    lines = journal.read_bytes().splitlines(keepends=True)
+    lines[1] = b'gAAAAAB-damaged\n'
+    journal.write_bytes(b''.join(lines))
+    storage = FileStorage(path, cipher)
+    book = storage.load()
+    assert sorted(book.data) == ['Contact0']
+    assert 'moved to' in capsys.readouterr().err
+    add(storage, book, 3)
+    storage.close()
+    assert sorted(reload(path, cipher).data) == ['Contact0', 'Contact3']
+    assert path.with_suffix('.journal.corrupt').read_bytes() == \
+        b''.join(lines[1:])
+
+
+def test_a_journal_without_snapshot_rejects_another_key(tmp_path, cipher):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    add(storage, book, 0)
+    storage.close()
+    assert reload(path, Cipher.from_key(Fernet.generate_key())) == \
+        'wrong pass'
+    assert sorted(reload(path, cipher).data) == ['Contact0']
+
+
+def test_a_failed_compaction_keeps_the_changes(tmp_path, cipher,
+                                               monkeypatch):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    storage.journal = Journal(path, cipher, compact_every=3)
+
+    def no_space(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(FileProcessor, 'write_segments', no_space)
+    for number in range(7):
+        add(storage, book, number)
+    with pytest.raises(FileException, match="No space left"):
+        storage.close()
+    monkeypatch.undo()
+    assert sorted(reload(path, cipher).data) == \
+        [f"Contact{number}" for number in range(7)]
+
+
+def test_a_compaction_after_a_failed_one_writes_everything(tmp_path, cipher,
+                                                           monkeypatch):
+    path = tmp_path / 'contacts.pkl'
+    storage, book = FileStorage(path, cipher), AddressBook()
+    monkeypatch.setattr(FileProcessor, 'write_segments',
+                        lambda *args, **kwargs: 1 / 0)
+    add(storage, book, 0)
+    storage.compact(book)
+    add(storage, book, 1)
+    monkeypatch.undo()
+    storage.compact(book)
+    storage.close()
+    assert not path.with_suffix('.journal.old').exists()
+    assert sorted(reload(path, cipher).data) == ['Contact0', 'Contact1']
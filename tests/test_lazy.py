@@ -0,0 +1,57 @@
+"""Tests of the lazily decrypted SQLite book against a loaded one."""
+import pytest
+from cryptography.fernet import Fernet
+from app.book import AddressBook
+from app.protection import Cipher
+from app.storage import SQLiteStorage
+
+NAMES = ['Olena', 'Bohdan', 'oleh', 'Andrii', 'Iryna', 'Taras', 'Oksana']
+
+
+@pytest.fixture
+def storage(tmp_path):
+    book = AddressBook()
+    for number, name in enumerate(NAMES):
+        book.add_record([name, f"{5000000000 + number:010d}"])
+    storage = SQLiteStorage(
+        tmp_path / 'contacts.db', Cipher.from_key(Fernet.generate_key())
+    )
+    storage.compact(book)
+    yield storage
+    storage.close()
+
+
+def load(storage, lazy):
+    storage.lazy = lazy
+    return storage.load()
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'sort': True},
+    {'page': 2, 'size': 3},
+    {'page': 1, 'size': 3, 'sort': True},
+    {'page': 3, 'size': 3, 'sort': True},
+    {'contains': 'OL'},
+    {'contains': 'ol', 'sort': True, 'page': 1, 'size': 1},
+])
+def test_show_all_matches_the_loaded_book(storage, options):
+    loaded = list(load(storage, False).show_all(**options))
+    assert list(load(storage, True).show_all(**options)) == loaded
+
+
+def test_show_all_includes_unsaved_changes(storage):
+    book = load(storage, True)
+    book.add_record(['Zenon', '5000000099'])
+    book.delete(['Bohdan'])
+    listing = ''.join(book.show_all(sort=True))
+    assert 'Zenon' in listing and 'Bohdan' not in listing
+
+
+def test_show_all_reads_the_rows_once(storage, monkeypatch):
+    book = load(storage, True)
+    monkeypatch.setattr(
+        storage, 'read_record',
+        lambda name: pytest.fail(f"{name} read again by name")
+    )
+    assert len(list(book.show_all(sort=True))) == len(NAMES)
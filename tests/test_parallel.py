@@ -0,0 +1,93 @@
+"""Tests of loading and saving contacts files in worker processes
+(ASSISTANT_WORKERS) against the serial path."""
+import pytest
+from cryptography.fernet import Fernet
+from app import parallel
+from app.file import FileProcessor
+from app.protection import Cipher
+from app.storage import FileStorage
+from tests.helpers import make_book, make_name
+
+# Several segments of SEGMENT_SIZE, in few enough contacts to be quick.
+SIZE = 6_000
+WORKERS = 2
+
+
+@pytest.fixture(scope='module')
+def cipher():
+    return Cipher.from_key(Fernet.generate_key())
+
+
+@pytest.fixture(scope='module')
+def book():
+    book = make_book(SIZE, birthdays=True)
+    book.add_phone([make_name(7), '5999999999'])
+    book.journal_seq = 9
+    return book
+
+
+def plaintexts(path, cipher) -> list:
+    header = FileProcessor.read_header(path)
+    return [FileProcessor.unseal(token, cipher, header)
+            for token in FileProcessor.read_tokens(path)]
+
+
+def assert_same_book(loaded, book) -> None:
+    assert loaded.journal_seq == book.journal_seq
+    assert {name: (record.packed_phones, record.birth_ordinal)
+            for name, record in loaded.data.items()} == \
+        {name: (record.packed_phones, record.birth_ordinal)
+         for name, record in book.data.items()}
+    assert loaded.phone_index == book.phone_index
+    assert loaded.birthday_index == book.birthday_index
+    assert loaded.name_index.prefix('contact0000', 50) == \
+        book.name_index.prefix('contact0000', 50)
+
+
+@pytest.mark.parametrize('compression', [(None, None), ('zlib', 6)])
+def test_parallel_file_matches_the_serial_one(tmp_path, cipher, book,
+                                              compression):
+    serial, workers = tmp_path / 'serial.pkl', tmp_path / 'workers.pkl'
+    FileProcessor.write_segments(
+        serial, FileProcessor.iter_segments(book.data), book.journal_seq,
+        cipher, compression,
+    )
+    parallel.write_file(workers, book.data, book.journal_seq, cipher,
+                        WORKERS, compression)
+    header = FileProcessor.read_header(workers)
+    assert header == FileProcessor.read_header(serial)
+    segments = plaintexts(workers, cipher)
+    assert len(segments) > WORKERS
+    assert segments == plaintexts(serial, cipher)
+    assert workers.stat().st_size == serial.stat().st_size
+    for number in (0, 7, SIZE // 2, SIZE - 1):
+        name = make_name(number)
+        assert str(FileProcessor.read_record(workers, cipher, name)) == \
+            str(book.data[name])
+    for path in (serial, workers):
+        assert_same_book(parallel.read_file(path, cipher, WORKERS), book)
+        assert_same_book(FileProcessor.read_file(path, cipher), book)
+
+
+def test_storage_with_workers_saves_and_loads_the_book(tmp_path, cipher,
+                                                       book, monkeypatch):
+    path = tmp_path / 'contacts.pkl'
+    monkeypatch.setenv('ASSISTANT_WORKERS', str(WORKERS))
+    storage = FileStorage(path, cipher)
+    assert storage.journal.workers == WORKERS
+    storage.compact(book)
+    storage.close()
+    storage = FileStorage(path, cipher)
+    assert_same_book(storage.load(), book)
+    storage.close()
+    monkeypatch.setenv('ASSISTANT_WORKERS', '1')
+    storage = FileStorage(path, cipher)
+    assert_same_book(storage.load(), book)
+    storage.close()
+
+
+def test_parallel_read_refuses_another_key(tmp_path, cipher, book):
+    path = tmp_path / 'contacts.pkl'
+    parallel.write_file(path, book.data, book.journal_seq, cipher, WORKERS)
+    other = Cipher.from_key(Fernet.generate_key())
+    assert parallel.read_file(path, other, WORKERS) == 'wrong pass'
@@ -0,0 +1,26 @@
+"""Tests of the derived-key cache."""
+import json
+import time
+from app.protection import KeyCache
+
+SALT = b'0123456789abcdef'
+KEY = b'k' * 44
+
+
+def test_a_key_is_shared_through_the_file(tmp_path):
+    path = tmp_path / 'keys'
+    KeyCache(60, path).put('secret', SALT, 1000, KEY)
+    assert KeyCache(60, path).get('secret', SALT, 1000) == KEY
+    assert KeyCache(60, path).get('guess', SALT, 1000) is None
+    assert KeyCache.lookup('secret', SALT, 1000) not in path.read_text()
+
+
+def test_expired_keys_are_dropped(tmp_path, monkeypatch):
+    path = tmp_path / 'keys'
+    cache = KeyCache(60, path)
+    cache.put('secret', SALT, 1000, KEY)
+    now = time.time()
+    monkeypatch.setattr('app.protection.time.time', lambda: now + 61)
+    assert cache.get('secret', SALT, 1000) is None
+    assert not cache.keys
+    assert json.loads(path.read_text()) == {}
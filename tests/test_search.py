@@ -0,0 +1,85 @@
+"""Tests of the name index: prefix and fuzzy search and its upkeep."""
+import pytest
+from app.book import AddressBook
+from app.search import NameIndex, edit_distance
+
+NAMES = ['John', 'Johnny', 'Joanna', 'Jo', 'Olena', 'Oleh', 'Oleksandr',
+         'xb', 'Bohdan', 'Iryna']
+
+
+def scan(names, text: str, max_edits: int) -> list:
+    """The fuzzy matches by the edit distance to every name."""
+    found = sorted(
+        (edit_distance(text.casefold(), name.casefold(), max_edits), name)
+        for name in names
+    )
+    return [name for distance, name in found if distance <= max_edits]
+
+
+@pytest.mark.parametrize('first, second, distance', [
+    ('john', 'john', 0),
+    ('jhon', 'john', 1),
+    ('john', 'jon', 1),
+    ('john', 'joan', 1),
+    ('ab', 'xb', 1),
+    ('abcd', 'badc', 2),
+    ('ca', 'abc', 3),
+    ('kitten', 'sitting', 3),
+])
+def test_edit_distance_counts_a_swap_as_one_edit(first, second, distance):
+    assert edit_distance(first, second, 5) == distance
+    if distance:
+        assert edit_distance(first, second, distance - 1) == distance
+
+
+def test_prefix_ignores_case_and_sorts():
+    index = NameIndex(NAMES)
+    assert index.prefix('jo') == ['Jo', 'Joanna', 'John', 'Johnny']
+    assert index.prefix('OLE', limit=2) == ['Oleh', 'Oleksandr']
+    assert index.prefix('z') == []
+
+
+@pytest.mark.parametrize('text, max_edits', [
+    ('Jhon', None), ('Jo', None), ('ab', None), ('J', None), ('Olnea', None),
+    ('Oleksnadr', None), ('Jonny', 1), ('Jo', 2), ('Bhodan', 2),
+])
+def test_fuzzy_finds_what_a_scan_finds(text, max_edits):
+    index = NameIndex(NAMES)
+    edits = max_edits or (1 if len(text) <= 6 else 2)
+    assert index.fuzzy(text, max_edits=max_edits) == scan(NAMES, text, edits)
+
+
+def test_fuzzy_finds_swapped_letters_and_short_names():
+    index = NameIndex(NAMES)
+    assert index.fuzzy('Jhon') == ['John']
+    assert index.fuzzy('ab') == ['xb']
+
+
+def test_index_follows_added_and_removed_names():
+    index = NameIndex(NAMES)
+    assert index.fuzzy('Jhon') == ['John']
+    index.remove('John')
+    index.add('Jhonatan')
+    assert index.fuzzy('Jhon') == []
+    assert index.prefix('jh') == ['Jhonatan']
+    assert index.fuzzy('Jonathan', max_edits=2) == ['Jhonatan']
+    index.add('John')
+    assert index.fuzzy('Jhon') == ['John']
+    assert index.prefix('john') == ['John', 'Johnny']
+
+
+def test_book_search_after_add_delete_and_rename():
+    book = AddressBook()
+    for number, name in enumerate(NAMES):
+        book.add_record([name, f"{5000000000 + number:010d}"])
+    assert book.name_index.fuzzy('Jhon') == ['John']
+    book.delete(['John'])
+    assert book.name_index.fuzzy('Jhon') == []
+    assert 'John' not in book.name_index.prefix('jo')
+    # A rename is a delete of the old name and an add of the new one.
+    book.delete(['Bohdan'])
+    book.add_record(['Bogdan', '5000000099'])
+    assert book.name_index.prefix('bo') == ['Bogdan']
+    assert book.name_index.fuzzy('Bohdan') == ['Bogdan']
+    index = NameIndex(book.data)
+    assert book.name_index.prefix('') == index.prefix('')
@@ -0,0 +1,47 @@
+"""Tests of the commands the book server runs for its clients."""
+import asyncio
+import pytest
+from cryptography.fernet import Fernet
+from app.book import AddressBook
+from app.books import BookRegistry
+from app.protection import Cipher
+from app.server import NOT_ON_SERVER, BookServer
+from app.storage import FileStorage
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / 'contacts.pkl'
+    contacts = AddressBook()
+    contacts.add_record(['Olena', '5000000001'])
+    books = BookRegistry()
+    book = books.add(
+        path, contacts,
+        FileStorage(path, Cipher.from_key(Fernet.generate_key()))
+    )
+    yield BookServer(books, default=path), book
+    books.release(book)
+    books.close()
+
+
+@pytest.mark.parametrize('command', ['import', 'export', 'snapshot'])
+def test_commands_with_file_names_are_refused(server, tmp_path, command):
+    book_server, book = server
+    target = tmp_path / 'target.csv'
+    answer = asyncio.run(book_server.execute(book, command, [str(target)]))
+    assert answer == NOT_ON_SERVER
+    assert not target.exists()
+
+
+def test_other_commands_run(server):
+    book_server, book = server
+    answer = asyncio.run(book_server.execute(book, 'phone', ['Olena']))
+    assert '5000000001' in answer
+
+
+def test_stats_reset_is_refused(server):
+    book_server, book = server
+    assert asyncio.run(book_server.execute(book, 'stats', ['--reset'])) == \
+        NOT_ON_SERVER
+    assert asyncio.run(book_server.execute(book, 'stats', [])) != \
+        NOT_ON_SERVER
@@ -0,0 +1,114 @@
+"""Tests of ShardedBook against a plain AddressBook with the same
+contacts."""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import pytest
+from cryptography.fernet import Fernet
+from app.file import FileException, FileProcessor
+from app.protection import Cipher
+from app.shards import ShardedBook, shard_of, shard_paths, split
+from tests.helpers import make_book, make_name, make_phone
+
+SIZE = 600
+SHARDS = 3
+
+
+@pytest.fixture(scope='module')
+def cipher():
+    return Cipher.from_key(Fernet.generate_key())
+
+
+@pytest.fixture
+def book():
+    return make_book(SIZE, birthdays=True)
+
+
+@pytest.fixture
+def sharded(book, cipher, tmp_path):
+    split(book, tmp_path, cipher, SHARDS)
+    with ShardedBook(tmp_path, cipher) as sharded:
+        yield sharded
+
+
+def test_shard_of_is_crc32_of_the_name():
+    for name in ('Olena', 'Zoë', make_name(5), ''):
+        assert shard_of(name, SHARDS) == \
+            zlib.crc32(name.encode('utf-8')) % SHARDS
+        assert shard_of(name, 1) == 0
+
+
+def test_split_puts_every_contact_into_its_shard(book, cipher, tmp_path):
+    sizes = split(book, tmp_path, cipher, SHARDS)
+    assert sum(sizes) == SIZE and all(sizes)
+    for index, path in enumerate(shard_paths(tmp_path, SHARDS)):
+        part = FileProcessor.read_file(path, cipher)
+        assert len(part.data) == sizes[index]
+        assert {shard_of(name, SHARDS) for name in part.data} == {index}
+    with pytest.raises(FileException):
+        split(book, tmp_path, cipher, SHARDS)
+
+
+def test_lookups_match(book, sharded):
+    assert len(sharded) == SIZE
+    for number in (0, 1, SIZE // 2, SIZE - 1):
+        name, phone = make_name(number), make_phone(number)
+        assert str(sharded.find([name])) == str(book.find([name]))
+        assert sharded.find_by_phone(phone) == book.find_by_phone(phone)
+        assert sharded.show_birth_date(name) == book.show_birth_date(name)
+    assert sharded.find_by_phone('5999999999') == \
+        book.find_by_phone('5999999999')
+    names = [make_name(number) for number in range(0, SIZE, 7)] + ['Nobody']
+    found = sharded.find_many(names)
+    assert found.pop('Nobody') is None
+    assert {name: str(record) for name, record in found.items()} == \
+        {name: str(book.data[name]) for name in found}
+
+
+@pytest.mark.parametrize('options', [
+    {'sort': True}, {'page': 1, 'size': 25, 'sort': True},
+    {'page': 4, 'size': 30, 'sort': True},
+    {'contains': '0001', 'sort': True},
+    {'page': 2, 'size': 3, 'sort': True, 'contains': '5'},
+])
+def test_sorted_listings_match(book, sharded, options):
+    assert list(sharded.show_all(**options)) == list(book.show_all(**options))
+
+
+def test_unsorted_listings_hold_the_same_contacts(book, sharded):
+    assert sorted(sharded.show_all()) == sorted(book.show_all())
+    assert len(list(sharded.show_all(page=2, size=50))) == 50
+
+
+@pytest.mark.parametrize('today, days', [
+    (date(2024, 2, 25), 7), (date(2025, 2, 25), 7),
+    (date(2024, 12, 28), 10), (date(2025, 6, 1), 365),
+])
+def test_upcoming_birthdays_are_merged_by_date(book, sharded, today, days):
+    upcoming = sharded.upcoming_birthdays(days, today)
+    assert sorted(upcoming) == sorted(book.upcoming_birthdays(days, today))
+    dates = [day for day, _ in upcoming]
+    assert dates == sorted(dates)
+
+
+def test_changes_go_to_the_shard_of_the_contact(book, sharded):
+    name = make_name(3)
+    for target in (book, sharded):
+        target.add_record(['Olena', '5999999990'])
+        target.birthday_date('Olena', '29.02.1996')
+        target.change_phone(name, make_phone(3), '5999999991')
+        target.delete([make_name(4)])
+    assert len(sharded) == len(book.data)
+    for phone in ('5999999990', '5999999991', make_phone(3), make_phone(4)):
+        assert sharded.find_by_phone(phone) == book.find_by_phone(phone)
+    assert sharded.show_birth_date('Olena') == book.show_birth_date('Olena')
+    assert list(sharded.show_all(sort=True)) == list(book.show_all(sort=True))
+
+
+def test_threads_can_share_the_book(book, sharded):
+    numbers = list(range(0, SIZE, 3))
+    with ThreadPoolExecutor(8) as executor:
+        found = list(executor.map(
+            lambda number: sharded.find_by_phone(make_phone(number)), numbers
+        ))
+    assert found == [make_name(number) for number in numbers]
@@ -0,0 +1,142 @@
+"""Tests of snapshot files: every lookup of a SnapshotBook against the
+AddressBook it was written from."""
+import sys
+from datetime import date
+import pytest
+from app.book import AddressBook
+from app.file import FileException
+from app.record import Record
+from app.snapshot import Snapshot, SnapshotBook, write_snapshot
+from tests.helpers import make_birthday, make_name, make_phone
+
+# Non-ASCII and mixed case names, a shared phone and several phones.
+EXTRA = [
+    ('Олена', ['5000009001', '5000009002'], '29.02.1996'),
+    ('олег', ['5000009003'], '31.12.1980'),
+    ('Zoë', ['5000009001'], None),
+    ('anna', ['5000009004'], '01.01.2000'),
+    ('Anna', ['5000009005'], '01.03.1999'),
+]
+
+
+@pytest.fixture(scope='module')
+def source():
+    """A book with its contacts added in name order, the order a snapshot
+    lists them in."""
+    contacts = [
+        (make_name(number), [make_phone(number)],
+         make_birthday(number) if number % 3 else None)
+        for number in range(300)
+    ] + EXTRA
+    book = AddressBook()
+    for name, phones, birthday in sorted(contacts):
+        book.add_record([name, phones[0]])
+        for phone in phones[1:]:
+            book.add_phone([name, phone])
+        if birthday:
+            book.birthday_date(name, birthday)
+    book.journal_seq = 42
+    return book
+
+
+@pytest.fixture(scope='module')
+def snapshot(source, tmp_path_factory):
+    path = tmp_path_factory.mktemp('snapshot') / 'contacts.snap'
+    assert write_snapshot(path, source) == len(source.data)
+    snapshot = Snapshot(path)
+    yield SnapshotBook(snapshot)
+    snapshot.close()
+
+
+def test_records_and_counts_match(source, snapshot):
+    assert len(snapshot) == len(source.data)
+    assert snapshot.journal_seq == 42
+    assert list(snapshot.data) == sorted(source.data)
+    for name, record in source.data.items():
+        assert name in snapshot
+        assert str(snapshot.find([name])) == str(source.find([name]))
+        assert snapshot.data[name].packed_phones == record.packed_phones
+        assert snapshot.data[name].birth_ordinal == record.birth_ordinal
+        assert snapshot.show_birth_date(name) == source.show_birth_date(name)
+    assert 'Nobody' not in snapshot
+    assert snapshot.find(['Nobody']) == source.find(['Nobody'])
+    with pytest.raises(KeyError):
+        snapshot.data['Nobody']
+
+
+def test_phone_lookups_match(source, snapshot):
+    for phone, owners in source.phone_index.items():
+        assert snapshot.phone_index[phone] == owners
+        assert snapshot.find_by_phone(phone) == source.find_by_phone(phone)
+    assert sorted(snapshot.phone_index) == sorted(source.phone_index)
+    assert snapshot.find_by_phone('5999999999') == \
+        source.find_by_phone('5999999999')
+
+
+@pytest.mark.parametrize('options', [
+    {}, {'sort': True}, {'page': 3, 'size': 7},
+    {'page': 2, 'size': 5, 'sort': True}, {'contains': 'ANN'},
+    {'contains': 'ол', 'sort': True},
+])
+def test_show_all_matches(source, snapshot, options):
+    assert list(snapshot.show_all(**options)) == \
+        list(source.show_all(**options))
+
+
+@pytest.mark.parametrize('text, fuzzy', [
+    ('contact0000012', False), ('ОЛ', False), ('an', False), ('', False),
+    ('Contcat00000012', True), ('Олнеа', True), ('Zoe', True),
+    ('ann', True),
+])
+def test_name_search_matches(source, snapshot, text, fuzzy):
+    assert snapshot.search(text, fuzzy) == source.search(text, fuzzy)
+
+
+@pytest.mark.parametrize('today, days', [
+    (date(2024, 2, 25), 7), (date(2025, 2, 25), 7),
+    (date(2024, 12, 28), 10), (date(2025, 6, 1), 400),
+])
+def test_upcoming_birthdays_match(source, snapshot, today, days):
+    assert snapshot.upcoming_birthdays(days, today) == \
+        source.upcoming_birthdays(days, today)
+
+
+def test_changes_are_refused(snapshot):
+    assert snapshot.add_record(['New', '5000000000']) == \
+        SnapshotBook.READ_ONLY
+    assert snapshot.delete(['anna']) == SnapshotBook.READ_ONLY
+    assert snapshot.change_phone('anna', '5000009004', '5000000000') == \
+        SnapshotBook.READ_ONLY
+    assert snapshot.birthday_date('anna', '01.01.2001') == \
+        SnapshotBook.READ_ONLY
+    with pytest.raises(FileException):
+        snapshot.insert(Record('New'))
+    assert 'New' not in snapshot
+
+
+def test_a_snapshot_of_another_byte_order_is_refused(source, tmp_path,
+                                                     monkeypatch):
+    path = tmp_path / 'contacts.snap'
+    other = 'big' if sys.byteorder == 'little' else 'little'
+    with monkeypatch.context() as patch:
+        patch.setattr(sys, 'byteorder', other)
+        write_snapshot(path, source)
+    with pytest.raises(FileException, match='another platform'):
+        Snapshot(path)
+
+
+def test_a_file_that_is_no_snapshot_is_refused(tmp_path):
+    path = tmp_path / 'contacts.snap'
+    path.write_bytes(b'not a snapshot')
+    with pytest.raises(FileException, match='not a snapshot'):
+        Snapshot(path)
+
+
+def test_an_empty_book_round_trips(tmp_path):
+    path = tmp_path / 'contacts.snap'
+    assert write_snapshot(path, AddressBook()) == 0
+    snapshot = Snapshot(path)
+    book = SnapshotBook(snapshot)
+    assert len(book) == 0 and list(book.show_all()) == []
+    assert book.search('a', fuzzy=True) == []
+    snapshot.close()
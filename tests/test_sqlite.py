@@ -0,0 +1,206 @@
+"""Tests of SQLiteStorage: the key check, the HMAC lookups, the writes and
+the lazily decrypted book of a migrated contacts file."""
+from datetime import date
+import pytest
+from cryptography.fernet import Fernet
+from app.book import AddressBook
+from app.file import FileException
+from app.functions import BirthdayFunctions as birth
+from app.lazy import LazyBook
+from app.migrate import migrate
+from app.protection import Cipher
+from app.storage import FileStorage, SQLiteStorage
+from tests.helpers import make_book, make_name, make_phone
+
+SIZE = 60
+
+
+@pytest.fixture
+def cipher():
+    return Cipher.from_key(Fernet.generate_key())
+
+
+@pytest.fixture
+def book():
+    book = make_book(SIZE, birthdays=True)
+    # A phone shared by two contacts.
+    book.add_phone([make_name(1), make_phone(0)])
+    return book
+
+
+@pytest.fixture
+def storage(tmp_path, cipher, book):
+    storage = SQLiteStorage(tmp_path / 'contacts.db', cipher)
+    storage.lazy = False
+    storage.compact(book)
+    yield storage
+    storage.close()
+
+
+def reload(path, cipher, lazy=False):
+    storage = SQLiteStorage(path, cipher)
+    storage.lazy = lazy
+    try:
+        return storage.load()
+    finally:
+        storage.close()
+
+
+def rows(book) -> dict:
+    return {name: str(record) for name, record in book.data.items()}
+
+
+def test_load_returns_the_saved_book(storage, book):
+    loaded = storage.load()
+    assert rows(loaded) == rows(book)
+    assert dict(loaded.phone_index) == dict(book.phone_index)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_wrong_key_is_refused(storage, lazy):
+    storage.close()
+    other = Cipher.from_key(Fernet.generate_key())
+    assert reload(storage.database, other, lazy) == 'wrong pass'
+
+
+def test_kdf_params_are_kept_in_the_meta(tmp_path):
+    cipher = Cipher.from_key(
+        Fernet.generate_key(), salt=b'0123456789abcdef', iterations=1000
+    )
+    path = tmp_path / 'contacts.db'
+    assert SQLiteStorage.kdf_params(path) == {}
+    storage = SQLiteStorage(path, cipher)
+    storage.compact(AddressBook())
+    storage.close()
+    assert SQLiteStorage.kdf_params(path) == {
+        'salt': b'0123456789abcdef', 'iterations': 1000,
+    }
+
+
+def test_names_and_phones_are_not_stored_in_clear(storage):
+    storage.close()
+    content = storage.database.read_bytes()
+    for number in range(SIZE):
+        assert make_name(number).encode('utf-8') not in content
+        assert make_phone(number).encode('ascii') not in content
+
+
+def test_read_record_finds_a_contact_by_name(storage, book):
+    for name in (make_name(0), make_name(SIZE - 1)):
+        assert str(storage.read_record(name)) == str(book.find([name]))
+        assert storage.has_record(name)
+    assert storage.read_record('Nobody') is None
+    assert not storage.has_record('Nobody')
+
+
+def test_find_by_phone_reads_all_owners(storage, book):
+    owners = storage.find_by_phone(make_phone(0))
+    assert [record.name for record in owners] == [make_name(0), make_name(1)]
+    owners = storage.find_by_phone(make_phone(5))
+    assert [record.name for record in owners] == [make_name(5)]
+    assert storage.find_by_phone('0999999999') == []
+
+
+def test_count_and_iter_records(storage, book):
+    assert storage.count_records() == SIZE
+    assert [str(record) for record in storage.iter_records(batch=7)] == [
+        str(record) for record in book.data.values()
+    ]
+
+
+def test_read_birthdays_matches_a_scan(storage, book):
+    first, last = 40, 120
+    expected = sorted(
+        name for name, record in book.data.items()
+        if first <= birth.ordinal_slot(record.birth_ordinal) <= last
+    )
+    found = storage.read_birthdays(first, last)
+    assert sorted(record.name for record in found) == expected
+    slots = [birth.ordinal_slot(record.birth_ordinal) for record in found]
+    assert slots == sorted(slots)
+
+
+def test_save_changes_upserts_and_deletes(storage, book):
+    book.add_record(['Zenon', '5000000999'])
+    book.add_phone([make_name(2), '5000000998'])
+    book.remove_phone([make_name(3), make_phone(3)])
+    book.birthday_date('Zenon', '29.02.2000')
+    book.delete([make_name(5)])
+    changed = ['Zenon'] + [make_name(number) for number in (2, 3, 5)]
+    storage.save_changes(book, changed)
+    assert rows(storage.load()) == rows(book)
+    assert storage.count_records() == SIZE
+    assert storage.find_by_phone(make_phone(5)) == []
+    assert storage.find_by_phone(make_phone(3)) == []
+    assert [r.name for r in storage.find_by_phone('5000000998')] == [
+        make_name(2)
+    ]
+    feb_29 = birth.day_slot(date(2000, 2, 29))
+    assert 'Zenon' in [
+        record.name for record in storage.read_birthdays(feb_29, feb_29)
+    ]
+
+
+def test_append_writes_one_contact(storage, book):
+    book.add_record(['Zenon', '5000000999'])
+    storage.append(book, 'add', ['Zenon', '5000000999'])
+    book.delete([make_name(0)])
+    storage.append(book, 'delete', [make_name(0)])
+    assert rows(storage.load()) == rows(book)
+    assert [r.name for r in storage.find_by_phone(make_phone(0))] == [
+        make_name(1)
+    ]
+
+
+def test_compact_replaces_all_rows(storage):
+    other = make_book(5)
+    storage.compact(other)
+    assert rows(storage.load()) == rows(other)
+    assert storage.count_records() == 5
+    assert storage.read_birthdays(0, 365) == []
+    assert storage.find_by_phone(make_phone(0))[0].name == make_name(0)
+    assert storage.find_by_phone(make_phone(10)) == []
+
+
+@pytest.fixture
+def migrated(tmp_path, cipher, book):
+    source = FileStorage(tmp_path / 'contacts.pkl', cipher)
+    source.compact(book)
+    source.close()
+    target = tmp_path / 'contacts.db'
+    assert migrate(source.database, target, cipher) == SIZE
+    return target
+
+
+def test_migrate_refuses_an_existing_target(migrated, cipher):
+    with pytest.raises(FileException):
+        migrate(migrated.with_suffix('.pkl'), migrated, cipher)
+
+
+def test_lazy_book_of_a_migrated_file_matches_the_book(migrated, cipher,
+                                                       book):
+    lazy = reload(migrated, cipher, lazy=True)
+    assert isinstance(lazy, LazyBook)
+    assert len(lazy) == SIZE
+    for name in (make_name(0), make_name(33), 'Nobody'):
+        assert str(lazy.find([name])) == str(book.find([name]))
+    for phone in (make_phone(0), make_phone(17), '0999999999'):
+        assert lazy.find_by_phone(phone) == book.find_by_phone(phone)
+    for today in (date(2026, 1, 1), date(2026, 2, 25), date(2027, 12, 28)):
+        assert lazy.upcoming_birthdays(30, today) == \
+            book.upcoming_birthdays(30, today)
+
+
+def test_lazy_book_saves_its_pending_changes(migrated, cipher, book):
+    storage = SQLiteStorage(migrated, cipher)
+    storage.lazy = True
+    lazy = storage.load()
+    for contacts in (lazy, book):
+        contacts.add_record(['Zenon', '5000000999'])
+        contacts.add_phone([make_name(2), '5000000998'])
+        contacts.birthday_date('Zenon', '29.02.2000')
+        contacts.delete([make_name(5)])
+    storage.compact(lazy)
+    assert not lazy.data.pending
+    storage.close()
+    assert rows(reload(migrated, cipher)) == rows(book)
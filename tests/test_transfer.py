@@ -0,0 +1,105 @@
+"""Tests of importing and exporting contacts as CSV and JSONL."""
+import csv
+import json
+import pytest
+from app.book import AddressBook
+from app.file import FileException
+from app.transfer import export_contacts, import_contacts
+from tests.helpers import make_book
+
+
+def same_contacts(first: AddressBook, second: AddressBook) -> bool:
+    return {name: (record.phones, record.birthday)
+            for name, record in first.data.items()} == \
+        {name: (record.phones, record.birthday)
+         for name, record in second.data.items()}
+
+
+@pytest.fixture
+def book():
+    book = make_book(50, birthdays=True)
+    # Names that need quoting, several phones and no birthday.
+    book.add_record(['Shevchenko, Taras', '5000001001'])
+    book.add_phone(['Shevchenko, Taras', '5000001002'])
+    book.add_record(['"Олена" Пчілка', '5000001003'])
+    book.birthday_date('"Олена" Пчілка', '29.02.1996')
+    return book
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.jsonl', '.ndjson'])
+def test_export_and_import_round_trip(tmp_path, book, suffix):
+    path = tmp_path / f"contacts{suffix}"
+    assert export_contacts(book, path) == len(book.data)
+    loaded = AddressBook()
+    assert import_contacts(loaded, path) == (len(book.data), 0)
+    assert same_contacts(loaded, book)
+    assert loaded.find_by_phone('5000001002') == 'Shevchenko, Taras'
+    assert not (tmp_path / f"contacts{suffix}.errors.csv").exists()
+
+
+def test_rejected_csv_rows_are_reported(tmp_path):
+    path = tmp_path / 'contacts.csv'
+    path.write_text(
+        "name,phones,birthday\n"
+        "Olena,5000000001,01.02.1990\n"
+        "\n"
+        "Taras,123,\n"
+        ",5000000002,\n"
+        "   \n"
+        "Iryna,5000000003,31.02.1990\n"
+        "Olena,5000000004,\n"
+        "Bohdan,5000000005;5000000006,\n"
+        "\n",
+        encoding='utf-8',
+    )
+    book = AddressBook()
+    book.add_record(['Oksana', '5000000009'])
+    assert import_contacts(book, path) == (2, 4)
+    assert sorted(book.data) == ['Bohdan', 'Oksana', 'Olena']
+    assert list(book.data['Bohdan'].phones) == ['5000000005', '5000000006']
+    with open(f"{path}.errors.csv", encoding='utf-8', newline='') as file:
+        assert list(csv.reader(file)) == [
+            ['line', 'name', 'error'],
+            ['4', 'Taras', 'invalid phone 123'],
+            ['5', '', 'missing name'],
+            ['7', 'Iryna', 'invalid birthday 31.02.1990'],
+            ['8', 'Olena', 'contact exists'],
+        ]
+
+
+def test_rejected_jsonl_rows_are_reported(tmp_path):
+    path = tmp_path / 'contacts.jsonl'
+    path.write_text('\n'.join([
+        json.dumps({'name': 'Olena', 'phones': ['5000000001'],
+                    'birthday': '01.02.1990'}),
+        '',
+        '{not json',
+        json.dumps({'phones': ['5000000002']}),
+        json.dumps({'name': 'Taras', 'birthday': 19900201}),
+        json.dumps({'name': 'Iryna', 'phones': [5000000003]}),
+        json.dumps({'name': 'Bohdan'}),
+    ]) + '\n', encoding='utf-8')
+    book = AddressBook()
+    assert import_contacts(book, path) == (2, 4)
+    assert sorted(book.data) == ['Bohdan', 'Olena']
+    with open(f"{path}.errors.csv", encoding='utf-8', newline='') as file:
+        assert [row[0] for row in csv.reader(file)] == \
+            ['line', '3', '4', '5', '6']
+
+
+def test_a_clean_import_removes_an_old_report(tmp_path, book):
+    path = tmp_path / 'contacts.csv'
+    report = tmp_path / 'contacts.csv.errors.csv'
+    report.write_text('line,name,error\n', encoding='utf-8')
+    export_contacts(book, path)
+    assert import_contacts(AddressBook(), path) == (len(book.data), 0)
+    assert not report.exists()
+
+
+def test_unsupported_files_are_refused(tmp_path, book):
+    with pytest.raises(FileException):
+        export_contacts(book, tmp_path / 'contacts.xlsx')
+    path = tmp_path / 'contacts.txt'
+    path.write_text('Olena,5000000001\n', encoding='utf-8')
+    with pytest.raises(FileException):
+        import_contacts(AddressBook(), path)